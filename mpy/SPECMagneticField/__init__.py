@@ -1,7 +1,12 @@
 from .specField import SPECField
+from .analyticField import AnalyticField
+from .beltrami import BeltramiField
 from .fieldLine import FieldLine
 from .surface import SPECSurface
+from .pointIndex import SPECPointIndex
+from .provider import FieldProvider, GridProvider, PyoculusProvider, BeltramiProvider, AnalyticProvider, getProvider
 from .tracing import traceLine, traceLine_byLength
+from .poincareMap import PoincareMap
 from .axis import findAxis, find_Axis
 from .readData import readGrid, readB, readJacobian, readMetric
 from .plot import plotPoincare
\ No newline at end of file
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# analyticField.py
+
+
+import h5py
+import numpy as np
+from .specField import SPECField
+from ..misc import profiler
+from typing import List, Tuple
+
+
+class AnalyticField(SPECField):
+    r"""
+    Analytic magnetic field of a shaped tokamak in the coordinates (s, \theta, \zeta), with the same interface as `SPECField`
+    and a pyoculus-like `B`/`B_many`, so that the tracers and the fitting can be run without SPEC outputs or pyoculus!
+    The coordinates, x = (s+1)/2 and r = a*x,
+        R = R0 + r*cos(\theta + \delta*sin\theta), Z = \kappa*r*sin\theta, \phi = \zeta,
+    and the field,
+        J*B^s = -\partial_\theta h, J*B^\theta = \iota(x)*f(x) + \partial_s h, J*B^\zeta = f(x),
+        f = -B0*\kappa*a*r/2, h = \sum_{m,n} \epsilon_{mn}*f(1)*x^m*(1-x)*cos(m\theta-n*nfp*\zeta),
+    which is divergence free, has B^\zeta ~ B0/R, the rotational transform \iota(x) = \iota_0 + (\iota_1-\iota_0)*x^2
+    and the islands (m, n) at \iota = n*nfp/m.
+    """
+
+    def __init__(self, nfp: int=1, majorRadius: float=3.0, minorRadius: float=1.0, elongation: float=1.0, triangularity: float=0.0,
+    iota: Tuple[float, float]=(0.3, 0.6), islands: List[Tuple[int, int, float]]=[], b0: float=1.0,
+    sResolution: int=2, thetaResolution: int=2, zetaResolution: int=2) -> None:
+        """
+        Args:
+            nfp: the number of field periods.
+            majorRadius, minorRadius, elongation, triangularity: R0, a, kappa and delta of the flux surfaces.
+            iota: the rotational transform on the axis and the boundary.
+            islands: list of (m, n, amplitude), the resonant perturbations cos(m*theta-n*nfp*zeta).
+            b0: the toroidal field on the axis.
+            sResolution, thetaResolution, zetaResolution: the resolution of the grids, see `SPECField`.
+        """
+        self.specData = None
+        self.lvol = 0
+        self.nfp = nfp
+        self.stellsym = True
+        self.majorRadius = majorRadius
+        self.minorRadius = minorRadius
+        self.elongation = elongation
+        self.triangularity = triangularity
+        self.iota = iota
+        self.islands = [(int(m), int(n), float(amplitude)) for m, n, amplitude in islands]
+        self.b0 = b0
+        self.changeResolution(sResolution=sResolution, thetaResolution=thetaResolution, zetaResolution=zetaResolution)
+
+    def getIota(self, sArr: np.ndarray) -> np.ndarray:
+        x = (np.asarray(sArr, dtype=float) + 1) / 2
+        return self.iota[0] + (self.iota[1]-self.iota[0]) * x*x
+
+    def getRZ_points(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        Evaluate the coordinates at the points (sArr[i], thetaArr[i], zetaArr[i]).
+        return:
+            R, R_s, R_theta, R_zeta, Z, Z_s, Z_theta, Z_zeta
+        """
+        sArr, thetaArr, zetaArr = np.broadcast_arrays(np.asarray(sArr, dtype=float), np.asarray(thetaArr, dtype=float), np.asarray(zetaArr, dtype=float))
+        r = self.minorRadius * (sArr+1) / 2
+        u = thetaArr + self.triangularity*np.sin(thetaArr)
+        cosU, sinU = np.cos(u), np.sin(u)
+        sinTheta, cosTheta = np.sin(thetaArr), np.cos(thetaArr)
+        zeros = np.zeros_like(sArr)
+        return (
+            self.majorRadius + r*cosU, self.minorRadius/2*cosU, -r*sinU*(1+self.triangularity*cosTheta), zeros,
+            self.elongation*r*sinTheta, self.elongation*self.minorRadius/2*sinTheta, self.elongation*r*cosTheta, zeros
+        )
+
+    def getJacobian_points(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> np.ndarray:
+        """
+        The Jacobian R*(R_theta*Z_s - R_s*Z_theta) as `SPECout.jacobian`.
+        """
+        R, R_s, R_theta, _, _, Z_s, Z_theta, _ = self.getRZ_points(sArr, thetaArr, zetaArr)
+        return R * (R_theta*Z_s - R_s*Z_theta)
+
+    def getMetric_points(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> np.ndarray:
+        """
+        The metric g_ij as `SPECout.metric`, shape (*sArr.shape, 3, 3).
+        """
+        R, R_s, R_theta, R_zeta, _, Z_s, Z_theta, Z_zeta = self.getRZ_points(sArr, thetaArr, zetaArr)
+        rDeriv = np.stack((R_s, R_theta, R_zeta), axis=-1)
+        zDeriv = np.stack((Z_s, Z_theta, Z_zeta), axis=-1)
+        metric = rDeriv[..., :, np.newaxis]*rDeriv[..., np.newaxis, :] + zDeriv[..., :, np.newaxis]*zDeriv[..., np.newaxis, :]
+        metric[..., 2, 2] += R*R
+        return metric
+
+    def _getJB(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        return:
+            J*B^s, J*B^theta, J*B^zeta
+        """
+        sArr, thetaArr, zetaArr = np.broadcast_arrays(np.asarray(sArr, dtype=float), np.asarray(thetaArr, dtype=float), np.asarray(zetaArr, dtype=float))
+        x = (sArr+1) / 2
+        fEdge = -self.b0 * self.elongation * self.minorRadius * self.minorRadius / 2
+        f = fEdge * x
+        jbSupS = np.zeros_like(sArr)
+        jbSupTheta = self.getIota(sArr) * f
+        for m, n, amplitude in self.islands:
+            angle = m*thetaArr - n*self.nfp*zetaArr
+            # h = amplitude*fEdge*x^m*(1-x)*cos(angle), d/ds = d/dx / 2
+            jbSupS += amplitude * fEdge * np.power(x, m) * (1-x) * m * np.sin(angle)
+            jbSupTheta += amplitude * fEdge * (m*np.power(x, m-1)*(1-x) - np.power(x, m)) / 2 * np.cos(angle)
+        return jbSupS, jbSupTheta, f
+
+    def getB_points(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        return:
+            bSupS, bSupTheta, bSupZeta at the points (sArr[i], thetaArr[i], zetaArr[i])
+        """
+        jacobian = self.getJacobian_points(sArr, thetaArr, zetaArr)
+        jbSupS, jbSupTheta, jbSupZeta = self._getJB(sArr, thetaArr, zetaArr)
+        return jbSupS/jacobian, jbSupTheta/jacobian, jbSupZeta/jacobian
+
+    def B(self, coords: np.ndarray, *args) -> np.ndarray:
+        """
+        The field J*B^i at a point, as `pyoculus.problems.SPECBfield.B`.
+        Args:
+            coords: [s, theta, zeta]
+        """
+        return np.array(self._getJB(coords[0], coords[1], coords[2]), dtype=float).reshape(3)
+
+    def B_many(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, input1D: bool=True, *args) -> np.ndarray:
+        """
+        The field J*B^i at many points, as `pyoculus.problems.SPECBfield.B_many`.
+        return:
+            shape (N, 3) if input1D, else (sArr.size, thetaArr.size, zetaArr.size, 3) on the tensor grid
+        """
+        sArr, thetaArr, zetaArr = np.atleast_1d(sArr), np.atleast_1d(thetaArr), np.atleast_1d(zetaArr)
+        if not input1D:
+            sArr, thetaArr, zetaArr = np.meshgrid(sArr, thetaArr, zetaArr, indexing='ij')
+        return np.stack(self._getJB(sArr, thetaArr, zetaArr), axis=-1)
+
+    def _getMesh(self) -> Tuple[np.ndarray]:
+        return np.meshgrid(self.sArr, self.thetaArr, self.zetaArr, indexing='ij')
+
+    def _writeH5(self, h5File: str, **datas) -> None:
+        with profiler.phase("writeH5"), h5py.File(h5File, 'w') as f:
+            f.create_dataset("sArr", data=self.sArr)
+            f.create_dataset("thetaArr", data=self.thetaArr)
+            f.create_dataset("zetaArr", data=self.zetaArr)
+            for key, value in datas.items():
+                f.create_dataset(key, data=value)
+
+    def getGrid(self, writeH5: str=None):
+        """
+        return:
+            rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta
+        """
+        with profiler.phase("field.getGrid"):
+            rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta = self.getRZ_points(*self._getMesh())
+        if writeH5 is not None:
+            self._writeH5(
+                writeH5, rGrid=rGrid, r_s=r_s, r_theta=r_theta, r_zeta=r_zeta,
+                zGrid=zGrid, z_s=z_s, z_theta=z_theta, z_zeta=z_zeta
+            )
+        return rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta
+
+    def getB(self, writeH5: str=None):
+        """
+        return:
+            bSupS, bSupTheta, bSupZeta
+        """
+        with profiler.phase("field.getB"):
+            bSupS, bSupTheta, bSupZeta = self.getB_points(*self._getMesh())
+        if writeH5 is not None:
+            self._writeH5(writeH5, bSupS=bSupS, bSupTheta=bSupTheta, bSupZeta=bSupZeta)
+        return bSupS, bSupTheta, bSupZeta
+
+    def getJacobian(self, writeH5: str=None):
+        with profiler.phase("field.getJacobian"):
+            jacobian = self.getJacobian_points(*self._getMesh())
+        if writeH5 is not None:
+            self._writeH5(writeH5, jacobian=jacobian)
+        return jacobian
+
+    def getMetric(self, writeH5: str=None):
+        with profiler.phase("field.getMetric"):
+            metric = self.getMetric_points(*self._getMesh())
+        if writeH5 is not None:
+            self._writeH5(writeH5, metric=metric)
+        return metric
+
+
+if __name__ == "__main__":
+    pass
@@ -10,12 +10,15 @@ from scipy.optimize import OptimizeResult
 from .specField import SPECField
 from .fieldLine import FieldLine
 from .readData import readB, readJacobian
+from .provider import FieldProvider, getProvider
+from ..misc import profiler
 from typing import Tuple
 
 
 def findAxis(
     bField: SPECField, sInit: float, thetaInit: float,  
-    nstep: int=32, jacobianData: str=None, debug: bool=False, printIndex: bool=False, **kwargs
+    nstep: int=32, bMethod: str="calculate", bData: str=None, jacobianData: str=None, 
+    debug: bool=False, printIndex: bool=False, provider: FieldProvider=None, **kwargs
 ) -> FieldLine or OptimizeResult:
     """
     Find magnetic axis by tracing field line!
@@ -23,27 +26,22 @@ def findAxis(
         bField: the class `mpy.specMagneticField.SPECField`. 
         sInit, thetaInit: the init position. 
         nstep: the resolution of the axis in the toroidal direction. 
+        bMethod: should be `"calculate"`, `"native"` or "`interpolate`" , the method to get the magnetic field, see `mpy.specMagneticField.getProvider`. 
+        bData: the file of the field data, shoule be generated using `mpy.specMagneticField.SPECField.getB()`
         jacobianData: the file of the jacobian data, shoule be generated using `mpy.specMagneticField.SPECField.getJacobian()`
         debug: True, return class `scipy.optimize.OptimizeResult`; False, return class `mpy.specMagneticField.FieldLine`. 
+        provider: the `FieldProvider` of the field, overrides `bMethod`, `bData` and `jacobianData` if given. 
     """
 
-    if jacobianData is None:
-        base_Jacobian = bField.getJacobian()
-        base_sArr = bField.sArr
-        base_thetaArr = bField.thetaArr
-        base_zetaArr = bField.zetaArr
-    else:
-        base_sArr, base_thetaArr, base_zetaArr, base_Jacobian = readJacobian(jacobianData)
+    if provider is None:
+        with profiler.phase("getProvider"):
+            provider = getProvider(bField, bMethod, bData=bData, jacobianData=jacobianData)
 
     def traceLine(initPoint: np.ndarray) -> FieldLine:
-        import pyoculus
-        pyoculusField = pyoculus.problems.SPECBfield(bField.specData, bField.lvol+1)
         def getB(zeta, s_theta):
-            field = pyoculusField.B_many(s_theta[0], s_theta[1], zeta) / bField.interpValue(base_Jacobian, s_theta[0], s_theta[1], zeta, sArr=base_sArr, thetaArr=base_thetaArr, zetaArr=base_zetaArr)
-            bSupS = field[0, 0]
-            bSupTheta = field[0, 1]
-            bSupZeta = field[0, 2]
-            return [bSupS/bSupZeta, bSupTheta/bSupZeta]
+            profiler.count("rhs")
+            bSupS, bSupTheta, bSupZeta = provider.evaluate([[s_theta[0], s_theta[1], zeta]])
+            return np.concatenate([bSupS/bSupZeta, bSupTheta/bSupZeta])
         sValue, thetaValue = initPoint
         s_theta = [sValue, thetaValue]
         zetaStart = 0
@@ -52,7 +50,9 @@ def findAxis(
         thetaArr = [thetaValue]
         zetaArr = [0]
         for k in range(nstep):
-            sol = solve_ivp(getB, (zetaStart,zetaStart+dZeta), s_theta, method="LSODA", rtol=1e-9)
+            profiler.count("integratorRestart")
+            with profiler.phase("integration"):
+                sol = solve_ivp(getB, (zetaStart,zetaStart+dZeta), s_theta, method="LSODA", rtol=1e-9)
             sArr.append(sol.y[0,-1])
             thetaArr.append(sol.y[1,-1])
             zetaArr.append(zetaStart+dZeta)
@@ -68,9 +68,10 @@ def findAxis(
         if printIndex:
             print("(s,theta,zeta) = (" + "{:.1e}".format(line.sArr[0]) + ", " + "{:.1e}".format(line.thetaArr[0]) + ", " + "{:.1e}".format(line.zetaArr[0]) +"), "
             + " (deltaR, deltaZ) = (" + "{:.1e}".format(deltaR) + ", " + "{:.1e}".format(deltaZ) + ")")
-            return deltaR*deltaR + deltaZ*deltaZ
+        return deltaR*deltaR + deltaZ*deltaZ
 
-    res = minimize(getDistance, np.array([sInit, thetaInit]), **kwargs)
+    with profiler.phase("findAxis.minimize"):
+        res = minimize(getDistance, np.array([sInit, thetaInit]), **kwargs)
     if debug:
         return res
     else: 
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# beltrami.py
+
+
+import numpy as np
+from ..misc import getTrig, getTrig_grid
+from typing import Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from ..specOut import SPECOut
+
+
+def getChebyshev(sArr: np.ndarray, lrad: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The recombined Chebyshev basis of SPEC, (T_l(s) - (-1)^l) / (l+1), and its derivative.
+    return:
+        basis, basis_s, shape (lrad+1, N)
+    """
+    sArr = np.asarray(sArr, dtype=float).reshape(1, -1)
+    basis = np.zeros((lrad+1, sArr.size))
+    basis_s = np.zeros((lrad+1, sArr.size))
+    basis[0] = 1
+    if lrad >= 1:
+        basis[1], basis_s[1] = sArr, 1
+    for l in range(2, lrad+1):
+        basis[l] = 2*sArr*basis[l-1] - basis[l-2]
+        basis_s[l] = 2*basis[l-1] + 2*sArr*basis_s[l-1] - basis_s[l-2]
+    basis[1:] -= np.power(-1.0, np.arange(1, lrad+1)).reshape(-1, 1)
+    scale = 1 / np.arange(1, lrad+2).reshape(-1, 1)
+    return basis*scale, basis_s*scale
+
+
+def getZernike(rArr: np.ndarray, lrad: int, mpol: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The recombined Zernike basis R^m_l(r) of SPEC in the innermost volume, and its derivative with respect to r.
+    return:
+        basis, basis_r, shape (lrad+1, mpol+1, N)
+    """
+    rArr = np.asarray(rArr, dtype=float).reshape(-1)
+    basis = np.zeros((lrad+1, mpol+1, rArr.size))
+    basis_r = np.zeros((lrad+1, mpol+1, rArr.size))
+    rm, rm1 = np.ones_like(rArr), np.zeros_like(rArr)
+    for m in range(mpol+1):
+        if lrad >= m:
+            basis[m, m], basis_r[m, m] = rm, m*rm1
+        if lrad >= m+2:
+            basis[m+2, m] = (m+2)*rm*rArr*rArr - (m+1)*rm
+            basis_r[m+2, m] = (m+2)*(m+2)*rm*rArr - (m+1)*m*rm1
+        for n in range(m+4, lrad+1, 2):
+            factor1 = n / (n*n - m*m)
+            factor2 = 4 * (n-1)
+            factor3 = (n-2+m)**2/(n-2) + (n-m)**2/n
+            factor4 = ((n-2)**2 - m*m) / (n-2)
+            basis[n, m] = factor1 * ((factor2*rArr*rArr - factor3)*basis[n-2, m] - factor4*basis[n-4, m])
+            basis_r[n, m] = factor1 * (2*factor2*rArr*basis[n-2, m] + (factor2*rArr*rArr - factor3)*basis_r[n-2, m] - factor4*basis_r[n-4, m])
+        rm1 = rm
+        rm = rm * rArr
+    for n in range(2, lrad+1, 2):
+        basis[n, 0] -= (-1)**(n//2)
+    if mpol >= 1:
+        for n in range(3, lrad+1, 2):
+            basis[n, 1] -= (-1)**((n-1)//2) * ((n+1)//2) * rArr
+            basis_r[n, 1] -= (-1)**((n-1)//2) * ((n+1)//2)
+    for m in range(mpol+1):
+        for n in range(m, lrad+1, 2):
+            basis[n, m] /= n+1
+            basis_r[n, m] /= n+1
+    return basis, basis_r
+
+
+class BeltramiField:
+    r"""
+    The magnetic field of one SPEC volume evaluated from the vector potential A = A_\theta \nabla\theta + A_\zeta \nabla\zeta,
+        A_\theta = \sum_{mn,l} (Ate*cos + Ato*sin)(m\theta-n\zeta) T_l(s), A_\zeta = \sum_{mn,l} (Aze*cos + Azo*sin)(m\theta-n\zeta) T_l(s),
+        J*B^s = \partial_\theta A_\zeta - \partial_\zeta A_\theta, J*B^\theta = -\partial_s A_\zeta, J*B^\zeta = \partial_s A_\theta,
+    where T_l is the Chebyshev basis, or the Zernike basis in the volume with the coordinate singularity.
+    It is the NumPy counterpart of `pyoculus.problems.SPECBfield`, with `B`/`B_many` returning J*B^i as pyoculus, and `getB_points`/`getB_grid`
+    returning B^i with the Jacobian of `SPECOut.getCoordinates(lvol)`.
+    """
+
+    def __init__(self, specData: "SPECOut", lvol: int=0) -> None:
+        """
+        Args:
+            specData: the `mpy.SPECOut` class.
+            lvol: the number of the volume, starting from 0.
+        """
+        self.specData = specData
+        self.lvol = lvol
+        self.nfp = specData.input.physics.Nfp
+        self.mpol = int(specData.input.physics.Mpol)
+        self.lrad = int(np.atleast_1d(specData.input.physics.Lrad)[lvol])
+        self.stellsym = bool(specData.input.physics.Istellsym)
+        self.singular = (lvol == 0 and specData.input.physics.Igeometry >= 2)
+        self.im = np.atleast_1d(specData.output.im).astype(int)
+        self.in_ = np.atleast_1d(specData.output.in_).astype(float)
+        vectorPotential = specData.vector_potential
+        ate, aze = np.array(vectorPotential.Ate[lvol], dtype=float), np.array(vectorPotential.Aze[lvol], dtype=float)
+        ato, azo = np.array(vectorPotential.Ato[lvol], dtype=float), np.array(vectorPotential.Azo[lvol], dtype=float)
+        im, in_ = self.im.reshape(-1, 1), self.in_.reshape(-1, 1)
+        # the radial coefficients of J*B^s (with sin), J*B^theta and J*B^zeta (with cos), shape (mn, lrad+1)
+        self.coefficients = [-im*aze - in_*ate, -aze, ate]
+        if not self.stellsym:
+            # with cos, sin and sin
+            self.coefficients += [im*azo + in_*ato, -azo, ato]
+        # the modes sharing a radial basis, the Zernike basis depends on m
+        if self.singular:
+            self.groups = [(m, np.where(self.im == m)[0]) for m in np.unique(self.im)]
+        else:
+            self.groups = [(None, np.arange(self.im.size))]
+
+    def getRadial(self, sArr: np.ndarray) -> np.ndarray:
+        """
+        The radial parts of J*B^i of each mode at s.
+        return:
+            shape (3 or 6, mn, N), the order of `coefficients`
+        """
+        sArr = np.asarray(sArr, dtype=float).reshape(-1)
+        radial = np.empty((len(self.coefficients), self.im.size, sArr.size))
+        if self.singular:
+            zernike, zernike_r = getZernike(np.maximum((sArr+1)/2, 0), self.lrad, self.mpol)
+            # d/ds = d/dr / 2
+            bases = {m: (zernike[:, m], zernike_r[:, m]/2) for m, _ in self.groups}
+        else:
+            bases = {None: getChebyshev(sArr, self.lrad)}
+        for m, index in self.groups:
+            basis, basis_s = bases[m]
+            for i, coefficient in enumerate(self.coefficients):
+                # J*B^s uses the basis, J*B^theta and J*B^zeta use its derivative
+                radial[i, index] = np.dot(coefficient[index], basis if i%3 == 0 else basis_s)
+        return radial
+
+    def getAngle(self, thetaArr: np.ndarray, zetaArr: np.ndarray, cache: bool=False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            cache: cache the separable tables of the sample values, see `mpy.misc.TrigCache`. 
+        return:
+            cos, sin of (m*theta - n*zeta), shape (mn, N)
+        """
+        return getTrig(self.im, self.in_, thetaArr, zetaArr, cache=cache)
+
+    def getJB_points(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, chunkSize: int=16384) -> np.ndarray:
+        """
+        J*B^i at the points (sArr[i], thetaArr[i], zetaArr[i]).
+        return:
+            shape (N, 3)
+        """
+        sArr, thetaArr, zetaArr = np.broadcast_arrays(np.asarray(sArr, dtype=float), np.asarray(thetaArr, dtype=float), np.asarray(zetaArr, dtype=float))
+        sArr, thetaArr, zetaArr = sArr.reshape(-1), thetaArr.reshape(-1), zetaArr.reshape(-1)
+        field = np.empty((sArr.size, 3))
+        for start in range(0, sArr.size, chunkSize):
+            end = start + chunkSize
+            radial = self.getRadial(sArr[start:end])
+            cos, sin = self.getAngle(thetaArr[start:end], zetaArr[start:end])
+            field[start:end, 0] = np.sum(radial[0]*sin, axis=0)
+            field[start:end, 1] = np.sum(radial[1]*cos, axis=0)
+            field[start:end, 2] = np.sum(radial[2]*cos, axis=0)
+            if not self.stellsym:
+                field[start:end, 0] += np.sum(radial[3]*cos, axis=0)
+                field[start:end, 1] += np.sum(radial[4]*sin, axis=0)
+                field[start:end, 2] += np.sum(radial[5]*sin, axis=0)
+        return field
+
+    def getJB_grid(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> np.ndarray:
+        """
+        J*B^i on the tensor grid, the radial and the angular tables are computed once and contracted over the modes.
+        return:
+            shape (sArr.size, thetaArr.size, zetaArr.size, 3)
+        """
+        sArr, thetaArr, zetaArr = np.atleast_1d(sArr), np.atleast_1d(thetaArr), np.atleast_1d(zetaArr)
+        radial = self.getRadial(sArr)
+        cos, sin = getTrig_grid(self.im, self.in_, thetaArr, zetaArr)
+        cos, sin = cos.reshape(self.im.size, -1), sin.reshape(self.im.size, -1)
+        field = np.empty((sArr.size, thetaArr.size*zetaArr.size, 3))
+        field[:, :, 0] = np.dot(radial[0].T, sin)
+        field[:, :, 1] = np.dot(radial[1].T, cos)
+        field[:, :, 2] = np.dot(radial[2].T, cos)
+        if not self.stellsym:
+            field[:, :, 0] += np.dot(radial[3].T, cos)
+            field[:, :, 1] += np.dot(radial[4].T, sin)
+            field[:, :, 2] += np.dot(radial[5].T, sin)
+        return field.reshape(sArr.size, thetaArr.size, zetaArr.size, 3)
+
+    def B(self, coords: np.ndarray, *args) -> np.ndarray:
+        """
+        J*B^i at a point, as `pyoculus.problems.SPECBfield.B`.
+        Args:
+            coords: [s, theta, zeta]
+        """
+        return self.getJB_points(coords[0], coords[1], coords[2])[0]
+
+    def B_many(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, input1D: bool=True, *args) -> np.ndarray:
+        """
+        J*B^i at many points, as `pyoculus.problems.SPECBfield.B_many`.
+        return:
+            shape (N, 3) if input1D, else (sArr.size, thetaArr.size, zetaArr.size, 3) on the tensor grid
+        """
+        if input1D:
+            return self.getJB_points(sArr, thetaArr, zetaArr)
+        return self.getJB_grid(sArr, thetaArr, zetaArr)
+
+    def getJacobian_points(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> np.ndarray:
+        if not hasattr(self.specData, "getCoordinates"):
+            raise ValueError(
+                "The Jacobian at the points needs `mpy.SPECOut`, use `getB_grid` or `BeltramiProvider` with the interpolated Jacobian. "
+            )
+        return self.specData.getCoordinates(self.lvol).getJacobian(sArr, thetaArr, zetaArr)
+
+    def getB_points(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        return:
+            bSupS, bSupTheta, bSupZeta at the points (sArr[i], thetaArr[i], zetaArr[i])
+        """
+        field = self.getJB_points(sArr, thetaArr, zetaArr) / self.getJacobian_points(sArr, thetaArr, zetaArr)[:, np.newaxis]
+        return field[:, 0], field[:, 1], field[:, 2]
+
+    def getB_grid(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> np.ndarray:
+        """
+        The counterpart of `SPECout.get_B` on the tensor grid.
+        return:
+            shape (sArr.size, thetaArr.size, zetaArr.size, 3)
+        """
+        if hasattr(self.specData, "getCoordinates"):
+            R, R_s, R_theta, _, _, Z_s, Z_theta, _ = self.specData.getCoordinates(self.lvol).getRZ_grid(sArr, thetaArr, zetaArr)
+            jacobian = R * (R_theta*Z_s - R_s*Z_theta)
+        else:
+            jacobian = self.specData.jacobian(lvol=self.lvol, sarr=sArr, tarr=thetaArr, zarr=zetaArr)
+        return self.getJB_grid(sArr, thetaArr, zetaArr) / jacobian[..., np.newaxis]
+
+
+if __name__ == "__main__":
+    pass
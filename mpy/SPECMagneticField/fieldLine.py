@@ -6,6 +6,7 @@
 import h5py
 import numpy as np
 from .specField import SPECField
+from ..misc import profiler
 from typing import List
 
 
@@ -26,9 +27,10 @@ class FieldLine:
 
     @classmethod
     def getLine_tracing(cls, bField: SPECField, nZeta: int, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, **kwargs):
-        rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta = bField.getGrid()
-        rArr = bField.interpValue(baseData=rGrid, sValue=sArr, thetaValue=thetaArr, zetaValue=zetaArr)
-        zArr = bField.interpValue(baseData=zGrid, sValue=sArr, thetaValue=thetaArr, zetaValue=zetaArr)
+        with profiler.phase("FieldLine.getLine_tracing"):
+            rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta = bField.getGrid()
+            rArr = bField.interpValue(baseData=rGrid, sValue=sArr, thetaValue=thetaArr, zetaValue=zetaArr)
+            zArr = bField.interpValue(baseData=zGrid, sValue=sArr, thetaValue=thetaArr, zetaValue=zetaArr)
         return cls(
             nfp = bField.nfp, 
             nZeta = nZeta,
@@ -62,7 +64,7 @@ class FieldLine:
         )
 
     def writeH5(self, h5File: str) -> None:
-        with h5py.File(h5File, 'w') as f:
+        with profiler.phase("writeH5"), h5py.File(h5File, 'w') as f:
             f.create_dataset("grid", data=np.array([self.nfp, self.nZeta]))
             f.create_dataset("sArr", data=self.sArr)
             f.create_dataset("thetaArr", data=self.thetaArr) 
@@ -4,53 +4,62 @@
 
 
 import numpy as np
-import matplotlib.pyplot as plt
 from .fieldLine import FieldLine
-from typing import List
+from ..misc import plotDensity
+from typing import List, Tuple
 
 
-def plotPoincare(lines: List[FieldLine], toroidalIdx: int=0, ax=None, **kwargs):
+def getPuncture(line: FieldLine, toroidalIdx: int=0) -> Tuple[np.ndarray]:
+    """
+    The points of the field line on the toroidal section, the crossings are linearly interpolated if the line is not traced with equal zeta steps. 
+    return:
+        rArr, zArr
+    """
+    rArr, zArr = np.asarray(line.rArr), np.asarray(line.zArr)
+    if line.equalZeta:
+        return rArr[toroidalIdx%line.nZeta::line.nZeta], zArr[toroidalIdx%line.nZeta::line.nZeta]
+    zetaPeriod = 2*np.pi/line.nfp
+    # zetaPeriod = 2 * np.pi
+    zetaArr = np.asarray(line.zetaArr)
+    zeta0, zeta1 = zetaArr[:-1], zetaArr[1:]
+    period0, period1 = zeta0//zetaPeriod, zeta1//zetaPeriod
+    forward = period0+1 == period1
+    backward = period0-1 == period1
+    # weights of the points before and after the crossing
+    weight0 = np.where(forward, zeta1%zetaPeriod, zetaPeriod-zeta1%zetaPeriod)
+    weight1 = np.where(forward, zetaPeriod-zeta0%zetaPeriod, zeta0%zetaPeriod)
+    cross = forward | backward
+    weight0, weight1, length = weight0[cross], weight1[cross], np.abs(zeta1-zeta0)[cross]
+    rCross = (rArr[:-1][cross]*weight0 + rArr[1:][cross]*weight1) / length
+    zCross = (zArr[:-1][cross]*weight0 + zArr[1:][cross]*weight1) / length
+    return rCross, zCross
+
+
+def plotPoincare(lines: List[FieldLine], toroidalIdx: int=0, ax=None, density: bool=False, bins: int=512, maxPoints: int=None, **kwargs):
+    """
+    Args:
+        density: bin the points of all the lines into a 2D histogram drawn as a single image, for many lines.
+        bins, maxPoints: the number of bins and the maximum number of binned points in the density mode, see `mpy.misc.plotDensity`.
+    """
 
     if ax is None:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
-    plt.sca(ax)
+    punctures = [getPuncture(line, toroidalIdx) for line in lines]
+    if density:
+        rArr = np.concatenate([puncture[0] for puncture in punctures])
+        zArr = np.concatenate([puncture[1] for puncture in punctures])
+        plotDensity(ax, rArr, zArr, bins=bins, maxPoints=maxPoints, **kwargs)
+        ax.axis("equal")
+        return
     if kwargs.get("marker") == None:
         kwargs.update({"marker": "."})
     if kwargs.get("s") == None:
         kwargs.update({"s": 1.4})
 
-    for line in lines:
-        rArr = list()
-        zArr = list()
-        if line.equalZeta:
-            for i in range(len(line.rArr)):
-                if (i-toroidalIdx) % line.nZeta == 0:
-                    rArr.append(line.rArr[i])
-                    zArr.append(line.zArr[i])
-        else:
-            zetaPeriod = 2*np.pi/line.nfp
-            # zetaPeriod = 2 * np.pi
-            for i in range(len(line.zetaArr)-1):
-                if line.zetaArr[i]//zetaPeriod+1 == line.zetaArr[i+1]//zetaPeriod:
-                    rArr.append(
-                        ((line.rArr[i] * (line.zetaArr[i+1]%zetaPeriod)) + (line.rArr[i+1]) * (zetaPeriod-line.zetaArr[i]%zetaPeriod))
-                        / (line.zetaArr[i+1] - line.zetaArr[i])
-                    )
-                    zArr.append(
-                        ((line.zArr[i] * (line.zetaArr[i+1]%zetaPeriod)) + (line.zArr[i+1]) * (zetaPeriod-line.zetaArr[i]%zetaPeriod))
-                        / (line.zetaArr[i+1] - line.zetaArr[i])
-                    )
-                elif line.zetaArr[i]//zetaPeriod-1 == line.zetaArr[i+1]//zetaPeriod: 
-                    rArr.append(
-                        ((line.rArr[i+1] * (line.zetaArr[i]%zetaPeriod)) + (line.rArr[i]) * (zetaPeriod-line.zetaArr[i+1]%zetaPeriod))
-                        / (line.zetaArr[i] - line.zetaArr[i+1])
-                    )
-                    zArr.append(
-                        ((line.zArr[i+1] * (line.zetaArr[i]%zetaPeriod)) + (line.zArr[i]) * (zetaPeriod-line.zetaArr[i+1]%zetaPeriod))
-                        / (line.zetaArr[i] - line.zetaArr[i+1])
-                    )
+    for rArr, zArr in punctures:
         dots = ax.scatter(rArr, zArr, **kwargs)
-    plt.axis("equal")
+    ax.axis("equal")
 
     return
 
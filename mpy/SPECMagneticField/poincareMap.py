@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# poincareMap.py
+
+
+import os
+import json
+import h5py
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.interpolate import RectBivariateSpline
+from .specField import SPECField, deltaS
+from .analyticField import AnalyticField
+from .fieldLine import FieldLine
+from .provider import getProvider
+from .tracing import _traceLockstep
+from ..misc import print_progress, profiler
+from typing import List, Dict, Tuple
+
+
+def _getFileKey(fileName: str) -> List:
+    """
+    The path, size and modification time of the file.
+    """
+    if fileName is None or not os.path.exists(fileName):
+        return [fileName]
+    stat = os.stat(fileName)
+    return [os.path.abspath(fileName), stat.st_size, stat.st_mtime_ns]
+
+
+def _getFieldKey(bField: SPECField, bMethod: str="calculate", bData: str=None, jacobianData: str=None) -> List:
+    """
+    The description of the field in the cache key, the SPEC output file and the volume, or the parameters of `AnalyticField`, 
+    the files `bData` and `jacobianData`, and the grid of the field (sizes and bounds) if the provider interpolates on it.
+    """
+    if isinstance(bField, AnalyticField):
+        fieldKey = [type(bField).__name__, bField.nfp, bField.majorRadius, bField.minorRadius, bField.elongation,
+            bField.triangularity, list(bField.iota), bField.islands, bField.b0]
+        if bMethod != "interpolate":
+            return fieldKey
+    else:
+        fieldKey = [type(bField).__name__, bField.nfp, bField.lvol] + _getFileKey(getattr(bField.specData, "filename", None))
+    if bMethod == "interpolate":
+        useGrid = bData is None
+    else:
+        useGrid = jacobianData is None and not hasattr(bField.specData, "getCoordinates")
+    gridKey = list()
+    if useGrid:
+        for arr in (bField.sArr, bField.thetaArr, bField.zetaArr):
+            gridKey.append([arr.size, float(arr[0]), float(arr[-1])])
+    return [fieldKey, gridKey, 
+        _getFileKey(bData) if bMethod == "interpolate" and bData is not None else None, 
+        _getFileKey(jacobianData) if bMethod != "interpolate" and jacobianData is not None else None]
+
+
+def _traceChunk(bField: SPECField, settings: Dict, s0: np.ndarray, theta0: np.ndarray, provider=None) -> Tuple[np.ndarray]:
+    """
+    Trace the lines from (s0, theta0, zeta0) over one period, in lockstep.
+    return:
+        sArr, thetaArr at zeta0 + 2*pi/nfp (theta is not wrapped)
+    """
+    if provider is None:
+        provider = getProvider(bField, settings["bMethod"], bData=settings["bData"], jacobianData=settings["jacobianData"])
+    zeta0 = np.full(len(s0), settings["zeta0"])
+    points = _traceLockstep(provider, bField.nfp, s0, theta0, zeta0, 1, settings["nstep"], False, None, **settings["kwargs"])
+    return np.array([sArr[-1] for sArr, _, _ in points]), np.array([thetaArr[-1] for _, thetaArr, _ in points])
+
+
+class PoincareMap:
+    r"""
+    The one-period return map (s, \theta) -> (s', \theta') of the field lines on the section \zeta = \zeta_0, tabulated on a grid
+    of (s, \theta) by tracing one period from each node, and interpolated by bicubic splines of
+        s' - s and \theta' - \theta,
+    which are smooth and periodic in \theta. Iterating the map is then a few vectorized spline evaluations per period for
+    all the lines, instead of integrating the field along each period:
+        poincareMap = PoincareMap.fromField(bField, h5File="map.h5", nprocess=8)
+        lines = poincareMap.getLines(bField, s0, theta0, niter=10000)
+        plotPoincare(lines)
+    The error of the map grows with the number of periods, use `estimateError` to compare it with the direct tracing.
+    """
+
+    def __init__(self, nfp: int, zeta0: float, sArr: np.ndarray, thetaArr: np.ndarray, deltaS: np.ndarray, deltaTheta: np.ndarray,
+    settings: Dict=dict(), key: str=None) -> None:
+        """
+        Args:
+            nfp: the number of field periods.
+            zeta0: the toroidal angle of the section.
+            sArr: the s of the nodes, increasing.
+            thetaArr: the theta of the nodes, 2*pi*j/N, j = 0, ..., N-1.
+            deltaS, deltaTheta: s'-s and theta'-theta of the nodes, shape (sArr.size, thetaArr.size).
+            settings: the settings of the tracing, see `tabulate`.
+            key: the key of the field and the settings, see `fromField`.
+        """
+        self.nfp = nfp
+        self.zeta0 = zeta0
+        self.sArr = np.asarray(sArr, dtype=float)
+        self.thetaArr = np.asarray(thetaArr, dtype=float)
+        self.deltaS = np.asarray(deltaS, dtype=float)
+        self.deltaTheta = np.asarray(deltaTheta, dtype=float)
+        self.settings = settings
+        self.key = key
+        # periodic extension in theta, so that the splines are smooth across theta = 0
+        pad = 3
+        thetaExt = np.concatenate((self.thetaArr[-pad:]-2*np.pi, self.thetaArr, self.thetaArr[:pad]+2*np.pi))
+        self.sSpline = RectBivariateSpline(self.sArr, thetaExt, np.concatenate((self.deltaS[:, -pad:], self.deltaS, self.deltaS[:, :pad]), axis=1))
+        self.thetaSpline = RectBivariateSpline(self.sArr, thetaExt, np.concatenate((self.deltaTheta[:, -pad:], self.deltaTheta, self.deltaTheta[:, :pad]), axis=1))
+
+    @classmethod
+    def tabulate(
+        cls, bField: SPECField,
+        sResolution: int=64, thetaResolution: int=128, zeta0: float=0.0, sRange: Tuple[float, float]=(-1+deltaS, 1-deltaS),
+        nstep: int=8, bMethod: str="calculate", bData: str=None, jacobianData: str=None,
+        nprocess: int=None, chunkSize: int=256, printControl: bool=True, **kwargs
+    ):
+        """
+        Trace one period from each node of the grid, the nodes are traced in lockstep by chunks.
+        Args:
+            bField: the field.
+            sResolution, thetaResolution: the number of nodes in s and theta.
+            zeta0: the toroidal angle of the section.
+            sRange: the range of s of the nodes.
+            nstep, bMethod, bData, jacobianData, kwargs: the settings of the tracing, see `traceLine`.
+            nprocess: the number of worker processes, None, trace in this process. `bField` is sent to the workers.
+            chunkSize: the number of lines traced together.
+        """
+        if kwargs.get("method") is None:
+            kwargs.update({"method": "LSODA"})
+        if kwargs.get("rtol") is None:
+            kwargs.update({"rtol": 1e-10})
+        settings = {"zeta0": zeta0, "nstep": nstep, "bMethod": bMethod, "bData": bData, "jacobianData": jacobianData, "kwargs": kwargs}
+        sArr = np.linspace(sRange[0], sRange[1], sResolution)
+        thetaArr = 2*np.pi*np.arange(thetaResolution)/thetaResolution
+        sGrid, thetaGrid = np.meshgrid(sArr, thetaArr, indexing="ij")
+        s0, theta0 = sGrid.ravel(), thetaGrid.ravel()
+        chunks = [slice(start, start+chunkSize) for start in range(0, s0.size, chunkSize)]
+        sEnd, thetaEnd = np.empty_like(s0), np.empty_like(theta0)
+        if printControl:
+            print("Tabulate the Poincare map: ")
+        with profiler.phase("PoincareMap.tabulate"):
+            if nprocess is None or nprocess <= 1:
+                provider = getProvider(bField, bMethod, bData=bData, jacobianData=jacobianData)
+                for i, chunk in enumerate(chunks):
+                    sEnd[chunk], thetaEnd[chunk] = _traceChunk(bField, settings, s0[chunk], theta0[chunk], provider=provider)
+                    if printControl:
+                        print_progress(i+1, len(chunks))
+            else:
+                with ProcessPoolExecutor(max_workers=nprocess) as executor:
+                    futures = [executor.submit(_traceChunk, bField, settings, s0[chunk], theta0[chunk]) for chunk in chunks]
+                    for i, (chunk, future) in enumerate(zip(chunks, futures)):
+                        sEnd[chunk], thetaEnd[chunk] = future.result()
+                        if printControl:
+                            print_progress(i+1, len(chunks))
+        return cls(
+            bField.nfp, zeta0, sArr, thetaArr,
+            (sEnd-s0).reshape(sGrid.shape), (thetaEnd-theta0).reshape(sGrid.shape),
+            settings=settings
+        )
+
+    @classmethod
+    def fromField(cls, bField: SPECField, h5File: str=None, force: bool=False, **kwargs):
+        """
+        `tabulate` the map, or read it from `h5File` if the file was written for the same field and settings.
+        Args:
+            h5File: the cache of the map, written after the tabulation.
+            force: tabulate the map even if the cache is valid.
+            kwargs: the arguments of `tabulate`.
+        """
+        keyArgs = {name: value for name, value in kwargs.items() if name not in ("nprocess", "chunkSize", "printControl")}
+        fieldKey = _getFieldKey(bField, kwargs.get("bMethod", "calculate"), bData=kwargs.get("bData"), jacobianData=kwargs.get("jacobianData"))
+        content = json.dumps([fieldKey, keyArgs], sort_keys=True, default=str)
+        key = hashlib.sha1(content.encode()).hexdigest()
+        if h5File is not None and os.path.exists(h5File) and not force:
+            with h5py.File(h5File, 'r') as f:
+                valid = f.attrs.get("key") == key
+            if valid:
+                return cls.readH5(h5File)
+        poincareMap = cls.tabulate(bField, **kwargs)
+        poincareMap.key = key
+        if h5File is not None:
+            poincareMap.writeH5(h5File)
+        return poincareMap
+
+    @classmethod
+    def readH5(cls, h5File: str):
+        with h5py.File(h5File, 'r') as f:
+            nfp = int(f["grid"][0])
+            zeta0 = float(f["grid"][1])
+            sArr = f["sArr"][:]
+            thetaArr = f["thetaArr"][:]
+            deltaS = f["deltaS"][:]
+            deltaTheta = f["deltaTheta"][:]
+            settings = json.loads(f.attrs.get("settings", "{}"))
+            key = f.attrs.get("key")
+        return cls(nfp, zeta0, sArr, thetaArr, deltaS, deltaTheta, settings=settings, key=key)
+
+    def writeH5(self, h5File: str) -> None:
+        with profiler.phase("writeH5"), h5py.File(h5File, 'w') as f:
+            f.create_dataset("grid", data=np.array([self.nfp, self.zeta0]))
+            f.create_dataset("sArr", data=self.sArr)
+            f.create_dataset("thetaArr", data=self.thetaArr)
+            f.create_dataset("deltaS", data=self.deltaS)
+            f.create_dataset("deltaTheta", data=self.deltaTheta)
+            f.attrs["settings"] = json.dumps(self.settings, default=str)
+            if self.key is not None:
+                f.attrs["key"] = self.key
+
+    def __call__(self, sArr: np.ndarray, thetaArr: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        One period of the map, s is kept in the range of the table.
+        return:
+            sArr, thetaArr (not wrapped)
+        """
+        sArr = np.clip(sArr, self.sArr[0], self.sArr[-1])
+        thetaMod = np.mod(thetaArr, 2*np.pi)
+        return (
+            np.clip(sArr + self.sSpline.ev(sArr, thetaMod), self.sArr[0], self.sArr[-1]),
+            thetaArr + self.thetaSpline.ev(sArr, thetaMod)
+        )
+
+    def iterate(self, s0: np.ndarray, theta0: np.ndarray, niter: int=1024) -> Tuple[np.ndarray]:
+        """
+        return:
+            sArr, thetaArr of the lines on the section, shape (len(s0), niter+1)
+        """
+        s0, theta0 = np.atleast_1d(np.asarray(s0, dtype=float)), np.atleast_1d(np.asarray(theta0, dtype=float))
+        assert s0.shape == theta0.shape
+        sArr = np.empty((s0.size, niter+1))
+        thetaArr = np.empty((s0.size, niter+1))
+        sArr[:, 0], thetaArr[:, 0] = s0, theta0
+        with profiler.phase("PoincareMap.iterate"):
+            for j in range(niter):
+                sArr[:, j+1], thetaArr[:, j+1] = self(sArr[:, j], thetaArr[:, j])
+        return sArr, thetaArr
+
+    def getLines(self, bField: SPECField, s0: np.ndarray, theta0: np.ndarray, niter: int=1024) -> List[FieldLine]:
+        """
+        The iterated points as field lines with one point per period, for `plotPoincare`.
+        """
+        sArr, thetaArr = self.iterate(s0, theta0, niter=niter)
+        zetaArr = self.zeta0 + 2*np.pi/self.nfp*np.arange(niter+1)
+        return [FieldLine.getLine_tracing(bField, 1, sArr[i], thetaArr[i], zetaArr) for i in range(len(sArr))]
+
+    def estimateError(self, bField: SPECField, nSample: int=64, niter: int=8, seed: int=0, **kwargs) -> Dict:
+        """
+        Compare the map with the direct tracing (lockstep, with the settings of the tabulation) from random points in the table.
+        Args:
+            nSample: the number of the lines.
+            niter: the number of periods.
+            kwargs: override the settings of the tracing.
+        return:
+            {"sError": (niter,), "thetaError": (niter,)} the maximum errors over the lines after each period,
+            and "sRMS", "thetaRMS" the root mean squares
+        """
+        settings = dict(self.settings)
+        settings.update({name: kwargs.pop(name) for name in ("nstep", "bMethod", "bData", "jacobianData") if name in kwargs})
+        settings["kwargs"] = dict(settings.get("kwargs", dict()), **kwargs)
+        rng = np.random.default_rng(seed)
+        s0 = rng.uniform(self.sArr[0], self.sArr[-1], nSample)
+        theta0 = rng.uniform(0, 2*np.pi, nSample)
+        provider = getProvider(bField, settings["bMethod"], bData=settings["bData"], jacobianData=settings["jacobianData"])
+        nstep = settings["nstep"]
+        points = _traceLockstep(provider, self.nfp, s0, theta0, np.full(nSample, self.zeta0), niter, nstep, False, None, **settings["kwargs"])
+        sTrace = np.array([sArr[nstep::nstep] for sArr, _, _ in points])
+        thetaTrace = np.array([thetaArr[nstep::nstep] for _, thetaArr, _ in points])
+        sMap, thetaMap = self.iterate(s0, theta0, niter=niter)
+        sError = np.abs(sMap[:, 1:] - sTrace)
+        thetaError = np.abs(thetaMap[:, 1:] - thetaTrace)
+        return {
+            "sError": sError.max(axis=0),
+            "thetaError": thetaError.max(axis=0),
+            "sRMS": np.sqrt(np.mean(sError**2, axis=0)),
+            "thetaRMS": np.sqrt(np.mean(thetaError**2, axis=0))
+        }
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pointIndex.py
+
+
+import h5py
+import numpy as np
+from scipy.spatial import cKDTree
+from .specField import SPECField
+from typing import List, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from ..specOut import SPECOut
+
+
+class SPECPointIndex:
+    """
+    Spatial index over the (R, Z) grids of all the volumes, one KD-tree per toroidal plane!
+    Locate the volume and the approximate (s, theta) of cylindrical points in O(log n).
+    """
+
+    def __init__(self, nfp: int, lvolArr: np.ndarray, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray,
+    rGrid: np.ndarray, zGrid: np.ndarray, specData: "SPECOut"=None) -> None:
+        """
+        Args:
+            nfp: the number of field periods.
+            lvolArr: the numbers of the volumes.
+            sArr, thetaArr, zetaArr: the grid in each volume.
+            rGrid, zGrid: the coordinates of the grid, shape (lvolArr.size, sArr.size, thetaArr.size, zetaArr.size).
+            specData: the `mpy.SPECOut`, needed by `cylinder2spec`.
+        """
+        assert rGrid.shape == zGrid.shape == (lvolArr.size, sArr.size, thetaArr.size, zetaArr.size)
+        self.nfp = nfp
+        self.lvolArr = lvolArr
+        self.sArr = sArr
+        self.thetaArr = thetaArr
+        self.zetaArr = zetaArr
+        self.rGrid = rGrid
+        self.zGrid = zGrid
+        self.specData = specData
+        self._trees = dict()
+
+    @classmethod
+    def getIndex(cls, specData: "SPECOut", lvolList: List[int]=None,
+    sResolution: int=16, thetaResolution: int=64, zetaResolution: int=32, writeH5: str=None):
+        """
+        Build the index from `SPECField.getGrid` of the volumes in `lvolList` (default: all the volumes).
+        """
+        if lvolList is None:
+            lvolList = range(specData.input.physics.Nvol)
+        lvolArr = np.array(lvolList, dtype=int)
+        rGrid, zGrid = list(), list()
+        for lvol in lvolArr:
+            bField = SPECField(specData, lvol, sResolution=sResolution, thetaResolution=thetaResolution, zetaResolution=zetaResolution)
+            grid = bField.getGrid()
+            rGrid.append(grid[0])
+            zGrid.append(grid[4])
+        index = cls(
+            nfp = bField.nfp,
+            lvolArr = lvolArr,
+            sArr = bField.sArr,
+            thetaArr = bField.thetaArr,
+            zetaArr = bField.zetaArr,
+            rGrid = np.array(rGrid),
+            zGrid = np.array(zGrid),
+            specData = specData
+        )
+        if writeH5 is not None:
+            index.writeH5(writeH5)
+        return index
+
+    @classmethod
+    def readH5(cls, h5File: str, specData: "SPECOut"=None):
+        with h5py.File(h5File, 'r') as f:
+            nfp = int(f["nfp"][()])
+            lvolArr = f["lvolArr"][:]
+            sArr = f["sArr"][:]
+            thetaArr = f["thetaArr"][:]
+            zetaArr = f["zetaArr"][:]
+            rGrid = f["rGrid"][:]
+            zGrid = f["zGrid"][:]
+        return cls(nfp, lvolArr, sArr, thetaArr, zetaArr, rGrid, zGrid, specData=specData)
+
+    def writeH5(self, h5File: str) -> None:
+        with h5py.File(h5File, 'w') as f:
+            f.create_dataset("nfp", data=self.nfp)
+            f.create_dataset("lvolArr", data=self.lvolArr)
+            f.create_dataset("sArr", data=self.sArr)
+            f.create_dataset("thetaArr", data=self.thetaArr)
+            f.create_dataset("zetaArr", data=self.zetaArr)
+            f.create_dataset("rGrid", data=self.rGrid)
+            f.create_dataset("zGrid", data=self.zGrid)
+
+    def _getTree(self, zetaIdx: int) -> cKDTree:
+        if zetaIdx not in self._trees:
+            points = np.stack((self.rGrid[:,:,:,zetaIdx].flatten(), self.zGrid[:,:,:,zetaIdx].flatten()), axis=-1)
+            self._trees[zetaIdx] = cKDTree(points)
+        return self._trees[zetaIdx]
+
+    def query(self, r: np.ndarray, phi: np.ndarray, z: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        Find the nearest grid point in the nearest toroidal plane.
+        Returns:
+            lvol, s, theta, zeta, distance
+        """
+        r, phi, z = np.asarray(r, dtype=float), np.asarray(phi, dtype=float), np.asarray(z, dtype=float)
+        assert r.shape == phi.shape == z.shape
+        shape = r.shape
+        r, phi, z = r.flatten(), phi.flatten(), z.flatten()
+        period = 2*np.pi / self.nfp
+        dZeta = (self.zetaArr[-1]-self.zetaArr[0]) / (self.zetaArr.size-1)
+        zetaIdx = np.rint(((phi-self.zetaArr[0]) % period) / dZeta).astype(int)
+        # the last plane is the first plane of the next period if the grid covers a whole period
+        if abs(self.zetaArr[-1]-self.zetaArr[0]-period) < 1e-12:
+            zetaIdx[zetaIdx == self.zetaArr.size-1] = 0
+        zetaIdx = np.minimum(zetaIdx, self.zetaArr.size-1)
+        distance = np.empty(r.size)
+        flatIdx = np.empty(r.size, dtype=int)
+        for k in np.unique(zetaIdx):
+            mask = (zetaIdx == k)
+            distance[mask], flatIdx[mask] = self._getTree(k).query(np.stack((r[mask], z[mask]), axis=-1))
+        volIdx, sIdx, thetaIdx = np.unravel_index(flatIdx, self.rGrid.shape[:3])
+        return (
+            self.lvolArr[volIdx].reshape(shape),
+            self.sArr[sIdx].reshape(shape),
+            (self.thetaArr[thetaIdx] % (2*np.pi)).reshape(shape),
+            phi.reshape(shape),
+            distance.reshape(shape)
+        )
+
+    def cylinder2spec(self, r: np.ndarray, phi: np.ndarray, z: np.ndarray, sTol: float=1e-6, **kwargs) -> Tuple[np.ndarray]:
+        """
+        Use the index as the initial guess of `SPECOut.cylinder2spec_newton`, volume by volume.
+        The nearest grid point may be in the neighbouring volume near the interfaces, the points converged with s > 1 (s < -1)
+        are solved again in the next (previous) volume of the index, and are not converged if no volume contains them.
+        Args:
+            sTol: the tolerance of |s| <= 1.
+            kwargs: the arguments of `SPECOut.cylinder2spec_newton`.
+        Returns:
+            lvol, s, theta, zeta, converged
+        """
+        if self.specData is None:
+            raise ValueError("`specData` is needed to compute the SPEC coordinates. ")
+        lvol, s, theta, zeta, _ = self.query(r, phi, z)
+        r, phi, z = np.asarray(r, dtype=float), np.asarray(phi, dtype=float), np.asarray(z, dtype=float)
+        shape = r.shape
+        lvol, s, theta, zeta = lvol.flatten(), s.flatten(), theta.flatten(), zeta.flatten()
+        r, phi, z = r.flatten(), phi.flatten(), z.flatten()
+        converged = np.zeros(r.size, dtype=bool)
+        pending = np.arange(r.size)
+        for attempt in range(self.lvolArr.size):
+            for ivol in np.unique(lvol[pending]):
+                index = pending[lvol[pending] == ivol]
+                s[index], theta[index], zeta[index], converged[index] = self.specData.cylinder2spec_newton(
+                    ivol, r[index], phi[index], z[index], sInit=s[index], thetaInit=theta[index], **kwargs
+                )
+            outside = converged[pending] & (np.abs(s[pending]) > 1 + sTol)
+            pending = pending[outside]
+            converged[pending] = False
+            step = np.where(s[pending] > 1, 1, -1)
+            inside = np.isin(lvol[pending]+step, self.lvolArr)
+            pending, step = pending[inside], step[inside]
+            if pending.size == 0 or attempt == self.lvolArr.size-1:
+                break
+            lvol[pending] += step
+            s[pending] = -0.99 * step
+        return lvol.reshape(shape), s.reshape(shape), theta.reshape(shape), zeta.reshape(shape), converged.reshape(shape)
+
+
+if __name__ == "__main__":
+    pass
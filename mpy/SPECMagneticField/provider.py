@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# provider.py
+
+
+import abc
+import numpy as np
+from scipy.interpolate import interpn
+from .specField import SPECField
+from .analyticField import AnalyticField
+from .beltrami import BeltramiField
+from .readData import readB, readJacobian
+from ..misc import profiler
+from typing import Tuple
+
+
+class FieldProvider(abc.ABC):
+    """
+    The magnetic field used by the tracers, evaluated in batch!
+    A provider implements `evaluate(points) -> bSupS, bSupTheta, bSupZeta`, where `points` has the shape (N, 3) of (s, theta, zeta),
+    and the returned components have the shape (N,). A subclass without `evaluate` cannot be instantiated.
+    """
+
+    def __init__(self, nfp: int) -> None:
+        self.nfp = nfp
+
+    @abc.abstractmethod
+    def evaluate(self, points: np.ndarray) -> Tuple[np.ndarray]:
+        pass
+
+    def _count(self, points: np.ndarray) -> None:
+        profiler.count("fieldEvaluation")
+        profiler.count("fieldPoint", len(points))
+
+    def _wrap(self, points: np.ndarray) -> np.ndarray:
+        """
+        Map the angles into one period, as `SPECField.interpValue`.
+        """
+        points = np.array(points, dtype=float).reshape(-1, 3)
+        points[:, 1] %= 2*np.pi
+        points[:, 2] %= 2*np.pi/self.nfp
+        return points
+
+
+class GridProvider(FieldProvider):
+    """
+    Interpolate the field on the (s, theta, zeta) grid, the three components in one `interpn` call.
+    """
+
+    def __init__(self, nfp: int, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray,
+    bSupS: np.ndarray, bSupTheta: np.ndarray, bSupZeta: np.ndarray) -> None:
+        super().__init__(nfp)
+        self.grid = (sArr, thetaArr, zetaArr)
+        self.values = np.stack((bSupS, bSupTheta, bSupZeta), axis=-1)
+
+    @classmethod
+    def fromField(cls, bField: SPECField):
+        """
+        Use `bField.getB()` on the current grid of the field.
+        """
+        bSupS, bSupTheta, bSupZeta = bField.getB()
+        return cls(bField.nfp, bField.sArr, bField.thetaArr, bField.zetaArr, bSupS, bSupTheta, bSupZeta)
+
+    @classmethod
+    def readH5(cls, nfp: int, bData: str):
+        """
+        Read the file written by `SPECField.getB(writeH5)`.
+        """
+        return cls(nfp, *readB(bData))
+
+    def getKernelGrid(self) -> Tuple:
+        """
+        The grid should be uniform and cover one period in theta and zeta (with the endpoints), as the grids of `SPECField`.
+        return:
+            datas, origin, spacing, periodic of `mpy.misc.traceGrid`
+        """
+        spacing = list()
+        for arr, period in zip(self.grid, (None, 2*np.pi, 2*np.pi/self.nfp)):
+            step = (arr[-1]-arr[0]) / (arr.size-1)
+            if not np.allclose(np.diff(arr), step):
+                raise ValueError(
+                    "The kernels need a uniform grid. "
+                )
+            if period is not None and abs(arr[-1]-arr[0]-period) > 1e-10:
+                raise ValueError(
+                    "The grids of theta and zeta should cover one period with the endpoints. "
+                )
+            spacing.append(step)
+        origin = np.array([arr[0] for arr in self.grid])
+        return self.values, origin, np.array(spacing), np.array([False, True, True])
+
+    def evaluate(self, points: np.ndarray) -> Tuple[np.ndarray]:
+        points = self._wrap(points)
+        self._count(points)
+        profiler.count("interpolation")
+        with profiler.phase("provider.interpolation"):
+            field = interpn(self.grid, self.values, points)
+        return field[:, 0], field[:, 1], field[:, 2]
+
+
+class _JacobianProvider(FieldProvider):
+    """
+    The providers dividing J*B by the Jacobian, which is evaluated at the points from the Fourier coefficients of the interfaces 
+    (`SPECOut.getCoordinates(lvol).getJacobian`), so that no grid is needed, or interpolated on a grid 
+    (`jacobianData`, or `pyspec.SPECout` without `getCoordinates`).
+    """
+
+    def _initJacobian(self, bField: SPECField, jacobianData: str=None, pointwiseJacobian: bool=True) -> None:
+        """
+        Args:
+            bField: the field, `bField.getJacobian()` on its current grid is used if the Jacobian is interpolated and `jacobianData` is None.
+            jacobianData: the file written by `SPECField.getJacobian(writeH5)`.
+            pointwiseJacobian: evaluate the Jacobian at the points if `jacobianData` is None. 
+        """
+        self.coordinates = None
+        if jacobianData is not None:
+            sArr, thetaArr, zetaArr, self.jacobian = readJacobian(jacobianData)
+            self.grid = (sArr, thetaArr, zetaArr)
+        elif pointwiseJacobian and hasattr(bField.specData, "getCoordinates"):
+            self.coordinates = bField.specData.getCoordinates(bField.lvol)
+        else:
+            self.grid = (bField.sArr, bField.thetaArr, bField.zetaArr)
+            self.jacobian = bField.getJacobian()
+
+    def getJacobian(self, points: np.ndarray) -> np.ndarray:
+        if self.coordinates is not None:
+            with profiler.phase("provider.jacobian"):
+                return self.coordinates.getJacobian(points[:, 0], points[:, 1], points[:, 2])
+        profiler.count("interpolation")
+        with profiler.phase("provider.interpolation"):
+            return interpn(self.grid, self.jacobian, points)
+
+
+class PyoculusProvider(_JacobianProvider):
+    """
+    Compute the field with `pyoculus.problems.SPECBfield.B_many`, divided by the Jacobian, see `_JacobianProvider` for the Jacobian.
+    """
+
+    def __init__(self, bField: SPECField, jacobianData: str=None, pointwiseJacobian: bool=True) -> None:
+        from pyoculus.problems import SPECBfield
+        super().__init__(bField.nfp)
+        self.pyoculusField = SPECBfield(bField.specData, bField.lvol+1)
+        self._initJacobian(bField, jacobianData=jacobianData, pointwiseJacobian=pointwiseJacobian)
+
+    def evaluate(self, points: np.ndarray) -> Tuple[np.ndarray]:
+        points = self._wrap(points)
+        self._count(points)
+        with profiler.phase("provider.pyoculus"):
+            field = self.pyoculusField.B_many(points[:, 0], points[:, 1], points[:, 2])
+        field = np.reshape(field, (-1, 3)) / self.getJacobian(points)[:, np.newaxis]
+        return field[:, 0], field[:, 1], field[:, 2]
+
+
+class BeltramiProvider(_JacobianProvider):
+    """
+    The exact field of `BeltramiField`, the NumPy evaluation of the SPEC vector potential without pyoculus, 
+    divided by the Jacobian, see `_JacobianProvider` for the Jacobian.
+    """
+
+    def __init__(self, bField: SPECField, jacobianData: str=None, pointwiseJacobian: bool=True) -> None:
+        super().__init__(bField.nfp)
+        self.beltramiField = BeltramiField(bField.specData, bField.lvol)
+        self._initJacobian(bField, jacobianData=jacobianData, pointwiseJacobian=pointwiseJacobian)
+
+    def evaluate(self, points: np.ndarray) -> Tuple[np.ndarray]:
+        points = self._wrap(points)
+        self._count(points)
+        with profiler.phase("provider.beltrami"):
+            field = self.beltramiField.getJB_points(points[:, 0], points[:, 1], points[:, 2])
+        field = field / self.getJacobian(points)[:, np.newaxis]
+        return field[:, 0], field[:, 1], field[:, 2]
+
+
+class AnalyticProvider(FieldProvider):
+    """
+    The exact field of `AnalyticField`.
+    """
+
+    def __init__(self, bField: AnalyticField) -> None:
+        super().__init__(bField.nfp)
+        self.bField = bField
+
+    def evaluate(self, points: np.ndarray) -> Tuple[np.ndarray]:
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        self._count(points)
+        with profiler.phase("provider.analytic"):
+            return self.bField.getB_points(points[:, 0], points[:, 1], points[:, 2])
+
+
+def hasPyoculus() -> bool:
+    try:
+        import pyoculus
+    except ImportError:
+        return False
+    return True
+
+
+def getProvider(bField: SPECField, bMethod: str="calculate", bData: str=None, jacobianData: str=None, pointwiseJacobian: bool=True) -> FieldProvider:
+    """
+    The provider of the tracers.
+    Args:
+        bField: the field.
+        bMethod: `"calculate"`, the exact field (`AnalyticProvider` for `AnalyticField`, else `PyoculusProvider`, 
+            or `BeltramiProvider` if pyoculus is not installed); `"native"`, `BeltramiProvider`; 
+            `"interpolate"`, `GridProvider` of `bData` or of `bField.getB()` on the current grid.
+        jacobianData, pointwiseJacobian: see `_JacobianProvider`.
+    """
+    if bMethod in ("calculate", "native") and isinstance(bField, AnalyticField):
+        return AnalyticProvider(bField)
+    if bMethod == "calculate" and not hasPyoculus():
+        bMethod = "native"
+    if bMethod == "calculate":
+        return PyoculusProvider(bField, jacobianData=jacobianData, pointwiseJacobian=pointwiseJacobian)
+    elif bMethod == "native":
+        return BeltramiProvider(bField, jacobianData=jacobianData, pointwiseJacobian=pointwiseJacobian)
+    elif bMethod == "interpolate":
+        if bData is None:
+            return GridProvider.fromField(bField)
+        return GridProvider.readH5(bField.nfp, bData)
+    else:
+        raise ValueError(
+            "`bMethod` should be `calculate`, `native` or `interpolate`. "
+        )
+
+
+if __name__ == "__main__":
+    pass
@@ -6,7 +6,10 @@
 import h5py
 import numpy as np
 from scipy.interpolate import interpn
-from ..specOut import SPECOut
+from ..misc import profiler
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from ..specOut import SPECOut
 
 
 deltaS = 1e-10
@@ -17,7 +20,7 @@ class SPECField:
     Magnetic field in SPEC coordinates! 
     """
 
-    def __init__(self, specData: SPECOut, lvol: int=0,
+    def __init__(self, specData: "SPECOut", lvol: int=0,
     sResolution: int=2, thetaResolution: int=2, zetaResolution: int=2) -> None:
         """
         Args:
@@ -30,6 +33,7 @@ class SPECField:
         self.specData = specData
         self.lvol = lvol
         self.nfp = specData.input.physics.Nfp
+        self.stellsym = bool(specData.input.physics.Istellsym)
         self.sArr = np.linspace(-1+deltaS, 1-deltaS, sResolution)
         self.thetaArr = np.linspace(0, 2*np.pi, thetaResolution)
         self.zetaArr = np.linspace(0, 2*np.pi/self.nfp, zetaResolution)
@@ -51,6 +55,7 @@ class SPECField:
             zetaArr = kwargs.get("zetaArr")
         grid = (sArr, thetaArr, zetaArr)
         point = (sValue, thetaValue, zetaValue)
+        profiler.count("interpolation")
         return interpn(grid, baseData, point)
 
     def changeResolution(self, sResolution: int=2, thetaResolution: int=2,zetaResolution: int=2) -> None:
@@ -63,14 +68,21 @@ class SPECField:
         return:
             rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta
         """
-        rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta = self.specData.get_RZ_derivatives(
-            lvol = self.lvol, 
-            sarr = self.sArr,
-            tarr = self.thetaArr,
-            zarr = self.zetaArr
-        )
+        with profiler.phase("field.getGrid"):
+            if hasattr(self.specData, "getCoordinates") and self.specData.input.physics.Igeometry == 3:
+                # `mpy.SPECOut`, with the trig tables of the grid cached
+                rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta = self.specData.getCoordinates(self.lvol).getRZ_grid(
+                    self.sArr, self.thetaArr, self.zetaArr
+                )
+            else:
+                rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta = self.specData.get_RZ_derivatives(
+                    lvol = self.lvol, 
+                    sarr = self.sArr,
+                    tarr = self.thetaArr,
+                    zarr = self.zetaArr
+                )
         if writeH5 is not None:
-            with h5py.File(writeH5, 'w') as f:
+            with profiler.phase("writeH5"), h5py.File(writeH5, 'w') as f:
                 f.create_dataset("sArr", data=self.sArr)
                 f.create_dataset("thetaArr", data=self.thetaArr)
                 f.create_dataset("zetaArr", data=self.zetaArr)
@@ -84,22 +96,30 @@ class SPECField:
                 f.create_dataset("z_zeta", data=z_zeta)
         return rGrid, r_s, r_theta, r_zeta, zGrid, z_s, z_theta, z_zeta
 
-    def getB(self, writeH5: str=None):
+    def getB(self, writeH5: str=None, native: bool=False):
         """
+        Args:
+            native: True, evaluate the field with `BeltramiField` instead of pyoculus (always if pyoculus is not installed). 
         return:
             bSupS, bSupTheta, bSupZeta
         """
-        field = self.specData.get_B(
-            lvol = self.lvol, 
-            sarr = self.sArr,
-            tarr = self.thetaArr,
-            zarr = self.zetaArr
-        )
+        from .provider import hasPyoculus
+        with profiler.phase("field.getB"):
+            if native or not hasPyoculus():
+                from .beltrami import BeltramiField
+                field = BeltramiField(self.specData, self.lvol).getB_grid(self.sArr, self.thetaArr, self.zetaArr)
+            else:
+                field = self.specData.get_B(
+                    lvol = self.lvol, 
+                    sarr = self.sArr,
+                    tarr = self.thetaArr,
+                    zarr = self.zetaArr
+                )
         bSupS = field[:,:,:,0]
         bSupTheta = field[:,:,:,1]
         bSupZeta = field[:,:,:,2]
         if writeH5 is not None:
-            with h5py.File(writeH5, 'w') as f:
+            with profiler.phase("writeH5"), h5py.File(writeH5, 'w') as f:
                 f.create_dataset("sArr", data=self.sArr)
                 f.create_dataset("thetaArr", data=self.thetaArr)
                 f.create_dataset("zetaArr", data=self.zetaArr)
@@ -109,14 +129,15 @@ class SPECField:
         return bSupS, bSupTheta, bSupZeta
     
     def getJacobian(self, writeH5: str=None):
-        jacobian = self.specData.jacobian(
-            lvol = self.lvol, 
-            sarr = self.sArr,
-            tarr = self.thetaArr,
-            zarr = self.zetaArr
-        )
+        with profiler.phase("field.getJacobian"):
+            jacobian = self.specData.jacobian(
+                lvol = self.lvol, 
+                sarr = self.sArr,
+                tarr = self.thetaArr,
+                zarr = self.zetaArr
+            )
         if writeH5 is not None:
-            with h5py.File(writeH5, 'w') as f:
+            with profiler.phase("writeH5"), h5py.File(writeH5, 'w') as f:
                 f.create_dataset("sArr", data=self.sArr)
                 f.create_dataset("thetaArr", data=self.thetaArr)
                 f.create_dataset("zetaArr", data=self.zetaArr)
@@ -124,14 +145,15 @@ class SPECField:
         return jacobian
 
     def getMetric(self, writeH5: str=None):
-        metric = self.specData.metric(
-            lvol = self.lvol, 
-            sarr = self.sArr,
-            tarr = self.thetaArr,
-            zarr = self.zetaArr
-        )
+        with profiler.phase("field.getMetric"):
+            metric = self.specData.metric(
+                lvol = self.lvol, 
+                sarr = self.sArr,
+                tarr = self.thetaArr,
+                zarr = self.zetaArr
+            )
         if writeH5 is not None:
-            with h5py.File(writeH5, 'w') as f:
+            with profiler.phase("writeH5"), h5py.File(writeH5, 'w') as f:
                 f.create_dataset("sArr", data=self.sArr)
                 f.create_dataset("thetaArr", data=self.thetaArr)
                 f.create_dataset("zetaArr", data=self.zetaArr)
@@ -7,6 +7,7 @@ import numpy as np
 from .specField import SPECField
 from .fieldLine import FieldLine
 from ..fitting import fitSurface
+from ..misc import getTrig, getTrig_grid
 from typing import Tuple
 
 
@@ -17,7 +18,7 @@ class SPECSurface:
         Use the least squares method to get the radial coordinates of the magnetic surface in the SPEC coordinates! 
         """
         self.nfp = bField.nfp 
-        self.stellsym = bField.specData.input.physics.Istellsym
+        self.stellsym = bField.stellsym
         if not self.stellsym:
             raise ValueError(
                 "There is no codes without stellarator symmetry! "
@@ -46,28 +47,45 @@ class SPECSurface:
         self.rCoeffSin, self.rCoeffCos = rCoeffSin, rCoeffCos
         self.zCoeffSin, self.zCoeffCos = zCoeffSin, zCoeffCos
 
-    def getValue(self, theta: np.ndarray, zeta: np.ndarray, value: str='s') -> np.ndarray:
+    def _getCoeff(self, value: str) -> Tuple[np.ndarray, np.ndarray]:
         if value == 's':
-            coeffSin, coeffCos = self.sCoeffSin, self.sCoeffCos
-        if value == 'r':
-            coeffSin, coeffCos = self.rCoeffSin, self.rCoeffCos
-        if value == 'z':
-            coeffSin, coeffCos = self.zCoeffSin, self.zCoeffCos
-        angleMat = (
-            np.dot(self.xm.reshape(-1,1), theta.reshape(1,-1)) - 
-            self.nfp * np.dot(self.xn.reshape(-1,1), zeta.reshape(1,-1))
-        )
-        datas =  (
-            np.dot(coeffSin.reshape(1,-1), np.sin(angleMat)) + 
-            np.dot(coeffCos.reshape(1,-1), np.cos(angleMat))
-        )
-        try:
-            m, n = theta.shape
-            return datas.reshpe(m, n) 
-        except:
-            return datas.flatten()
-        
-        
+            return self.sCoeffSin, self.sCoeffCos
+        elif value == 'r':
+            return self.rCoeffSin, self.rCoeffCos
+        elif value == 'z':
+            return self.zCoeffSin, self.zCoeffCos
+        else:
+            raise ValueError("value should be 's', 'r' or 'z'. ")
+
+    def getValue(self, theta: np.ndarray, zeta: np.ndarray, value: str='s', chunkSize: int=65536) -> np.ndarray:
+        """
+        Evaluate the surface at scattered points, `chunkSize` points at a time. 
+        The returned array has the shape of `theta`. 
+        """
+        coeffSin, coeffCos = self._getCoeff(value)
+        theta, zeta = np.asarray(theta), np.asarray(zeta)
+        shape = theta.shape
+        theta, zeta = theta.flatten(), zeta.flatten()
+        datas = np.empty(theta.size)
+        for start in range(0, theta.size, chunkSize):
+            end = start + chunkSize
+            cosMat, sinMat = getTrig(self.xm, self.nfp*self.xn, theta[start:end], zeta[start:end], cache=False)
+            datas[start:end] = np.dot(coeffSin, sinMat) + np.dot(coeffCos, cosMat)
+        return datas.reshape(shape)
+
+    def getValue_grid(self, thetaArr: np.ndarray, zetaArr: np.ndarray, value: str='s') -> np.ndarray:
+        """
+        Evaluate the surface on the tensor-product grid `thetaArr` x `zetaArr` (1D arrays), 
+        the trigonometric tables of the grid are cached by `mpy.misc.getTrig_grid`. 
+        Returns:
+            datas, shape (thetaArr.size, zetaArr.size)
+        """
+        coeffSin, coeffCos = self._getCoeff(value)
+        thetaArr, zetaArr = np.asarray(thetaArr, dtype=float).flatten(), np.asarray(zetaArr, dtype=float).flatten()
+        cosMat, sinMat = getTrig_grid(self.xm, self.nfp*self.xn, thetaArr, zetaArr)
+        cosMat, sinMat = cosMat.reshape(self.xm.size, -1), sinMat.reshape(self.xm.size, -1)
+        datas = np.dot(coeffSin, sinMat) + np.dot(coeffCos, cosMat)
+        return datas.reshape(thetaArr.size, zetaArr.size)
 
 
 if __name__ == "__main__": 
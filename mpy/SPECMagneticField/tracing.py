@@ -7,9 +7,9 @@ import numpy as np
 from scipy.integrate import solve_ivp 
 from .specField import SPECField
 from .fieldLine import FieldLine 
-from .readData import readB, readJacobian
-from ..misc import print_progress
-from typing import List
+from .provider import FieldProvider, getProvider
+from ..misc import print_progress, profiler, traceGrid, kernels
+from typing import List, Tuple
 
 
 def traceLine(
@@ -19,7 +19,8 @@ def traceLine(
     bMethod: str="calculate", 
     bData: str=None, jacobianData: str=None, 
     sResolution: int=128, thetaResolution: int=128, zetaResolution: int=128, 
-    printControl: bool=True, writeControl: str=None, **kwargs
+    printControl: bool=True, writeControl: str=None, callback=None, provider: FieldProvider=None, lockstep: bool=False, 
+    backend: str="scipy", **kwargs
 ) -> List[FieldLine]:
     r"""
     Working in SPEC coordintes (s, \theta, \zeta), compute magnetic field lines by solving
@@ -32,7 +33,16 @@ def traceLine(
         zeta0: list of zeta components of initial points. 
         niter: Number of toroidal periods. 
         nstep: Number of intermediate step for one period
-        bMethod: should be `"calculate"` or "`interpolate`" , the method to get the magnetic field. 
+        bMethod: should be `"calculate"`, `"native"` or "`interpolate`" , the method to get the magnetic field, see `getProvider`. 
+        callback: callable, `callback(lineIndex, sArr, thetaArr, zetaArr) -> bool`, called with the points of each toroidal period, 
+            the tracing of the current line stops if it returns True. (e.g. `mpy.fitting.SurfaceFitter.traceCallback()`)
+        provider: the `FieldProvider` of the field, overrides `bMethod`, `bData` and `jacobianData` if given. 
+        lockstep: True, trace all the lines together as one ODE system, so that each RHS evaluates the field at the current points
+            of all the lines in one `provider.evaluate` call (one `B_many` call and one Jacobian interpolation in the `"calculate"` mode). 
+            The step size is then controlled by the error of all the lines. 
+        backend: `"scipy"`, integrate with `solve_ivp`; `"numba"` or `"numpy"`, integrate all the lines with the fixed-step RK4 kernel 
+            of `mpy.misc.traceGrid` on the grid of the `"interpolate"` mode, the steps are not longer than `kwargs["max_step"]` 
+            (default 2*pi/nfp/nstep). 
     """
     if isinstance(s0, float):
         s0, theta0, zeta0 = np.array([s0]), np.array([theta0]), np.array([zeta0])
@@ -46,94 +56,163 @@ def traceLine(
     
     print("Change the resolution of the field... ")
     bField.changeResolution(sResolution=sResolution, thetaResolution=thetaResolution, zetaResolution=zetaResolution)
-    if bMethod == "calculate":
-        from pyoculus.problems import SPECBfield
-        pyoculusField = SPECBfield(bField.specData, bField.lvol+1)
-        if jacobianData is None:
-            base_Jacobian = bField.getJacobian()
-            base_sArr = bField.sArr
-            base_thetaArr = bField.thetaArr
-            base_zetaArr = bField.zetaArr
-        else:
-            base_sArr, base_thetaArr, base_zetaArr, base_Jacobian = readJacobian(jacobianData)
-    elif bMethod == "interpolate":
-        if bData is None:
-            base_bSupS, base_bSupTheta, base_bSupZeta = bField.getB()
-            base_sArr = bField.sArr
-            base_thetaArr = bField.thetaArr
-            base_zetaArr = bField.zetaArr
-        else:
-            base_sArr, base_thetaArr, base_zetaArr, base_bSupS, base_bSupTheta, base_bSupZeta = readB(bData)
-    else:
-        raise ValueError(
-            "`bMethod` should be `calculate` or `interpolate`. "
-        )
+    if provider is None:
+        with profiler.phase("getProvider"):
+            provider = getProvider(bField, bMethod, bData=bData, jacobianData=jacobianData)
 
-    def getB_calculate(zeta, s_theta):
-        # field = pyoculusField.B_many(s_theta[0], s_theta[1], zeta) / bField.interpValue(base_Jacobian, s_theta[0], s_theta[1], zeta, sArr=base_sArr, thetaArr=base_thetaArr, zetaArr=base_zetaArr)
-        # bSupS = field[0, 0]
-        # bSupTheta = field[0, 1]
-        # bSupZeta = field[0, 2]
-        field = pyoculusField.B([s_theta[0], s_theta[1], zeta]) / bField.interpValue(base_Jacobian, s_theta[0], s_theta[1], zeta, sArr=base_sArr, thetaArr=base_thetaArr, zetaArr=base_zetaArr)
-        bSupS = field[0]
-        bSupTheta = field[1]
-        bSupZeta = field[2]
-        return [bSupS/bSupZeta, bSupTheta/bSupZeta]
-    
-    def getB_interpolate(zeta, s_theta):
-        bSupS = bField.interpValue(baseData=base_bSupS, sValue=s_theta[0], thetaValue=s_theta[1], zetaValue=zeta, sArr=base_sArr, thetaArr=base_thetaArr, zetaArr=base_zetaArr)
-        bSupTheta = bField.interpValue(baseData=base_bSupTheta, sValue=s_theta[0], thetaValue=s_theta[1], zetaValue=zeta, sArr=base_sArr, thetaArr=base_thetaArr, zetaArr=base_zetaArr)
-        bSupZeta = bField.interpValue(baseData=base_bSupZeta, sValue=s_theta[0], thetaValue=s_theta[1], zetaValue=zeta, sArr=base_sArr, thetaArr=base_thetaArr, zetaArr=base_zetaArr)
-        return [bSupS/bSupZeta, bSupTheta/bSupZeta]
+    def getB(zeta, s_theta):
+        profiler.count("rhs")
+        bSupS, bSupTheta, bSupZeta = provider.evaluate([[s_theta[0], s_theta[1], zeta]])
+        return np.concatenate([bSupS/bSupZeta, bSupTheta/bSupZeta])
     
     lines = list()
     nLine = len(s0)
     if printControl:
         print("Begin field-line tracing: ")
+    if backend != "scipy" or lockstep:
+        if backend != "scipy":
+            points = _traceKernel(provider, bField.nfp, s0, theta0, zeta0, niter, nstep, callback, backend, kwargs.get("max_step"))
+        else:
+            points = _traceLockstep(provider, bField.nfp, s0, theta0, zeta0, niter, nstep, printControl, callback, **kwargs)
+        for i, (sArr, thetaArr, zetaArr) in enumerate(points):
+            lines.append(FieldLine.getLine_tracing(bField, nstep, sArr, thetaArr, zetaArr))
+            if writeControl:
+                lines[-1].writeH5(writeControl+str(i)+".h5")
+        return lines
     for i in range(nLine):              # loop over each field-line 
-        s_theta = [s0[i], theta0[i]]
-        zetaStart = zeta0[i]
-        dZeta = 2 * np.pi / bField.nfp / nstep
-        sArr = [s0[i]]
-        thetaArr = [theta0[i]]
-        zetaArr = [zeta0[i]]
-        for j in range(niter):          # loop over each toroidal iteration
-            if printControl:
-                print_progress(i*niter+j+1, nLine*niter)
-            for k in range(nstep):      # loop inside one iteration
-                if bMethod == "calculate":
-                    sol = solve_ivp(
-                        getB_calculate, 
-                        (zetaStart, zetaStart+dZeta), 
-                        s_theta, **kwargs
-                    )
-                elif bMethod == "interpolate":
-                    sol = solve_ivp(
-                        getB_interpolate, 
-                        (zetaStart, zetaStart+dZeta), 
-                        s_theta, **kwargs
-                    )
-                else:
-                    raise ValueError("bMethod should be calculate or interpolate. ")
-                sArr.append(sol.y[0,-1])
-                thetaArr.append(sol.y[1,-1])
-                zetaArr.append(zetaStart+dZeta)
-                s_theta = [sArr[-1], thetaArr[-1]]
-                zetaStart = zetaArr[-1]
-        lines.append(FieldLine.getLine_tracing(bField, nstep, np.array(sArr), np.array(thetaArr), np.array(zetaArr)))
-        if writeControl:
-            lines[-1].writeH5(writeControl+str(i)+".h5")
+        with profiler.line(i):
+            s_theta = [s0[i], theta0[i]]
+            zetaStart = zeta0[i]
+            dZeta = 2 * np.pi / bField.nfp / nstep
+            sArr = [s0[i]]
+            thetaArr = [theta0[i]]
+            zetaArr = [zeta0[i]]
+            for j in range(niter):          # loop over each toroidal iteration
+                if printControl:
+                    print_progress(i*niter+j+1, nLine*niter)
+                for k in range(nstep):      # loop inside one iteration
+                    profiler.count("integratorRestart")
+                    with profiler.phase("integration"):
+                        sol = solve_ivp(
+                            getB, 
+                            (zetaStart, zetaStart+dZeta), 
+                            s_theta, **kwargs
+                        )
+                    sArr.append(sol.y[0,-1])
+                    thetaArr.append(sol.y[1,-1])
+                    zetaArr.append(zetaStart+dZeta)
+                    s_theta = [sArr[-1], thetaArr[-1]]
+                    zetaStart = zetaArr[-1]
+                if callback is not None and callback(i, np.array(sArr[-nstep:]), np.array(thetaArr[-nstep:]), np.array(zetaArr[-nstep:])):
+                    break
+            lines.append(FieldLine.getLine_tracing(bField, nstep, np.array(sArr), np.array(thetaArr), np.array(zetaArr)))
+            if writeControl:
+                lines[-1].writeH5(writeControl+str(i)+".h5")
     
     return lines
 
 
+def _traceLockstep(
+    provider: FieldProvider, nfp: int, 
+    s0: np.ndarray, theta0: np.ndarray, zeta0: np.ndarray, 
+    niter: int, nstep: int, printControl: bool, callback, **kwargs
+) -> List[Tuple[np.ndarray]]:
+    """
+    Trace the lines together, the state is (s_0, theta_0, s_1, theta_1, ...) of the active lines and the independent variable is
+    the toroidal distance from `zeta0`. The lines stopped by `callback` are removed at the end of each period.
+    return:
+        [(sArr, thetaArr, zetaArr) of each line]
+    """
+    nLine = len(s0)
+    dZeta = 2 * np.pi / nfp / nstep
+    sArr = np.empty((nLine, niter*nstep+1))
+    thetaArr = np.empty((nLine, niter*nstep+1))
+    sArr[:, 0], thetaArr[:, 0] = s0, theta0
+    lengths = np.full(nLine, niter*nstep+1)
+    active = np.arange(nLine)
+
+    def getB(dZetaArr, s_theta):
+        profiler.count("rhs")
+        points = np.stack((s_theta[0::2], s_theta[1::2], zeta0[active]+dZetaArr), axis=-1)
+        bSupS, bSupTheta, bSupZeta = provider.evaluate(points)
+        rhs = np.empty_like(s_theta)
+        rhs[0::2] = bSupS / bSupZeta
+        rhs[1::2] = bSupTheta / bSupZeta
+        return rhs
+
+    s_theta = np.stack((s0, theta0), axis=-1).ravel()
+    for j in range(niter):              # loop over each toroidal iteration
+        if printControl:
+            print_progress(j+1, niter)
+        for k in range(nstep):          # loop inside one iteration
+            index = j*nstep + k
+            profiler.count("integratorRestart")
+            with profiler.phase("integration"):
+                sol = solve_ivp(getB, (index*dZeta, (index+1)*dZeta), s_theta, **kwargs)
+            s_theta = sol.y[:, -1]
+            sArr[active, index+1] = s_theta[0::2]
+            thetaArr[active, index+1] = s_theta[1::2]
+        if callback is not None:
+            period = slice(j*nstep+1, (j+1)*nstep+1)
+            keep = np.array([
+                not callback(i, sArr[i, period], thetaArr[i, period], zeta0[i]+dZeta*np.arange(j*nstep+1, (j+1)*nstep+1))
+                for i in active
+            ], dtype=bool)
+            lengths[active[~keep]] = (j+1)*nstep + 1
+            active = active[keep]
+            s_theta = s_theta.reshape(-1, 2)[keep].ravel()
+            if len(active) == 0:
+                break
+    zetaArr = zeta0[:, np.newaxis] + dZeta*np.arange(niter*nstep+1)
+    return [(sArr[i, :lengths[i]], thetaArr[i, :lengths[i]], zetaArr[i, :lengths[i]]) for i in range(nLine)]
+
+
+def _traceKernel(
+    provider: FieldProvider, nfp: int, 
+    s0: np.ndarray, theta0: np.ndarray, zeta0: np.ndarray, 
+    niter: int, nstep: int, callback, backend: str, maxStep: float=None
+) -> List[Tuple[np.ndarray]]:
+    """
+    Trace the lines with the kernel of `backend` on the grid of the provider, the lines are cut after the period where `callback` 
+    returns True. 
+    return:
+        [(sArr, thetaArr, zetaArr) of each line]
+    """
+    if not hasattr(provider, "getKernelGrid"):
+        raise ValueError(
+            "The kernel backends need the grid of the field, use `bMethod=\"interpolate\"`. "
+        )
+    dZeta = 2 * np.pi / nfp / nstep
+    offsets = dZeta * np.arange(1, niter*nstep+1)
+    sTrace, thetaTrace = traceGrid(
+        provider.getKernelGrid(), kernels.SPEC, s0, theta0, zeta0, offsets, 
+        maxStep if maxStep is not None else dZeta, backend=backend
+    )
+    points = list()
+    for i in range(len(s0)):
+        sArr = np.concatenate(([s0[i]], sTrace[i]))
+        thetaArr = np.concatenate(([theta0[i]], thetaTrace[i]))
+        zetaArr = zeta0[i] + np.concatenate(([0.0], offsets))
+        length = niter*nstep + 1
+        if callback is not None:
+            for j in range(niter):
+                period = slice(j*nstep+1, (j+1)*nstep+1)
+                if callback(i, sArr[period], thetaArr[period], zetaArr[period]):
+                    length = (j+1)*nstep + 1
+                    break
+        points.append((sArr[:length], thetaArr[:length], zetaArr[:length]))
+    return points
+
+
 def traceLine_byLength(
     bField: SPECField, 
     s0: np.ndarray, theta0: np.ndarray, zeta0: np.ndarray, 
     oneLength: float, 
     niter: int=128, nstep: int=32, 
+    bMethod: str="calculate", 
+    bData: str=None, jacobianData: str=None, 
     sResolution: int=128, thetaResolution: int=128, zetaResolution: int=128, 
-    writeControl: str=None, **kwargs
+    writeControl: str=None, provider: FieldProvider=None, **kwargs
 ) -> List[FieldLine]:
     r"""
     Working in SPEC coordintes (s, \theta, \zeta), compute magnetic field lines by solving
@@ -147,6 +226,8 @@ def traceLine_byLength(
         zeta0: list of zeta components of initial points. 
         niter: Number of toroidal periods. 
         nstep: Number of intermediate step for one period
+        bMethod: should be `"calculate"`, `"native"` or "`interpolate`" , the method to get the magnetic field, see `getProvider`. 
+        provider: the `FieldProvider` of the field, overrides `bMethod`, `bData` and `jacobianData` if given. 
     """
 
     if isinstance(s0, float):
@@ -160,52 +241,44 @@ def traceLine_byLength(
         kwargs.update({"rtol": 1e-10}) 
     print("Change the resolution of the field... ")
     bField.changeResolution(sResolution=sResolution, thetaResolution=thetaResolution, zetaResolution=zetaResolution)
-    print("Get the Jacobian and metric of the field... ")
-    # baseJacobian = bField.getJacobian()
-    # baseMetric = bField.getMetric()
-    Rarr0, Zarr0, baseJacobian, baseMetric = bField.specData.get_grid_and_jacobian_and_metric(
-        lvol = bField.lvol, 
-        sarr = bField.sArr, 
-        tarr = bField.thetaArr,
-        zarr = bField.zetaArr
-    )
+    if provider is None:
+        with profiler.phase("getProvider"):
+            provider = getProvider(bField, bMethod, bData=bData, jacobianData=jacobianData)
+    print("Get the metric of the field... ")
+    baseMetric = bField.getMetric()
 
-    from pyoculus.problems import SPECBfield
-    pyoculusField = SPECBfield(bField.specData, bField.lvol+1)
     def getB(dLength, point):
-        field = pyoculusField.B([point[0], point[1], point[2]]) / bField.interpValue(baseJacobian, point[0], point[1], point[2])
+        profiler.count("rhs")
+        bSupS, bSupTheta, bSupZeta = provider.evaluate([point])
+        field = np.concatenate([bSupS, bSupTheta, bSupZeta])
         metric = bField.interpValue(baseMetric, point[0], point[1], point[2])
-        # bSupS = field[0]
-        # bSupTheta = field[1]
-        # bSupZeta = field[2]
-        bPow = 0
-        for i in range(3):
-            for j in range(3): 
-                bPow += (field[i]*field[j]*metric[0,i,j]) 
-        b = np.power(bPow, 0.5)
-        return [field[0]/b, field[1]/b, field[2]/b]
+        b = np.sqrt(np.einsum("i,ij,j", field, metric[0], field))
+        return field / b
 
     print("Begin field line tracing: ")
     lines = list()
     for lineIndex in range(len(s0)):           # loop over each field line
-        point = [s0[lineIndex], theta0[lineIndex], zeta0[lineIndex]]
-        initLength = 0
-        deltaLength = oneLength / nstep
-        sArr = [s0[lineIndex]]
-        thetaArr = [theta0[lineIndex]]
-        zetaArr = [zeta0[lineIndex]]
-        for j in range(niter):              # loop over each toroidal iteration
-            print_progress(lineIndex*niter+j+1, len(s0)*niter)
-            for k in range(nstep):          # loop inside one iteration
-                sol = solve_ivp(getB, (initLength, initLength+deltaLength), point, **kwargs)            # solve ODEs
-                sArr.append(sol.y[0,-1])
-                thetaArr.append(sol.y[1,-1])
-                zetaArr.append(sol.y[2,-1])
-                point = [sArr[-1], thetaArr[-1], zetaArr[-1]]
-                initLength += deltaLength
-        lines.append(FieldLine.getLine_tracing(bField, nstep, np.array(sArr), np.array(thetaArr), np.array(zetaArr), equalZeta=False))
-        if writeControl:
-            lines[-1].writeH5(writeControl+str(lineIndex)+".h5")
+        with profiler.line(lineIndex):
+            point = [s0[lineIndex], theta0[lineIndex], zeta0[lineIndex]]
+            initLength = 0
+            deltaLength = oneLength / nstep
+            sArr = [s0[lineIndex]]
+            thetaArr = [theta0[lineIndex]]
+            zetaArr = [zeta0[lineIndex]]
+            for j in range(niter):              # loop over each toroidal iteration
+                print_progress(lineIndex*niter+j+1, len(s0)*niter)
+                for k in range(nstep):          # loop inside one iteration
+                    profiler.count("integratorRestart")
+                    with profiler.phase("integration"):
+                        sol = solve_ivp(getB, (initLength, initLength+deltaLength), point, **kwargs)            # solve ODEs
+                    sArr.append(sol.y[0,-1])
+                    thetaArr.append(sol.y[1,-1])
+                    zetaArr.append(sol.y[2,-1])
+                    point = [sArr[-1], thetaArr[-1], zetaArr[-1]]
+                    initLength += deltaLength
+            lines.append(FieldLine.getLine_tracing(bField, nstep, np.array(sArr), np.array(thetaArr), np.array(zetaArr), equalZeta=False))
+            if writeControl:
+                lines[-1].writeH5(writeControl+str(lineIndex)+".h5")
     
     return lines
 
@@ -1,3 +1,24 @@
-from .specNamelist import SPECNamelist
-from .specOut import SPECOut
-from .vmec2spec import vmecOut2spec
\ No newline at end of file
+# The heavy dependencies (py_spec, matplotlib, xarray) are imported on the first access of the attributes, 
+# so that `import mpy.traceing` or `import mpy.fitting` in worker processes stays cheap. 
+
+
+_lazyAttributes = {
+    "SPECNamelist": ".specNamelist", 
+    "SPECOut": ".specOut", 
+    "vmecOut2spec": ".vmec2spec"
+}
+
+__all__ = list(_lazyAttributes.keys())
+
+
+def __getattr__(name: str):
+    if name in _lazyAttributes:
+        import importlib
+        value = getattr(importlib.import_module(_lazyAttributes[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {:s} has no attribute {:s}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
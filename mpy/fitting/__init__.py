@@ -1,2 +1,2 @@
 from .curvefitting import fitPeriodicCurve, fitClosedCurve
-from .surfacefitting import fitSurface
\ No newline at end of file
+from .surfacefitting import fitSurface, SurfaceFitter
\ No newline at end of file
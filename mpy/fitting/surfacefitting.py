@@ -9,7 +9,7 @@ from scipy.optimize import OptimizeResult
 from typing import Tuple
 
 
-def fitSurface(thetaArr: np.ndarray, zetaArr: np.ndarray, sArr: np.ndarray, mpol: int, ntor: int, nfp: int=1, stellsym: str=None, debug: bool=False, **kwargs) -> Tuple[np.ndarray] or OptimizeResult:
+def fitSurface(thetaArr: np.ndarray, zetaArr: np.ndarray, sArr: np.ndarray, mpol: int, ntor: int, nfp: int=1, stellsym: str=None, debug: bool=False, chunkSize: int=None, **kwargs) -> Tuple[np.ndarray] or OptimizeResult:
     """
     Use the least squares method to fit the toroidal surface!  
     if `debug` is false, return xm, xn, coeffSin, coeffCos 
@@ -23,10 +23,20 @@ def fitSurface(thetaArr: np.ndarray, zetaArr: np.ndarray, sArr: np.ndarray, mpol
         nfp: the number of field periods. 
         stellsym: None, no stellarator symmetry; "sin", only use sin components; "cos", only use cos components. 
         debug: True, return class `scipy.optimize.OptimizeResult`; False, return xm, xn, coeffSin, coeffCos. 
+        chunkSize: if not None, accumulate the normal equations with `SurfaceFitter` in chunks of `chunkSize` points 
+            instead of calling `scipy.optimize.least_squares`, the peak memory is then independent of the number of points. 
+            `debug` returns the `SurfaceFitter` in this case. 
         **kwargs: the keyword arguments for `scipy.optimize.least_squares`
     """
     
     assert thetaArr.shape == zetaArr.shape == sArr.shape
+    if chunkSize is not None:
+        fitter = SurfaceFitter(mpol, ntor, nfp=nfp, stellsym=stellsym, chunkSize=chunkSize)
+        fitter.update(thetaArr, zetaArr, sArr)
+        if debug:
+            return fitter
+        else:
+            return fitter.getCoeff()
     thetaArr = thetaArr.flatten()
     zetaArr = zetaArr.flatten()
     sArr = sArr.flatten()
@@ -106,6 +116,118 @@ def fitSurface(thetaArr: np.ndarray, zetaArr: np.ndarray, sArr: np.ndarray, mpol
         raise ValueError("wrong stellsym")
 
 
+class SurfaceFitter:
+    """
+    Fit the toroidal surface by accumulating the normal equations chunk by chunk! 
+        s = \sum(coeffSin*sin(xm*theta-nfp*xn*zeta) + coeffCos*cos(xm*theta-nfp*xn*zeta))
+    Only the (nBasis, nBasis) normal matrix is stored, so the peak memory is independent of the number of points 
+    and the current coefficients are available at any time. 
+    """
+
+    def __init__(self, mpol: int, ntor: int, nfp: int=1, stellsym: str=None, chunkSize: int=65536) -> None:
+        """
+        Args:
+            mpol, ntor: the number of poloidal and toroidal Fourier harmonics. 
+            nfp: the number of field periods. 
+            stellsym: None, no stellarator symmetry; "sin", only use sin components; "cos", only use cos components. 
+            chunkSize: the number of points in one chunk. 
+        """
+        if stellsym not in (None, "sin", "cos"):
+            raise ValueError("wrong stellsym")
+        self.mpol, self.ntor, self.nfp = mpol, ntor, nfp
+        self.stellsym = stellsym
+        self.chunkSize = chunkSize
+        self.xm, self.xn = getMN(mpol, ntor)
+        self.mnLen = self.xm.size
+        if not stellsym:
+            nBasis = 2 * self.mnLen
+        else:
+            nBasis = self.mnLen
+        self.normalMat = np.zeros((nBasis, nBasis))
+        self.normalRhs = np.zeros(nBasis)
+        self.nPoints = 0
+        self._coeff = None
+        self.lineFitters = dict()
+
+    def _getBasis(self, thetaArr: np.ndarray, zetaArr: np.ndarray) -> np.ndarray:
+        angleMat = (
+            np.dot(thetaArr.reshape(-1,1), self.xm.reshape(1,-1)) - 
+            self.nfp * np.dot(zetaArr.reshape(-1,1), self.xn.reshape(1,-1))
+        )
+        if not self.stellsym:
+            return np.hstack((np.sin(angleMat), np.cos(angleMat)))
+        elif self.stellsym == "sin":
+            return np.sin(angleMat)
+        else:
+            return np.cos(angleMat)
+
+    def update(self, thetaArr: np.ndarray, zetaArr: np.ndarray, sArr: np.ndarray) -> float:
+        """
+        Add points to the normal equations. 
+        Returns:
+            the maximum change of the coefficients relative to the maximum coefficient, `np.inf` if there are not enough points. 
+        """
+        thetaArr, zetaArr, sArr = np.asarray(thetaArr), np.asarray(zetaArr), np.asarray(sArr)
+        assert thetaArr.shape == zetaArr.shape == sArr.shape
+        thetaArr, zetaArr, sArr = thetaArr.flatten(), zetaArr.flatten(), sArr.flatten()
+        for start in range(0, sArr.size, self.chunkSize):
+            end = start + self.chunkSize
+            basis = self._getBasis(thetaArr[start:end], zetaArr[start:end])
+            self.normalMat += np.dot(basis.T, basis)
+            self.normalRhs += np.dot(basis.T, sArr[start:end])
+        self.nPoints += sArr.size
+        if self.nPoints <= self.normalRhs.size:
+            return np.inf
+        oldCoeff = self._coeff
+        self._coeff = None
+        newCoeff = self._solve()
+        if oldCoeff is None:
+            return np.inf
+        return np.max(np.abs(newCoeff-oldCoeff)) / max(np.max(np.abs(newCoeff)), np.finfo(float).tiny)
+
+    def updateLine(self, line, value: str='s') -> float:
+        """
+        Add the points of a field line (`mpy.SPECMagneticField.FieldLine`), `value` should be 's', 'r' or 'z'. 
+        """
+        return self.update(line.thetaArr, line.zetaArr, getattr(line, value+"Arr"))
+
+    def _solve(self) -> np.ndarray:
+        if self._coeff is None:
+            self._coeff = np.linalg.lstsq(self.normalMat, self.normalRhs, rcond=None)[0]
+        return self._coeff
+
+    def getCoeff(self) -> Tuple[np.ndarray]:
+        """
+        returns:
+            xm, xn, coeffSin, coeffCos
+        """
+        assert self.nPoints > self.normalRhs.size
+        coeff = self._solve()
+        if not self.stellsym:
+            return self.xm, self.xn, coeff[0: self.mnLen], coeff[self.mnLen: 2*self.mnLen]
+        elif self.stellsym == "sin":
+            return self.xm, self.xn, coeff.copy(), np.zeros(self.mnLen)
+        else:
+            return self.xm, self.xn, np.zeros(self.mnLen), coeff.copy()
+
+    def traceCallback(self, tol: float=1e-6):
+        """
+        Return a `callback` for `mpy.SPECMagneticField.traceLine`, which fits the s component with the points of every 
+        toroidal period and stops the tracing once the relative change of the coefficients is smaller than `tol`. 
+        Each line is fitted separately by a new `SurfaceFitter` with the settings of this one, the fitters are kept in 
+        `self.lineFitters` by the index of the line. 
+        """
+        self.lineFitters = dict()
+        def callback(lineIndex: int, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> bool:
+            lineIndex = int(lineIndex)
+            fitter = self.lineFitters.get(lineIndex)
+            if fitter is None:
+                fitter = SurfaceFitter(self.mpol, self.ntor, nfp=self.nfp, stellsym=self.stellsym, chunkSize=self.chunkSize)
+                self.lineFitters[lineIndex] = fitter
+            return fitter.update(thetaArr, zetaArr, sArr) < tol
+        return callback
+
+
 def getMN(mpol: int, ntor: int) -> Tuple[np.ndarray, np.ndarray]: 
     def getM(index: int) -> int:
             if index < ntor+1:
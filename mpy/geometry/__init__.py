@@ -1,2 +1,3 @@
 from .line import Line
-from .line import plotPoincare
\ No newline at end of file
+from .line import plotPoincare
+from .surface import FourierInterfaces
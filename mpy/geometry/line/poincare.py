@@ -4,7 +4,6 @@
 
 
 import numpy as np
-import matplotlib.pyplot as plt
 from .line import Line
 from typing import List, Tuple
 
@@ -16,8 +15,8 @@ def plotPoincare(lines: List[Line], toroidalIdx: int=0, ax=None, **kwargs) -> Tu
     """
     
     if ax is None:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
-    plt.sca(ax)
     if kwargs.get("marker") == None:
         kwargs.update({"marker": "."})
     if kwargs.get("s") == None:
@@ -34,7 +33,7 @@ def plotPoincare(lines: List[Line], toroidalIdx: int=0, ax=None, **kwargs) -> Tu
                 rArr.append(line.rArr[i])
                 zArr.append(line.zArr[i])
         dots = ax.scatter(rArr, zArr, **kwargs)
-    plt.axis("equal")
+    ax.axis("equal")
 
     return 
 
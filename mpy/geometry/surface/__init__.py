@@ -0,0 +1 @@
+from .fourierInterfaces import FourierInterfaces
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# fourierInterfaces.py
+
+
+import numpy as np
+from ...misc import getTrig
+from typing import List, Tuple
+
+
+class FourierInterfaces:
+    """
+    A set of toroidal surfaces sharing the Fourier modes (xm, xn),
+        R = sum(rbc*cos(m*theta-n*zeta) + rbs*sin(m*theta-n*zeta)),
+        Z = sum(zbc*cos(m*theta-n*zeta) + zbs*sin(m*theta-n*zeta)),
+    the coefficients are stored as arrays of shape (nSurf, nModes) and all the surfaces are evaluated at once.
+    """
+
+    def __init__(self, xm: np.ndarray, xn: np.ndarray, rbc: np.ndarray, zbs: np.ndarray, rbs: np.ndarray=None, zbc: np.ndarray=None) -> None:
+        """
+        Args:
+            xm, xn: the mode numbers, shape (nModes).
+            rbc, zbs, rbs, zbc: the coefficients, shape (nSurf, nModes) or (nModes) for a single surface, rbs and zbc default to zeros.
+        """
+        self.xm = np.asarray(xm, dtype=float).reshape(-1)
+        self.xn = np.asarray(xn, dtype=float).reshape(-1)
+        assert self.xm.shape == self.xn.shape
+        self.rbc = np.atleast_2d(np.asarray(rbc, dtype=float))
+        self.zbs = np.atleast_2d(np.asarray(zbs, dtype=float))
+        self.rbs = np.zeros_like(self.rbc) if rbs is None else np.atleast_2d(np.asarray(rbs, dtype=float))
+        self.zbc = np.zeros_like(self.rbc) if zbc is None else np.atleast_2d(np.asarray(zbc, dtype=float))
+        assert self.rbc.shape == self.zbs.shape == self.rbs.shape == self.zbc.shape == (self.rbc.shape[0], self.xm.size)
+        self.stellsym = not (np.any(self.rbs) or np.any(self.zbc))
+
+    @classmethod
+    def fromSPECOut(cls, specData):
+        """
+        The interfaces of the SPEC output, the first one is the magnetic axis.
+        """
+        stellsym = specData.input.physics.Istellsym == 1
+        rbc = np.atleast_2d(specData.output.Rbc)
+        zbs = np.atleast_2d(specData.output.Zbs)
+        return cls(
+            specData.output.im, specData.output.in_, rbc, zbs,
+            rbs = None if stellsym else np.atleast_2d(specData.output.Rbs),
+            zbc = None if stellsym else np.atleast_2d(specData.output.Zbc)
+        )
+
+    @classmethod
+    def fromNamelist(cls, specNamelist):
+        """
+        The initial guess of the interfaces in the SPEC namelist (`interface_guess`), n is not multiplied by Nfp.
+        """
+        modes = list(specNamelist.interface_guess.keys())
+        datas = list(specNamelist.interface_guess.values())
+        nvol = specNamelist._Nvol
+        def getCoeff(key: str) -> np.ndarray:
+            if len(datas) == 0:
+                return np.zeros((nvol, 0))
+            return np.array([data[key][:nvol] for data in datas], dtype=float).T
+        return cls(
+            [m for m, n in modes], [n for m, n in modes],
+            getCoeff("Rbc"), getCoeff("Zbs"), getCoeff("Rbs"), getCoeff("Zbc")
+        )
+
+    def __len__(self) -> int:
+        return self.rbc.shape[0]
+
+    def __getitem__(self, index):
+        """
+        The interfaces selected by `index`, as a `FourierInterfaces`.
+        """
+        index = np.atleast_1d(np.arange(len(self))[index])
+        return FourierInterfaces(self.xm, self.xn, self.rbc[index], self.zbs[index], self.rbs[index], self.zbc[index])
+
+    def getTrig(self, theta: np.ndarray, zeta: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        The trig tables of the points, can be reused by `rz` for other surfaces with the same modes.
+        The separable tables of the sample values are cached, see `mpy.misc.TrigCache`.
+        return:
+            cos(m*theta-n*zeta), sin(m*theta-n*zeta), shape (nModes, N)
+        """
+        return getTrig(self.xm, self.xn, theta, zeta)
+
+    def rz(self, theta: np.ndarray, zeta: np.ndarray, derivative: bool=False, index=None, trig: Tuple[np.ndarray]=None) -> Tuple[np.ndarray]:
+        """
+        Evaluate the surfaces at the points (theta[i], zeta[i]).
+        Args:
+            theta, zeta: the angles, broadcasted to the same shape.
+            derivative: return the derivatives with respect to theta and zeta.
+            index: the surfaces to be evaluated, defaults to all.
+            trig: the trig tables from `getTrig` of the same points.
+        return:
+            R, Z, shape (nSurf, *theta.shape)
+            R, Z, R_theta, R_zeta, Z_theta, Z_zeta if derivative
+        """
+        theta, zeta = np.broadcast_arrays(np.asarray(theta, dtype=float), np.asarray(zeta, dtype=float))
+        shape = theta.shape
+        if trig is None:
+            trig = self.getTrig(theta, zeta)
+        cosMat, sinMat = trig
+        if index is None:
+            index = slice(None)
+        rbc, zbs = np.atleast_2d(self.rbc[index]), np.atleast_2d(self.zbs[index])
+        outShape = (rbc.shape[0],) + shape
+        values = [np.dot(rbc, cosMat), np.dot(zbs, sinMat)]
+        if derivative:
+            values += [
+                -np.dot(rbc*self.xm, sinMat), np.dot(rbc*self.xn, sinMat),
+                np.dot(zbs*self.xm, cosMat), -np.dot(zbs*self.xn, cosMat)
+            ]
+        if not self.stellsym:
+            rbs, zbc = np.atleast_2d(self.rbs[index]), np.atleast_2d(self.zbc[index])
+            values[0] += np.dot(rbs, sinMat)
+            values[1] += np.dot(zbc, cosMat)
+            if derivative:
+                values[2] += np.dot(rbs*self.xm, cosMat)
+                values[3] -= np.dot(rbs*self.xn, cosMat)
+                values[4] -= np.dot(zbc*self.xm, sinMat)
+                values[5] += np.dot(zbc*self.xn, sinMat)
+        return tuple(value.reshape(outShape) for value in values)
+
+    def toFourSurf(self) -> List:
+        """
+        return:
+            list of `coilpy.FourSurf`
+        """
+        from coilpy import FourSurf
+        return [
+            FourSurf(xm=self.xm, xn=self.xn, rbc=self.rbc[i], zbs=self.zbs[i], rbs=self.rbs[i], zbc=self.zbc[i])
+            for i in range(len(self))
+        ]
+
+
+if __name__ == "__main__":
+    pass
@@ -1 +1,5 @@
-from .print import print_progress
\ No newline at end of file
+from .print import print_progress
+from .density import plotDensity
+from .profiler import Profiler, profile, getProfiler
+from .trigCache import TrigCache, trigCache, getTrig, getTrig_grid
+from .kernels import hasNumba, traceGrid
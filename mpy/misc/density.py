@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# density.py
+
+
+import numpy as np
+
+
+def plotDensity(ax, xArr: np.ndarray, yArr: np.ndarray, bins: int or tuple=512, maxPoints: int=None, histRange: list=None, logScale: bool=True, **kwargs):
+    """
+    Bin the points into a 2D histogram and draw it as a single image, for the plots with millions of points. 
+    Args:
+        ax: Matplotlib axis to be plotted on.
+        xArr, yArr: the coordinates of the points, of any shape, nan is ignored.
+        bins: the number of bins, int or (nx, ny).
+        maxPoints: if not None, downsample the points with a uniform stride to at most `maxPoints` before binning.
+        histRange: [[xmin, xmax], [ymin, ymax]], defaults to the extent of the points.
+        logScale: use the logarithmic color scale.
+        kwargs: Matplotlib.axes.Axes.imshow keyword arguments.
+    return:
+        matplotlib.image.AxesImage, None if there is no finite point
+    """
+    from matplotlib.colors import LogNorm
+
+    xArr = np.asarray(xArr, dtype=float).reshape(-1)
+    yArr = np.asarray(yArr, dtype=float).reshape(-1)
+    if maxPoints is not None and xArr.size > maxPoints:
+        stride = int(np.ceil(xArr.size / maxPoints))
+        xArr, yArr = xArr[::stride], yArr[::stride]
+    valid = np.isfinite(xArr) & np.isfinite(yArr)
+    xArr, yArr = xArr[valid], yArr[valid]
+    if xArr.size == 0:
+        return None
+    if histRange is None:
+        histRange = [[xArr.min(), xArr.max()], [yArr.min(), yArr.max()]]
+    counts, xEdges, yEdges = np.histogram2d(xArr, yArr, bins=bins, range=histRange)
+    counts = np.ma.masked_equal(counts.T, 0)
+    if kwargs.get("cmap") is None:
+        kwargs.update({"cmap": "Greys"})
+    if logScale and kwargs.get("norm") is None:
+        kwargs.update({"norm": LogNorm(vmin=1, vmax=max(counts.max(), 1))})
+    if kwargs.get("interpolation") is None:
+        kwargs.update({"interpolation": "nearest"})
+    return ax.imshow(
+        counts, origin="lower", aspect="auto",
+        extent=(xEdges[0], xEdges[-1], yEdges[0], yEdges[-1]),
+        **kwargs
+    )
+
+
+if __name__ == "__main__":
+    pass
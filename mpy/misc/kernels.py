@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# kernels.py
+
+
+"""
+Fixed-step RK4 field-line kernels on uniform grids with trilinear interpolation, for the `"numba"` and `"numpy"` backends
+of `mpy.traceing.traceCylindrical` and `mpy.SPECMagneticField.traceLine`.
+The field is given as the grid `(datas, origin, spacing, periodic)`, `datas` has the shape (n0, n1, n2, 3), the endpoint of the
+periodic axes is included (the first plane is repeated), see `CylindricalGridField.getKernelGrid` and `GridProvider.getKernelGrid`.
+The `"numba"` backend compiles the kernel on the first call and traces the lines in parallel threads without the GIL,
+it falls back to the vectorized `"numpy"` kernel if numba is not installed.
+"""
+
+
+import numpy as np
+from . import profiler
+from typing import Tuple
+
+
+CYLINDRICAL = 0         # state (R, Z) on the axes 0, 2, the independent variable phi on the axis 1, dR/dphi = R*B_R/B_phi
+SPEC = 1                # state (s, theta) on the axes 0, 1, the independent variable zeta on the axis 2, ds/dzeta = B^s/B^zeta
+
+_numbaKernel = None
+
+
+def hasNumba() -> bool:
+    try:
+        import numba
+    except ImportError:
+        return False
+    return True
+
+
+def _compile():
+    import numba
+
+    @numba.njit(nogil=True)
+    def locate(x, origin, spacing, n, periodic):
+        f = (x - origin) / spacing
+        if periodic:
+            f = f % (n - 1)
+        elif f < 0 or f > n - 1:
+            return 0, 0.0, False
+        i = min(max(int(np.floor(f)), 0), n - 2)
+        return i, f - i, True
+
+    @numba.njit(nogil=True)
+    def rhs(datas, origin, spacing, periodic, mode, u, v, t):
+        if mode == CYLINDRICAL:
+            x0, x1, x2 = u, t, v
+        else:
+            x0, x1, x2 = u, v, t
+        i, wi, inside0 = locate(x0, origin[0], spacing[0], datas.shape[0], periodic[0])
+        j, wj, inside1 = locate(x1, origin[1], spacing[1], datas.shape[1], periodic[1])
+        k, wk, inside2 = locate(x2, origin[2], spacing[2], datas.shape[2], periodic[2])
+        if not (inside0 and inside1 and inside2):
+            return np.nan, np.nan
+        b0, b1, b2 = 0.0, 0.0, 0.0
+        for di in range(2):
+            weightI = wi if di else 1 - wi
+            for dj in range(2):
+                weightJ = weightI * (wj if dj else 1 - wj)
+                for dk in range(2):
+                    weight = weightJ * (wk if dk else 1 - wk)
+                    b0 += weight * datas[i+di, j+dj, k+dk, 0]
+                    b1 += weight * datas[i+di, j+dj, k+dk, 1]
+                    b2 += weight * datas[i+di, j+dj, k+dk, 2]
+        if mode == CYLINDRICAL:
+            return u*b0/b1, u*b2/b1
+        return b0/b2, b1/b2
+
+    @numba.njit(nogil=True, parallel=True)
+    def trace(datas, origin, spacing, periodic, mode, u0, v0, t0, tRecord, nsub, uOut, vOut):
+        for n in numba.prange(u0.size):
+            u, v, tPrev = u0[n], v0[n], 0.0
+            for m in range(tRecord.shape[1]):
+                h = (tRecord[n, m] - tPrev) / nsub[m]
+                for step in range(nsub[m]):
+                    t = t0[n] + tPrev + step*h
+                    du1, dv1 = rhs(datas, origin, spacing, periodic, mode, u, v, t)
+                    du2, dv2 = rhs(datas, origin, spacing, periodic, mode, u+h/2*du1, v+h/2*dv1, t+h/2)
+                    du3, dv3 = rhs(datas, origin, spacing, periodic, mode, u+h/2*du2, v+h/2*dv2, t+h/2)
+                    du4, dv4 = rhs(datas, origin, spacing, periodic, mode, u+h*du3, v+h*dv3, t+h)
+                    u += h/6 * (du1 + 2*du2 + 2*du3 + du4)
+                    v += h/6 * (dv1 + 2*dv2 + 2*dv3 + dv4)
+                uOut[n, m], vOut[n, m] = u, v
+                tPrev = tRecord[n, m]
+
+    return trace
+
+
+def _interpolate(datas: np.ndarray, origin: np.ndarray, spacing: np.ndarray, periodic: np.ndarray,
+x0: np.ndarray, x1: np.ndarray, x2: np.ndarray) -> np.ndarray:
+    """
+    Trilinear interpolation at the points, `nan` outside the grid.
+    return:
+        field, shape (N, 3)
+    """
+    indices, weights = list(), list()
+    outside = np.zeros(x0.shape, dtype=bool)
+    for axis, x in enumerate((x0, x1, x2)):
+        n = datas.shape[axis]
+        f = (x - origin[axis]) / spacing[axis]
+        if periodic[axis]:
+            f = f % (n - 1)
+        else:
+            outside |= (f < 0) | (f > n - 1)
+        i = np.clip(np.floor(f).astype(int), 0, n - 2)
+        indices.append(i)
+        weights.append(f - i)
+    (i, j, k), (wi, wj, wk) = indices, weights
+    field = np.zeros(x0.shape + (3,))
+    for di in range(2):
+        weightI = wi if di else 1 - wi
+        for dj in range(2):
+            weightJ = weightI * (wj if dj else 1 - wj)
+            for dk in range(2):
+                weight = weightJ * (wk if dk else 1 - wk)
+                field += weight[:, np.newaxis] * datas[i+di, j+dj, k+dk]
+    field[outside] = np.nan
+    return field
+
+
+def _traceNumpy(datas, origin, spacing, periodic, mode, u0, v0, t0, tRecord, nsub, uOut, vOut) -> None:
+    """
+    The kernel vectorized over the lines.
+    """
+
+    def rhs(u, v, t):
+        profiler.count("rhs")
+        if mode == CYLINDRICAL:
+            field = _interpolate(datas, origin, spacing, periodic, u, t, v)
+            return u*field[:, 0]/field[:, 1], u*field[:, 2]/field[:, 1]
+        field = _interpolate(datas, origin, spacing, periodic, u, v, t)
+        return field[:, 0]/field[:, 2], field[:, 1]/field[:, 2]
+
+    u, v, tPrev = u0.copy(), v0.copy(), np.zeros_like(t0)
+    for m in range(tRecord.shape[1]):
+        h = (tRecord[:, m] - tPrev) / nsub[m]
+        for step in range(nsub[m]):
+            t = t0 + tPrev + step*h
+            du1, dv1 = rhs(u, v, t)
+            du2, dv2 = rhs(u+h/2*du1, v+h/2*dv1, t+h/2)
+            du3, dv3 = rhs(u+h/2*du2, v+h/2*dv2, t+h/2)
+            du4, dv4 = rhs(u+h*du3, v+h*dv3, t+h)
+            u = u + h/6 * (du1 + 2*du2 + 2*du3 + du4)
+            v = v + h/6 * (dv1 + 2*dv2 + 2*dv3 + dv4)
+        uOut[:, m], vOut[:, m] = u, v
+        tPrev = tRecord[:, m]
+
+
+def traceGrid(
+    grid: Tuple[np.ndarray], mode: int, u0: np.ndarray, v0: np.ndarray, t0: np.ndarray, tRecord: np.ndarray, maxStep: float, backend: str="numba"
+) -> Tuple[np.ndarray]:
+    """
+    Trace the lines with the fixed-step RK4 in the field of the grid.
+    Args:
+        grid: (datas, origin, spacing, periodic).
+        mode: `CYLINDRICAL` or `SPEC`.
+        u0, v0, t0: the initial states and the initial independent variables of the lines.
+        tRecord: the increasing offsets from `t0` of the recorded points, shape (M,) or (N, M). The interval between two recorded
+            points is divided into the same number of steps for all the lines, so that the steps are not longer than `maxStep`.
+        backend: `"numba"` (the `"numpy"` kernel if numba is not installed) or `"numpy"`.
+    return:
+        uArr, vArr, shape (N, M)
+    """
+    if backend not in ("numba", "numpy"):
+        raise ValueError(
+            "The backend of the kernels should be `numba` or `numpy`. "
+        )
+    datas, origin, spacing, periodic = grid
+    datas = np.ascontiguousarray(datas, dtype=float)
+    origin, spacing = np.asarray(origin, dtype=float), np.asarray(spacing, dtype=float)
+    periodic = np.asarray(periodic, dtype=bool)
+    u0, v0, t0 = np.atleast_1d(np.asarray(u0, dtype=float)), np.atleast_1d(np.asarray(v0, dtype=float)), np.atleast_1d(np.asarray(t0, dtype=float))
+    assert u0.shape == v0.shape == t0.shape and u0.ndim == 1
+    tRecord = np.ascontiguousarray(np.broadcast_to(np.asarray(tRecord, dtype=float), (u0.size, np.shape(tRecord)[-1])))
+    intervals = np.diff(tRecord, axis=1, prepend=0.0)
+    nsub = np.maximum(np.ceil(np.max(intervals, axis=0, initial=0.0)/maxStep - 1e-10), 1).astype(np.int64)
+    uOut, vOut = np.empty(tRecord.shape), np.empty(tRecord.shape)
+    global _numbaKernel
+    if backend == "numba" and hasNumba():
+        if _numbaKernel is None:
+            with profiler.phase("kernel.compile"):
+                _numbaKernel = _compile()
+        kernel = _numbaKernel
+    else:
+        kernel = _traceNumpy
+    with profiler.phase("kernel.trace"):
+        kernel(datas, origin, spacing, periodic, mode, u0, v0, t0, tRecord, nsub, uOut, vOut)
+    return uOut, vOut
+
+
+if __name__ == "__main__":
+    pass
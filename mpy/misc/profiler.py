@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# profiler.py
+
+
+"""
+Opt-in instrumentation of the field evaluation and the tracing!
+Nothing is recorded unless a run is wrapped by `profile`:
+    with profile(perLine=True) as profiler:
+        lines = traceLine(bField, s0, theta0, zeta0)
+    profiler.writeJSON("trace_profile.json")
+The instrumented code calls `count(name)`, `with phase(name):` and `with line(index):`, which are no-ops when no profiler is active.
+Counters: `rhs` (RHS calls of the integrators), `fieldEvaluation` / `fieldPoint` (calls and points of the field providers),
+`interpolation` (`interpn` calls), `integratorRestart` (`solve_ivp` calls), `cacheHit` / `cacheMiss`.
+"""
+
+
+import json
+import time
+import tracemalloc
+import contextlib
+from typing import Dict
+
+
+_profiler = None
+_lostPeak = 0           # the peak memory of the enclosing runs before the nested runs reset the peak of tracemalloc
+
+
+class Profiler:
+
+    def __init__(self, memory: bool=False, perLine: bool=False) -> None:
+        """
+        Args:
+            memory: track the peak memory with `tracemalloc`, which slows down the allocations and so the timed phases.
+            perLine: record the counters and the wall time of each field line.
+        """
+        self.memory = memory
+        self.perLine = perLine
+        self.counters = dict()
+        self.phases = dict()
+        self.lines = list()
+        self.wallTime = 0.0
+        self.peakMemory = None
+
+    def count(self, name: str, n: int=1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Time a phase, nested phases are recorded separately, so the times of the phases may overlap.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            calls, seconds = self.phases.get(name, (0, 0.0))
+            self.phases[name] = (calls+1, seconds+time.perf_counter()-start)
+
+    @contextlib.contextmanager
+    def line(self, index: int):
+        """
+        Record the increments of the counters and the wall time of the field line `index`.
+        """
+        if not self.perLine:
+            yield
+            return
+        counters = dict(self.counters)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.lines.append({
+                "index": int(index),
+                "time": time.perf_counter() - start,
+                "counters": {key: value-counters.get(key, 0) for key, value in self.counters.items() if value != counters.get(key, 0)}
+            })
+
+    def summary(self) -> Dict:
+        """
+        return:
+            {"wallTime": s, "peakMemory": MB or None, "counters": {...}, "phases": {name: {"calls", "time"}}, "lines": [...]}
+        """
+        summary = {
+            "wallTime": self.wallTime,
+            "peakMemory": self.peakMemory,
+            "counters": dict(self.counters),
+            "phases": {name: {"calls": calls, "time": seconds} for name, (calls, seconds) in self.phases.items()}
+        }
+        if self.perLine:
+            summary["lines"] = list(self.lines)
+        return summary
+
+    def writeJSON(self, jsonFile: str) -> None:
+        with open(jsonFile, 'w') as f:
+            json.dump(self.summary(), f, indent=1)
+
+    def report(self) -> str:
+        lines = ["wall time: {:.3f} s".format(self.wallTime)]
+        if self.peakMemory is not None:
+            lines.append("peak memory: {:.2f} MB".format(self.peakMemory))
+        for name, (calls, seconds) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            lines.append("{:40s} {:10d} calls {:10.3f} s".format(name, calls, seconds))
+        for name, value in sorted(self.counters.items()):
+            lines.append("{:40s} {:10d}".format(name, value))
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profile(memory: bool=False, perLine: bool=False):
+    """
+    Activate a `Profiler` for the enclosed code, see `Profiler` for the arguments.
+    """
+    global _profiler, _lostPeak
+    previous = _profiler
+    profiler = Profiler(memory=memory, perLine=perLine)
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif memory:
+        # the peak of this run only if tracemalloc is already running, the peak of the enclosing run is restored at the end
+        outerLostPeak = _lostPeak
+        outerPeak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    if memory:
+        _lostPeak = 0
+    _profiler = profiler
+    start = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        profiler.wallTime = time.perf_counter() - start
+        if memory:
+            peak = max(tracemalloc.get_traced_memory()[1], _lostPeak)
+            profiler.peakMemory = peak / 2**20
+        if tracing:
+            tracemalloc.stop()
+            _lostPeak = 0
+        elif memory:
+            _lostPeak = max(outerLostPeak, outerPeak, peak)
+        _profiler = previous
+
+
+def getProfiler() -> Profiler:
+    """
+    return:
+        the active `Profiler` or None
+    """
+    return _profiler
+
+
+def count(name: str, n: int=1) -> None:
+    if _profiler is not None:
+        _profiler.count(name, n)
+
+
+def phase(name: str):
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.phase(name)
+
+
+def line(index: int):
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.line(index)
+
+
+if __name__ == "__main__":
+    pass
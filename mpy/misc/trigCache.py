@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# trigCache.py
+
+
+"""
+The trigonometric basis tables cos(m*theta - n*zeta), sin(m*theta - n*zeta) of the Fourier series, built from the separable tables
+cos(m*theta), sin(m*theta) of the distinct m and cos(n*zeta), sin(n*zeta) of the distinct n, so that only (#m + #n) * N cos/sin are computed
+instead of #mn * N. The separable tables are cached, keyed by the modes and the sample values, in a LRU cache with a memory bound,
+shared by `mpy.SPECMagneticField.BeltramiField`, `mpy.geometry.FourierInterfaces` and the grids of `SPECOut.getCoordinates`.
+"""
+
+
+import numpy as np
+from collections import OrderedDict
+from . import profiler
+from typing import Tuple
+
+
+class TrigCache:
+
+    def __init__(self, maxBytes: int=64*2**20) -> None:
+        """
+        Args:
+            maxBytes: the bound of the memory of the cached tables (and their keys), the least recently used tables are dropped.
+        """
+        self.maxBytes = maxBytes
+        self.nbytes = 0
+        self.tables = OrderedDict()
+
+    def clear(self) -> None:
+        self.tables.clear()
+        self.nbytes = 0
+
+    def getTable(self, modes: np.ndarray, angles: np.ndarray, cache: bool=True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        return:
+            cos, sin of outer(modes, angles), shape (modes.size, angles.size), read-only if cached
+        """
+        modes = np.ascontiguousarray(modes, dtype=float).reshape(-1)
+        angles = np.ascontiguousarray(angles, dtype=float).reshape(-1)
+        if not cache:
+            angle = np.outer(modes, angles)
+            return np.cos(angle), np.sin(angle)
+        key = (modes.tobytes(), angles.tobytes())
+        table = self.tables.get(key)
+        if table is not None:
+            profiler.count("cacheHit")
+            self.tables.move_to_end(key)
+            return table
+        profiler.count("cacheMiss")
+        angle = np.outer(modes, angles)
+        table = (np.cos(angle), np.sin(angle))
+        nbytes = 2*table[0].nbytes + len(key[0]) + len(key[1])
+        if nbytes <= self.maxBytes:
+            for value in table:
+                value.flags.writeable = False
+            self.tables[key] = table
+            self.nbytes += nbytes
+            while self.nbytes > self.maxBytes:
+                (modesKey, anglesKey), (cos, sin) = self.tables.popitem(last=False)
+                self.nbytes -= cos.nbytes + sin.nbytes + len(modesKey) + len(anglesKey)
+        return table
+
+    def _getFactors(self, xm: np.ndarray, xn: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, cache: bool) -> Tuple[np.ndarray]:
+        mArr, mIndex = np.unique(np.asarray(xm, dtype=float).reshape(-1), return_inverse=True)
+        nArr, nIndex = np.unique(np.asarray(xn, dtype=float).reshape(-1), return_inverse=True)
+        cosM, sinM = self.getTable(mArr, thetaArr, cache=cache)
+        cosN, sinN = self.getTable(nArr, zetaArr, cache=cache)
+        return cosM[mIndex], sinM[mIndex], cosN[nIndex], sinN[nIndex]
+
+    def getTrig(self, xm: np.ndarray, xn: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, cache: bool=True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        At the points (thetaArr[i], zetaArr[i]), a scalar or length-1 `zetaArr` is broadcast.
+        return:
+            cos, sin of (xm*theta - xn*zeta), shape (mn, N)
+        """
+        cosM, sinM, cosN, sinN = self._getFactors(xm, xn, thetaArr, zetaArr, cache)
+        return cosM*cosN + sinM*sinN, sinM*cosN - cosM*sinN
+
+    def getTrig_grid(self, xm: np.ndarray, xn: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, cache: bool=True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        On the tensor grid of thetaArr and zetaArr.
+        return:
+            cos, sin of (xm*theta - xn*zeta), shape (mn, thetaArr.size, zetaArr.size)
+        """
+        cosM, sinM, cosN, sinN = self._getFactors(xm, xn, thetaArr, zetaArr, cache)
+        cosM, sinM = cosM[:, :, np.newaxis], sinM[:, :, np.newaxis]
+        cosN, sinN = cosN[:, np.newaxis, :], sinN[:, np.newaxis, :]
+        return cosM*cosN + sinM*sinN, sinM*cosN - cosM*sinN
+
+
+trigCache = TrigCache()
+
+
+def getTrig(xm: np.ndarray, xn: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, cache: bool=True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `TrigCache.getTrig` of the shared cache.
+    """
+    return trigCache.getTrig(xm, xn, thetaArr, zetaArr, cache=cache)
+
+
+def getTrig_grid(xm: np.ndarray, xn: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, cache: bool=True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `TrigCache.getTrig_grid` of the shared cache.
+    """
+    return trigCache.getTrig_grid(xm, xn, thetaArr, zetaArr, cache=cache)
+
+
+if __name__ == "__main__":
+    pass
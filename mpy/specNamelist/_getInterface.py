@@ -3,26 +3,17 @@
 # _getInterface.py
 
 
-from coilpy import FourSurf
+from ..geometry.surface import FourierInterfaces
 from typing import List
 
 
-def getInterface(self) -> List[FourSurf]:
-    surface = list()
-    xm = list()
-    xn = list()
-    rbcList = [list() for i in range(self._Nvol)]
-    zbsList = [list() for i in range(self._Nvol)]
-    rbsList = [list() for i in range(self._Nvol)]
-    zbcList = [list() for i in range(self._Nvol)]
-    for (m, n), data in self.interface_guess.items():
-        xm.append(m)
-        xn.append(n)
-        for i in range(self._Nvol):
-            rbcList[i].append(data["Rbc"][i])
-            zbsList[i].append(data["Zbs"][i])
-            rbsList[i].append(data["Rbs"][i])
-            zbcList[i].append(data["Zbc"][i])
-    surface = [FourSurf(xm=xm, xn=xn, rbc=rbcList[i], zbs=zbsList[i], rbs=rbsList[i], zbc=zbcList[i]) for i in range(self._Nvol)]
+def getInterface(self, fourSurf: bool=True) -> List or FourierInterfaces:
+    """
+    The initial guess of the interfaces. 
+    Args:
+        fourSurf: return a list of `coilpy.FourSurf`, otherwise the `FourierInterfaces` of all the interfaces, which needs no coilpy.
+    """
+    surface = FourierInterfaces.fromNamelist(self)
+    if fourSurf:
+        return surface.toFourSurf()
     return surface
-    
\ No newline at end of file
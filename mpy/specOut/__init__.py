@@ -1 +1,2 @@
-from .specOut import SPECOut
\ No newline at end of file
+from .specOut import SPECOut
+from .batchPlot import batchPlot
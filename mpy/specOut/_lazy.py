@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# _lazy.py
+
+
+import os
+import h5py
+import keyword
+import numpy as np
+import py_spec
+
+
+def readDataset(filename: str, path: str, mmap: bool=True) -> np.ndarray:
+    """
+    Read a dataset of the HDF5 file, contiguous and uncompressed numeric datasets are memory-mapped (read-only).
+    """
+    with h5py.File(filename, 'r') as f:
+        dset = f[path]
+        offset = None
+        if mmap and dset.chunks is None and dset.compression is None and dset.dtype.kind in "iuf":
+            offset = dset.id.get_offset()
+        if offset is None:
+            value = dset[()]
+        else:
+            value = np.memmap(filename, dtype=dset.dtype, mode='r', offset=offset, shape=dset.shape)
+    if np.ndim(value) > 0 and len(value) == 1:
+        value = value[0]
+    return value
+
+
+class LazyGroup(py_spec.SPECout):
+    """
+    A group of the SPEC output, the datasets with at least `threshold` elements are read on the first access.
+    """
+
+    def __init__(self, filename: str, group: h5py.Group, threshold: int, mmap: bool) -> None:
+        self._filename = filename
+        self._mmap = mmap
+        self._lazy = dict()
+        self._hooks = dict()
+        fillGroup(self, filename, group, threshold, mmap)
+
+    def __getattr__(self, name: str):
+        lazy = self.__dict__.get("_lazy")
+        if lazy is None or name not in lazy:
+            raise AttributeError(name)
+        value = readDataset(self._filename, lazy.pop(name), mmap=self._mmap)
+        hook = self._hooks.pop(name, None)
+        if hook is not None:
+            value = hook(value)
+        setattr(self, name, value)
+        return value
+
+    def setHook(self, name: str, hook) -> None:
+        """
+        Apply `hook` to the dataset `name` when it is read, or now if it has been read.
+        """
+        if name in self._lazy:
+            self._hooks[name] = hook
+        elif hasattr(self, name):
+            setattr(self, name, hook(getattr(self, name)))
+
+
+def fillGroup(self, filename: str, group: h5py.Group, threshold: int, mmap: bool) -> None:
+    """
+    Set the items of the HDF5 group as the attributes, following `py_spec.SPECout`.
+    """
+    for key in group:
+        if isinstance(group[key], h5py.Group):
+            name = key + "1" if key in keyword.kwlist else key
+            setattr(self, name, LazyGroup(filename, group[key], threshold, mmap))
+        elif isinstance(group[key], h5py.Dataset):
+            name = key + "_" if key in keyword.kwlist else key
+            if group[key].size >= threshold and hasattr(self, "_lazy"):
+                self._lazy[name] = group[key].name
+            else:
+                value = group[key][()]
+                if np.ndim(value) > 0 and len(value) == 1:
+                    value = value[0]
+                setattr(self, name, value)
+
+
+def lazyLoad(self, filename: str, threshold: int=4096, mmap: bool=True) -> None:
+    """
+    Load the SPEC output with the large datasets deferred until they are accessed.
+    """
+    with h5py.File(filename, 'r') as f:
+        try:
+            if f['version'][()][0] < py_spec.output.spec.SPEC_MAJOR_VERSION:
+                print("!!!Warning: this python package is used for SPEC!")
+        except KeyError:
+            print("!!!Warning: you might be not reading a SPEC HDF5 file!")
+        fillGroup(self, filename, f, threshold, mmap)
+    self.filename = os.path.abspath(filename)
+
+    self.input.physics.Lrad = np.atleast_1d(self.input.physics.Lrad)
+    self.output.im = np.atleast_1d(self.output.im)
+    self.output.in_ = np.atleast_1d(self.output.in_)
+
+    # these define the target dimensions in the radial direction
+    Mvol = self.input.physics.Nvol
+    if self.input.physics.Lfreebound:
+        Mvol += 1
+    Lrad = self.input.physics.Lrad
+
+    # split up radial matrix dimension into list of matrices for each of the nested volumes
+    def splitVolumes(value: np.ndarray) -> list:
+        value = np.atleast_2d(value)
+        starts = np.concatenate(([0], np.cumsum(Lrad[:Mvol]+1)))
+        return [value[:, starts[i]: starts[i]+Lrad[i]+1] for i in range(Mvol)]
+    for key in ["Ate", "Ato", "Aze", "Azo"]:
+        self.vector_potential.setHook(key, splitVolumes)
+    for key in ["Rij", "Zij", "sg", "BR", "Bp", "BZ"]:
+        self.grid.setHook(key, splitVolumes)
+
+    if hasattr(self, "poincare"):
+        # remove unsuccessful Poincare trajectories
+        success = np.atleast_1d(self.poincare.success)
+        def removeFailed(value: np.ndarray) -> np.ndarray:
+            if np.all(success == 1):
+                return value
+            return value[success == 1, :, :]
+        for key in ["R", "Z", "t", "s"]:
+            self.poincare.setHook(key, removeFailed)
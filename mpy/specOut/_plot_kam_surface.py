@@ -1,67 +1,69 @@
-def plot_kam_surface(self, ns=[], ntheta=1000, zeta=0.0, ax=None, **kwargs):
+def plot_kam_surface(self, ns=[], ntheta=1000, zeta=0.0, ax=None, fourSurf=True, **kwargs):
     """Plot SPEC KAM surfaces
     Args:
         ns (list, optional): List of surface index to be plotted (0 for axis, -1 for the computational boundary if applied).
                              Defaults to [] (plot all).
         zeta (float, optional): The toroidal angle where the cross-sections are plotted. Defaults to 0.0.
         ax (Matplotlib axis, optional): Matplotlib axis to be plotted on. Defaults to None.
+        fourSurf (bool, optional): return a list of `coilpy.FourSurf` as `py_spec`, otherwise the plotted `FourierInterfaces`,
+                                   which needs no coilpy. Defaults to True.
         kwargs (dict, optional): Keyword arguments. Matplotlib.pyplot.plot keyword arguments
     Returns:
-        list : list of FourSurf classes
+        list : list of FourSurf classes, or FourierInterfaces if not `fourSurf`
     """
     import numpy as np
-    import matplotlib.pyplot as plt
+    from ..geometry.surface import FourierInterfaces
 
     Igeometry = self.input.physics.Igeometry
-    from coilpy import FourSurf
 
-    surfs = []
     # check if plot all
     if len(ns) == 0:
         # 0 for the axis
         ns = np.arange(self.input.physics.Nvol + self.input.physics.Lfreebound + 1)
     else:
         ns = np.atleast_1d(ns)
+    surfs = FourierInterfaces.fromSPECOut(self)[ns]
     # get axix data
     if ax is None:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
-    plt.sca(ax)
     # set default plotting parameters
     if kwargs.get("label") == None:
         kwargs.update({"label": "SPEC_KAM"})  # default label
     if kwargs.get("c") == None:
         kwargs.update({"c": "red"})
-    # plot all the surfaces
+    # plot all the surfaces, evaluated at once
     if Igeometry == 3:
-        for i in ns:
-            _surf = FourSurf.read_spec_output(self, i)
-            if i == 0:
+        if kwargs.get("linewidth") == None:
+            kwargs.update({"linewidth": 2.0})
+        _theta = np.linspace(0, 2 * np.pi, 360)
+        _r, _z = surfs.rz(_theta, np.ones_like(_theta) * zeta)
+        for i in range(len(ns)):
+            if ns[i] == 0:
                 pass  # don't do anything for the axis
             else:
-                _surf.plot(zeta=zeta, **kwargs)
-            surfs.append(_surf)
-        plt.axis("equal")
-        return surfs
+                ax.plot(_r[i], _z[i], **kwargs)
+        ax.axis("equal")
+        ax.set_xlabel("R [m]", fontsize=20)
+        ax.set_ylabel("Z [m]", fontsize=20)
+        ax.tick_params(labelsize=16)
+        return surfs.toFourSurf() if fourSurf else surfs
     elif Igeometry == 2:
-        for i in ns:
-            _surf = FourSurf.read_spec_output(self, i)
-            if i == 0:
+        _theta = np.arange(
+            0, 2 * np.pi + 2 * np.pi / ntheta, 2 * np.pi / ntheta
+        )
+        _r, _z = surfs.rz(_theta, np.ones_like(_theta) * zeta)
+        for i in range(len(ns)):
+            if ns[i] == 0:
                 pass  # don't do anything for the axis
             else:
-                _theta = np.arange(
-                    0, 2 * np.pi + 2 * np.pi / ntheta, 2 * np.pi / ntheta
-                )
-                _r, _z = _surf.rz(_theta, np.ones_like(_theta) * zeta)
-                plt.scatter(_r * np.cos(_theta), _r * np.sin(_theta), **kwargs)
-            surfs.append(_surf)
-        plt.axis("equal")
-        return surfs
+                ax.scatter(_r[i] * np.cos(_theta), _r[i] * np.sin(_theta), **kwargs)
+        ax.axis("equal")
+        return surfs.toFourSurf() if fourSurf else surfs
     elif Igeometry == 1:
-        for i in ns:
-            _surf = FourSurf.read_spec_output(self, i)
-            # plot axis as a curve
-            _theta = np.arange(0, 2 * np.pi + 2 * np.pi / ntheta, 2 * np.pi / ntheta)
-            _r, _z = _surf.rz(_theta, np.ones_like(_theta) * zeta)
-            plt.scatter(_theta, _r, **kwargs)
-            surfs.append(_surf)
-        return 
\ No newline at end of file
+        # plot axis as a curve
+        _theta = np.arange(0, 2 * np.pi + 2 * np.pi / ntheta, 2 * np.pi / ntheta)
+        _r, _z = surfs.rz(_theta, np.ones_like(_theta) * zeta)
+        for i in range(len(ns)):
+            ax.scatter(_theta, _r[i], **kwargs)
+        return surfs.toFourSurf() if fourSurf else surfs
@@ -1,20 +1,22 @@
-def plot_poincare(self, toroidalIdx=0, prange="full", ax=None,**kwargs):
+def plot_poincare(self, toroidalIdx=0, prange="full", ax=None, density=False, bins=512, maxPoints=None, **kwargs):
     """Poincare plots
 
     Args:
         toroidalIdx (int, optional): The index of toroidal cross-section to be plotted. Defaults to 0.
         prange (str, optional): Range of plotted points, one of ['full', 'upper', 'lower']. Defaults to 'full'.
         ax (Matplotlib axis, optional): Matplotlib axis to be plotted on. Defaults to None.
-        kwargs (dict, optional): keyword arguments. Matplotlib.pyplot.scatter keyword arguments.
+        density (bool, optional): Bin all the points into a 2D histogram drawn as a single image, for large runs. Defaults to False.
+        bins (int or tuple, optional): The number of bins in the density mode. Defaults to 512.
+        maxPoints (int, optional): Downsample the points to at most maxPoints in the density mode. Defaults to None.
+        kwargs (dict, optional): keyword arguments. Matplotlib.pyplot.scatter (Matplotlib.pyplot.imshow in the density mode) keyword arguments.
     Raises:
         ValueError: prange should be one of ['full', 'upper', 'lower']
 
     Returns:
         pyplot.scatter: Matplotlib.pyplot.scatter returns
     """
-    import matplotlib.pyplot as plt
-    import matplotlib.lines as mlines
     import numpy as np
+    from ..misc import plotDensity
 
     # extract slice corresponding to the given toroidal cutplane
     Igeometry = self.input.physics.Igeometry
@@ -33,21 +35,30 @@ def plot_poincare(self, toroidalIdx=0, prange="full", ax=None,**kwargs):
         )
     # get axix data
     if ax is None:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
-    plt.sca(ax)
     # set default plotting parameters
     # use dots
-    if kwargs.get("marker") == None:
+    if kwargs.get("marker") == None and not density:
         kwargs.update({"marker": "."})
     # use gray color
     if kwargs.get("c") == None:
         pass
     # size of marker
-    if kwargs.get("s") == None:
+    if kwargs.get("s") == None and not density:
         kwargs.update({"s": 0.3})
         # kwargs.update({"c": "gray"})
     # make plot depending on the 'range'
-    if prange == "full":
+    if density and prange in ["full", "upper", "lower"]:
+        # a single image of the binned points of all the trajectories
+        if prange == "full":
+            mask = np.isfinite(zz)
+        elif prange == "upper":
+            mask = zz >= 0
+        else:
+            mask = zz <= 0
+        dots = plotDensity(ax, rr[mask], zz[mask], bins=bins, maxPoints=maxPoints, **kwargs)
+    elif prange == "full":
         nptrj = rr.shape[0]
         for ii in range(nptrj):
             dots = ax.scatter(rr[ii, :], zz[ii, :], **kwargs)
@@ -59,18 +70,17 @@ def plot_poincare(self, toroidalIdx=0, prange="full", ax=None,**kwargs):
         raise ValueError("prange should be one of ['full'(default), 'upper', 'lower'].")
     # adjust figure properties
     if self.input.physics.Igeometry == 3:
-        plt.xlabel(r"$R / \mathrm{m}$", fontsize=16)
-        plt.ylabel(r"$Z / \mathrm{m}$", fontsize=16)
-        plt.axis("equal")
+        ax.set_xlabel(r"$R / \mathrm{m}$", fontsize=16)
+        ax.set_ylabel(r"$Z / \mathrm{m}$", fontsize=16)
+        ax.axis("equal")
     if self.input.physics.Igeometry == 2:
-        plt.xlabel("X [m]", fontsize=20)
-        plt.ylabel("Y [m]", fontsize=20)
-        plt.axis("equal")
+        ax.set_xlabel("X [m]", fontsize=20)
+        ax.set_ylabel("Y [m]", fontsize=20)
+        ax.axis("equal")
     if self.input.physics.Igeometry == 1:
-        plt.ylabel("R [m]", fontsize=20)
-        plt.xlabel(r"$\theta$", fontsize=20)
-        plt.xlim([0, 2*np.pi])
-    plt.xticks(fontsize=16)
-    plt.yticks(fontsize=16)
+        ax.set_ylabel("R [m]", fontsize=20)
+        ax.set_xlabel(r"$\theta$", fontsize=20)
+        ax.set_xlim([0, 2*np.pi])
+    ax.tick_params(labelsize=16)
 
     return
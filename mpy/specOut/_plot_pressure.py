@@ -5,7 +5,6 @@ def plot_pressure(self, specNormalize=True, ax=None, **kwargs):
         kwargs (dict, optional): Keyword arguments. Matplotlib.pyplot.plot keyword arguments.
     """
     import numpy as np
-    import matplotlib.pyplot as plt
 
     mu_0 = 4 * np.pi * 1.0e-7
 
@@ -15,8 +14,8 @@ def plot_pressure(self, specNormalize=True, ax=None, **kwargs):
         pressure /= mu_0
     # get axis data
     if ax is None:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
-    plt.sca(ax)
     # set default plotting parameters
     if kwargs.get("linewidth") == None:
         kwargs.update({"linewidth": 2.0})  # prefer thicker lines
@@ -34,8 +33,7 @@ def plot_pressure(self, specNormalize=True, ax=None, **kwargs):
     # plot
     ax.plot(x_tflux, y_pressure, **kwargs)
     # Figure properties
-    plt.xlabel("Normalized flux", fontsize=20)
-    plt.ylabel("Pressure", fontsize=20)
-    plt.xticks(fontsize=16)
-    plt.yticks(fontsize=16)
+    ax.set_xlabel("Normalized flux", fontsize=20)
+    ax.set_ylabel("Pressure", fontsize=20)
+    ax.tick_params(labelsize=16)
     return
\ No newline at end of file
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# batchPlot.py
+
+
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Dict, Tuple
+
+
+manifestName = ".batchPlot.json"
+
+
+def _getPlotFunction(name: str):
+    if name == "pressure":
+        from ._plot_pressure import plot_pressure
+        return plot_pressure
+    elif name == "poincare":
+        from ._plot_poincare import plot_poincare
+        return plot_poincare
+    elif name == "kam_surface":
+        from ._plot_kam_surface import plot_kam_surface
+        # the returned surfaces are not used, so coilpy is not needed
+        return partial(plot_kam_surface, fourSurf=False)
+    else:
+        raise ValueError(
+            "The name of the figure should be one of ['pressure', 'poincare', 'kam_surface']. "
+        )
+
+
+def _getOutput(specFile: str, figure: Dict, outputDir: str, unique: bool=True) -> str:
+    """
+    The figure file `{stem of specFile}_{suffix}.{format}`, a short hash of the absolute path is appended to the stem
+    if the stem is not `unique` among the SPEC outputs.
+    """
+    stem = os.path.splitext(os.path.basename(specFile))[0]
+    if not unique:
+        stem += "_" + hashlib.sha1(os.path.abspath(specFile).encode()).hexdigest()[:8]
+    suffix = figure.get("suffix", figure["name"])
+    return os.path.join(outputDir, stem + "_" + suffix + "." + figure.get("format", "png"))
+
+
+def _getKey(specFile: str, figure: Dict) -> str:
+    """
+    The key of the inputs of a figure, the SPEC output file (path, size, modification time) and the figure spec.
+    """
+    stat = os.stat(specFile)
+    content = json.dumps([os.path.abspath(specFile), stat.st_size, stat.st_mtime_ns, figure], sort_keys=True, default=str)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def _renderFile(specFile: str, figures: List[Dict], outputs: List[str], lazy: bool=True) -> Tuple[List[str], List[Exception]]:
+    """
+    Render the figures of one SPEC output with the Agg canvas, the output is read only once.
+    A failed figure does not stop the other figures of the file.
+    return:
+        the rendered figure files, the errors of the failed figures
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from .specOut import SPECOut
+
+    specData = SPECOut(specFile, lazy=lazy)
+    rendered, errors = list(), list()
+    for figure, output in zip(figures, outputs):
+        try:
+            fig = Figure(figsize=figure.get("figsize", (8, 6)))
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+            _getPlotFunction(figure["name"])(specData, ax=ax, **figure.get("kwargs", dict()))
+            fig.savefig(output, dpi=figure.get("dpi", 150), bbox_inches="tight")
+        except Exception as error:
+            errors.append(error)
+            continue
+        rendered.append(output)
+    return rendered, errors
+
+
+def batchPlot(specFiles: List[str], figures: List[Dict], outputDir: str, nprocess: int=None, force: bool=False, lazy: bool=True) -> List[str]:
+    """
+    Render the figures of many SPEC outputs without the pyplot state, the figures whose inputs are unchanged are skipped.
+    Args:
+        specFiles: the SPEC output files.
+        figures: the figure specs, e.g. `{"name": "poincare", "kwargs": {"density": True}, "format": "pdf"}`,
+            `name` is one of ['pressure', 'poincare', 'kam_surface'], the other keys are optional:
+            `kwargs` of the plot function, `suffix` of the file name (defaults to `name`), `format` (defaults to "png"), `figsize` and `dpi`.
+        outputDir: the directory of the figures, named `{stem of specFile}_{suffix}.{format}`, 
+            `{stem of specFile}_{hash of the path}_{suffix}.{format}` if several SPEC outputs have the same stem.
+        nprocess: the number of worker processes, None, render in this process.
+        force: render all the figures.
+        lazy: read the SPEC outputs with `SPECOut(..., lazy=True)`.
+    return:
+        the rendered figure files.
+    If some of the figures fail, the others are still rendered and recorded, and the first error is raised at the end.
+    """
+    for figure in figures:
+        _getPlotFunction(figure["name"])
+    os.makedirs(outputDir, exist_ok=True)
+    manifestFile = os.path.join(outputDir, manifestName)
+    manifest = dict()
+    if os.path.exists(manifestFile) and not force:
+        with open(manifestFile, 'r') as f:
+            manifest = json.load(f)
+
+    # group the figures to render by the SPEC output
+    tasks: List[Tuple[str, List[Dict], List[str]]] = list()
+    keys = dict()
+    stems = [os.path.splitext(os.path.basename(specFile))[0] for specFile in specFiles]
+    outputs = [_getOutput(specFile, figure, outputDir, stems.count(stem) == 1) for specFile, stem in zip(specFiles, stems) for figure in figures]
+    if len(set(outputs)) < len(outputs):
+        raise ValueError(
+            "The figure files are not unique, check the duplicated SPEC outputs and the `suffix` and `format` of the figures. "
+        )
+    for specFile, stem in zip(specFiles, stems):
+        todoFigures, todoOutputs = list(), list()
+        for figure in figures:
+            output = _getOutput(specFile, figure, outputDir, stems.count(stem) == 1)
+            key = _getKey(specFile, figure)
+            if manifest.get(output) == key and os.path.exists(output):
+                continue
+            keys[output] = key
+            todoFigures.append(figure)
+            todoOutputs.append(output)
+        if len(todoFigures) > 0:
+            tasks.append((specFile, todoFigures, todoOutputs))
+
+    rendered = list()
+    errors = list()
+    def update(result: Tuple[List[str], List[Exception]]) -> None:
+        outputs, failures = result
+        rendered.extend(outputs)
+        errors.extend(failures)
+        for output in outputs:
+            manifest[output] = keys[output]
+    try:
+        if nprocess is None or nprocess <= 1:
+            for specFile, todoFigures, todoOutputs in tasks:
+                try:
+                    update(_renderFile(specFile, todoFigures, todoOutputs, lazy))
+                except Exception as error:
+                    errors.append(error)
+        else:
+            with ProcessPoolExecutor(max_workers=nprocess) as executor:
+                futures = [executor.submit(_renderFile, *task, lazy) for task in tasks]
+                for future in futures:
+                    try:
+                        update(future.result())
+                    except Exception as error:
+                        errors.append(error)
+    finally:
+        # keep the finished figures even if some of the figures fail
+        with open(manifestFile, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+    if len(errors) > 0:
+        raise errors[0]
+    return rendered
+
+
+if __name__ == "__main__":
+    pass
@@ -1,10 +1,161 @@
 import numpy as np
-from coilpy import FourSurf
+from ..geometry.surface import FourierInterfaces
+from ..misc import profiler, getTrig, getTrig_grid
 from typing import Tuple
 
 
+class VolumeCoordinates:
+    """
+    The SPEC coordinates (s, theta, zeta) of one volume (`Igeometry = 3`), with the Fourier coefficients of the inner and
+    outer interfaces cached. `getRZ` is the point-wise (`input1D`) counterpart of `SPECout.get_RZ_derivatives`.
+    """
+
+    def __init__(self, specData, lvol: int) -> None:
+        if specData.input.physics.Igeometry != 3:
+            raise ValueError("Only the toroidal geometry (Igeometry = 3) is supported. ")
+        self.lvol = lvol
+        self.stellsym = specData.input.physics.Istellsym == 1
+        self.im = np.atleast_1d(specData.output.im).astype(float)
+        self.in_ = np.atleast_1d(specData.output.in_).astype(float)
+        self.Rac, self.Rbc = np.array(specData.output.Rbc[lvol: lvol+2], dtype=float)
+        self.Zas, self.Zbs = np.array(specData.output.Zbs[lvol: lvol+2], dtype=float)
+        self.Ras, self.Rbs = np.array(specData.output.Rbs[lvol: lvol+2], dtype=float)
+        self.Zac, self.Zbc = np.array(specData.output.Zbc[lvol: lvol+2], dtype=float)
+        # the innermost volume contains the coordinate singularity
+        self.singular = (lvol == 0)
+
+    def _radialFactor(self, sArr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        return:
+            fac, fac_s, shape (mn, N)
+        """
+        sbar = (sArr.reshape(1,-1) + 1) / 2
+        im = self.im.reshape(-1,1)
+        if not self.singular:
+            return np.repeat(sbar, im.size, axis=0), 0.5 * np.ones((im.size, sbar.size))
+        power = np.where(im == 0, 2, im)
+        fac = np.power(sbar, power)
+        fac_s = power / 2 * np.power(sbar, power-1)
+        return fac, fac_s
+
+    def getRZ(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, chunkSize: int=65536) -> Tuple[np.ndarray]:
+        """
+        Evaluate the coordinates and their derivatives at the points (sArr[i], thetaArr[i], zetaArr[i]).
+        return:
+            R, R_s, R_theta, R_zeta, Z, Z_s, Z_theta, Z_zeta
+        """
+        sArr = np.asarray(sArr, dtype=float).flatten()
+        thetaArr = np.asarray(thetaArr, dtype=float).flatten()
+        zetaArr = np.asarray(zetaArr, dtype=float).flatten()
+        assert sArr.shape == thetaArr.shape == zetaArr.shape
+        values = np.empty((8, sArr.size))
+        im, in_ = self.im.reshape(-1,1), self.in_.reshape(-1,1)
+        for start in range(0, sArr.size, chunkSize):
+            end = start + chunkSize
+            fac, fac_s = self._radialFactor(sArr[start:end])
+            cosMat, sinMat = getTrig(self.im, self.in_, thetaArr[start:end], zetaArr[start:end], cache=False)
+            rc = self.Rac.reshape(-1,1) + fac * (self.Rbc-self.Rac).reshape(-1,1)
+            zs = self.Zas.reshape(-1,1) + fac * (self.Zbs-self.Zas).reshape(-1,1)
+            values[0, start:end] = np.sum(rc * cosMat, axis=0)
+            values[1, start:end] = np.sum(fac_s * (self.Rbc-self.Rac).reshape(-1,1) * cosMat, axis=0)
+            values[2, start:end] = np.sum(-im * rc * sinMat, axis=0)
+            values[3, start:end] = np.sum(in_ * rc * sinMat, axis=0)
+            values[4, start:end] = np.sum(zs * sinMat, axis=0)
+            values[5, start:end] = np.sum(fac_s * (self.Zbs-self.Zas).reshape(-1,1) * sinMat, axis=0)
+            values[6, start:end] = np.sum(im * zs * cosMat, axis=0)
+            values[7, start:end] = np.sum(-in_ * zs * cosMat, axis=0)
+            if not self.stellsym:
+                rs = self.Ras.reshape(-1,1) + fac * (self.Rbs-self.Ras).reshape(-1,1)
+                zc = self.Zac.reshape(-1,1) + fac * (self.Zbc-self.Zac).reshape(-1,1)
+                values[0, start:end] += np.sum(rs * sinMat, axis=0)
+                values[1, start:end] += np.sum(fac_s * (self.Rbs-self.Ras).reshape(-1,1) * sinMat, axis=0)
+                values[2, start:end] += np.sum(im * rs * cosMat, axis=0)
+                values[3, start:end] += np.sum(-in_ * rs * cosMat, axis=0)
+                values[4, start:end] += np.sum(zc * cosMat, axis=0)
+                values[5, start:end] += np.sum(fac_s * (self.Zbc-self.Zac).reshape(-1,1) * cosMat, axis=0)
+                values[6, start:end] += np.sum(-im * zc * sinMat, axis=0)
+                values[7, start:end] += np.sum(in_ * zc * sinMat, axis=0)
+        return tuple(values)
+
+    def getRZ_grid(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        Evaluate the coordinates and their derivatives on the tensor grid, the counterpart of `SPECout.get_RZ_derivatives`.
+        The trig tables of the grid are cached, see `mpy.misc.TrigCache`.
+        return:
+            R, R_s, R_theta, R_zeta, Z, Z_s, Z_theta, Z_zeta, shape (sArr.size, thetaArr.size, zetaArr.size)
+        """
+        sArr = np.atleast_1d(np.asarray(sArr, dtype=float))
+        thetaArr = np.atleast_1d(np.asarray(thetaArr, dtype=float))
+        zetaArr = np.atleast_1d(np.asarray(zetaArr, dtype=float))
+        shape = (sArr.size, thetaArr.size, zetaArr.size)
+        im, in_ = self.im.reshape(-1,1), self.in_.reshape(-1,1)
+        fac, fac_s = self._radialFactor(sArr)
+        cosMat, sinMat = getTrig_grid(self.im, self.in_, thetaArr, zetaArr)
+        cosMat, sinMat = cosMat.reshape(self.im.size, -1), sinMat.reshape(self.im.size, -1)
+        pairs = [(self.Rac, self.Rbc, cosMat, sinMat, 1), (self.Zas, self.Zbs, sinMat, cosMat, -1)]
+        if not self.stellsym:
+            pairs += [(self.Ras, self.Rbs, sinMat, cosMat, -1), (self.Zac, self.Zbc, cosMat, sinMat, 1)]
+        values = np.zeros((8, sArr.size, cosMat.shape[1]))
+        for i, (inner, outer, basis, derivative, sign) in enumerate(pairs):
+            # R = sum(coef*basis), d(basis)/dtheta = -sign*m*derivative, d(basis)/dzeta = sign*n*derivative
+            coef = inner.reshape(-1,1) + fac * (outer-inner).reshape(-1,1)
+            coef_s = fac_s * (outer-inner).reshape(-1,1)
+            offset = 4 * (i%2)
+            values[offset] += np.dot(coef.T, basis)
+            values[offset+1] += np.dot(coef_s.T, basis)
+            values[offset+2] += np.dot((-sign*im*coef).T, derivative)
+            values[offset+3] += np.dot((sign*in_*coef).T, derivative)
+        return tuple(value.reshape(shape) for value in values)
+
+    def getJacobian(self, sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, chunkSize: int=65536) -> np.ndarray:
+        """
+        The Jacobian R*(R_theta*Z_s - R_s*Z_theta) at the points (sArr[i], thetaArr[i], zetaArr[i]), the point-wise counterpart of `SPECout.jacobian`.
+        """
+        R, R_s, R_theta, _, _, Z_s, Z_theta, _ = self.getRZ(sArr, thetaArr, zetaArr, chunkSize=chunkSize)
+        return R * (R_theta*Z_s - R_s*Z_theta)
+
+    def getOrientation(self) -> int:
+        """
+        return:
+            1 if the geometric poloidal angle increases with theta on the outer interface, else -1
+        """
+        thetaArr = np.linspace(0, 2*np.pi, 64, endpoint=False)
+        rArr, _, _, _, zArr, _, _, _ = self.getRZ(np.ones_like(thetaArr), thetaArr, np.zeros_like(thetaArr))
+        area = np.sum(rArr*np.roll(zArr,-1) - np.roll(rArr,-1)*zArr)
+        return 1 if area > 0 else -1
+
+
+def getCoordinates(self, lvol: int) -> VolumeCoordinates:
+    """
+    Returns:
+        the cached `VolumeCoordinates` of the volume `lvol`
+    """
+    if not hasattr(self, "_coordinates"):
+        self._coordinates = dict()
+    if lvol not in self._coordinates:
+        profiler.count("cacheMiss")
+        self._coordinates[lvol] = VolumeCoordinates(self, lvol)
+    else:
+        profiler.count("cacheHit")
+    return self._coordinates[lvol]
+
+
+def getInterfaces(self) -> FourierInterfaces:
+    """
+    Returns:
+        the cached `FourierInterfaces` of the axis and all the interfaces
+    """
+    if not hasattr(self, "_interfaces"):
+        profiler.count("cacheMiss")
+        self._interfaces = FourierInterfaces.fromSPECOut(self)
+    else:
+        profiler.count("cacheHit")
+    return self._interfaces
+
+
 def cylinder2spec(self, lvol: int, r: np.ndarray, phi: np.ndarray, z: np.ndarray) -> Tuple[np.ndarray]:
     """
+    Approximate (s, theta) with the geometric poloidal angle, see `cylinder2spec_newton` for the accurate mapping.
     Returns:
         s, theta, zeta
     """
@@ -13,20 +164,79 @@ def cylinder2spec(self, lvol: int, r: np.ndarray, phi: np.ndarray, z: np.ndarray
     shape = r.shape
     r, phi, z = r.flatten(), phi.flatten(), z.flatten()
 
-    innerSurf = FourSurf.read_spec_output(self, lvol)
-    outSurf = FourSurf.read_spec_output(self, lvol+1)
-    axis = FourSurf.read_spec_output(self, 0)
-
     zeta = phi
-    
-    axisR, axisZ = axis.rz(0, 0)
-    axisR, axisZ = float(axisR), float(axisZ)
-    # theta = np.arctan2(z-axisZ, r-axisR)
-    theta = (-np.arctan2(z-axisZ, r-axisR)+2*np.pi) % (2*np.pi)
-
-    innerR, innerZ = innerSurf.rz(theta, zeta)
-    outR, outZ = outSurf.rz(theta, zeta)
-    s = (np.power(r-innerR,2) + np.power(z-innerZ,2)) / (np.power(outR-innerR,2) + np.power(outZ-innerZ,2))
-    s = 2*np.sqrt(s) - 1
+    theta, s = _getGuess(self, lvol, r, zeta, z, orientation=-1)
     return s.reshape(shape), theta.reshape(shape), zeta.reshape(shape)
 
+
+def cylinder2spec_newton(
+    self, lvol: int, r: np.ndarray, phi: np.ndarray, z: np.ndarray,
+    sInit: np.ndarray=None, thetaInit: np.ndarray=None,
+    maxIter: int=32, tol: float=1e-10, chunkSize: int=65536
+) -> Tuple[np.ndarray]:
+    """
+    Invert (R, phi, Z) -> (s, theta, zeta) in the volume `lvol` by solving
+        R(s, theta, zeta) = r, Z(s, theta, zeta) = z, zeta = phi
+    with Newton iterations, vectorized over all the points.
+    Args:
+        lvol: the number of the volume.
+        r, phi, z: the cylindrical coordinates of the points.
+        sInit, thetaInit: the initial guess, the geometric guess of `cylinder2spec` is used if None.
+        maxIter: the maximum number of Newton iterations.
+        tol: the tolerance of the distance |(R, Z) - (r, z)|.
+        chunkSize: the number of points evaluated at a time.
+    Returns:
+        s, theta, zeta, converged
+    """
+
+    r, phi, z = np.asarray(r, dtype=float), np.asarray(phi, dtype=float), np.asarray(z, dtype=float)
+    assert r.shape == phi.shape == z.shape
+    shape = r.shape
+    r, zeta, z = r.flatten(), phi.flatten(), z.flatten()
+    coordinates = self.getCoordinates(lvol)
+
+    if sInit is None or thetaInit is None:
+        theta, s = _getGuess(self, lvol, r, zeta, z, orientation=coordinates.getOrientation())
+    if sInit is not None:
+        s = np.array(sInit, dtype=float).flatten()
+    if thetaInit is not None:
+        theta = np.array(thetaInit, dtype=float).flatten()
+    converged = np.zeros(r.size, dtype=bool)
+    sMin = -1 + 1e-10 if coordinates.singular else -np.inf
+
+    active = np.arange(r.size)
+    for _ in range(maxIter+1):
+        rArr, r_s, r_theta, _, zArr, z_s, z_theta, _ = coordinates.getRZ(s[active], theta[active], zeta[active], chunkSize=chunkSize)
+        deltaR, deltaZ = rArr - r[active], zArr - z[active]
+        done = np.sqrt(deltaR*deltaR + deltaZ*deltaZ) < tol
+        converged[active[done]] = True
+        keep = ~done
+        active = active[keep]
+        if active.size == 0:
+            break
+        deltaR, deltaZ = deltaR[keep], deltaZ[keep]
+        r_s, r_theta, z_s, z_theta = r_s[keep], r_theta[keep], z_s[keep], z_theta[keep]
+        det = r_s*z_theta - r_theta*z_s
+        det = np.where(det == 0, np.finfo(float).tiny, det)
+        ds = np.clip((z_theta*deltaR - r_theta*deltaZ) / det, -0.5, 0.5)
+        dtheta = np.clip((-z_s*deltaR + r_s*deltaZ) / det, -0.5, 0.5)
+        s[active] = np.maximum(s[active] - ds, sMin)
+        theta[active] = theta[active] - dtheta
+
+    theta = theta % (2*np.pi)
+    return s.reshape(shape), theta.reshape(shape), zeta.reshape(shape), converged.reshape(shape)
+
+
+def _getGuess(self, lvol: int, r: np.ndarray, zeta: np.ndarray, z: np.ndarray, orientation: int=1) -> Tuple[np.ndarray]:
+    """
+    Guess theta with the geometric poloidal angle around the magnetic axis and s with the distance between the interfaces.
+    Returns:
+        theta, s
+    """
+    interfaces = getInterfaces(self)
+    (axisR,), (axisZ,) = interfaces.rz(np.zeros_like(r), zeta, index=[0])
+    theta = (orientation*np.arctan2(z-axisZ, r-axisR)+2*np.pi) % (2*np.pi)
+    (innerR, outR), (innerZ, outZ) = interfaces.rz(theta, zeta, index=[lvol, lvol+1])
+    s = (np.power(r-innerR,2) + np.power(z-innerZ,2)) / (np.power(outR-innerR,2) + np.power(outZ-innerZ,2))
+    s = 2*np.sqrt(s) - 1
+    return theta, s
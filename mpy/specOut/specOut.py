@@ -4,6 +4,7 @@
 
 
 import py_spec
+from ._lazy import lazyLoad
 
 
 class SPECOut(py_spec.SPECout):
@@ -11,16 +12,24 @@ class SPECOut(py_spec.SPECout):
     Class that contains the output of a SPEC calculation.
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, *args, lazy: bool=False, lazyThreshold: int=4096, mmap: bool=True, **kwargs):
+        """
+        Args:
+            lazy: read the datasets with at least `lazyThreshold` elements (Poincare data, vector potential, ...) on the first access.
+            mmap: in the lazy mode, memory-map the contiguous and uncompressed datasets instead of reading them.
+        """
+        if lazy and kwargs.get("content") is None:
+            lazyLoad(self, args[0], threshold=lazyThreshold, mmap=mmap)
+        else:
+            super().__init__(*args, **kwargs)
 
-    # from ._plot_kam_surface import plot_kam_surface
+    from ._plot_kam_surface import plot_kam_surface
 
     from ._plot_pressure import plot_pressure
 
     from ._plot_poincare import plot_poincare
 
-    from .mapping import cylinder2spec
+    from .mapping import getCoordinates, getInterfaces, cylinder2spec, cylinder2spec_newton
 
 
 if __name__ == "__main__":
@@ -1 +1,3 @@
-from .trace import traceCylindrical
\ No newline at end of file
+from .trace import traceCylindrical, traceCylindrical_many
+from .gridField import CylindricalGridField
+from .biotSavart import CoilSet
\ No newline at end of file
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# biotSavart.py
+
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .gridField import CylindricalGridField
+from typing import List, Tuple
+
+
+# permeability of vacuum
+mu0 = 4 * np.pi * 1e-7
+
+# the segments held by each worker process of `CoilSet`
+_workerSegments = None
+
+
+def _getField(starts: np.ndarray, ends: np.ndarray, currents: np.ndarray, chunkSize: int, points: np.ndarray) -> np.ndarray:
+    """
+    The field of the segments at the points, shape (N, 3).
+    """
+    field = np.zeros_like(points)
+    nSegments = currents.size
+    segChunk = min(nSegments, chunkSize)
+    pointChunk = max(1, chunkSize // segChunk)
+    for pStart in range(0, points.shape[0], pointChunk):
+        x = points[pStart: pStart+pointChunk, np.newaxis, :]
+        for sStart in range(0, nSegments, segChunk):
+            sEnd = sStart + segChunk
+            ri = x - starts[np.newaxis, sStart:sEnd, :]
+            rf = x - ends[np.newaxis, sStart:sEnd, :]
+            normI = np.linalg.norm(ri, axis=-1)
+            normF = np.linalg.norm(rf, axis=-1)
+            factor = (
+                currents[np.newaxis, sStart:sEnd] * (normI+normF)
+                / (normI * normF * (normI*normF + np.sum(ri*rf, axis=-1)))
+            )
+            field[pStart: pStart+pointChunk] += np.sum(factor[..., np.newaxis] * np.cross(ri, rf), axis=1)
+    return mu0 / (4*np.pi) * field
+
+
+def _initWorker(starts: np.ndarray, ends: np.ndarray, currents: np.ndarray, chunkSize: int) -> None:
+    global _workerSegments
+    _workerSegments = (starts, ends, currents, chunkSize)
+
+
+def _getField_worker(points: np.ndarray) -> np.ndarray:
+    return _getField(*_workerSegments, points)
+
+
+class CoilSet:
+    """
+    Filament coils made of straight segments, the magnetic field is computed by the Biot-Savart law!
+    The instance is callable as `fun(R, phi, Z) -> B_R, B_phi, B_Z` of `mpy.traceing.traceCylindrical`.
+    """
+
+    def __init__(self, coils: List[np.ndarray], currents: List[float], chunkSize: int=2**20, nprocess: int=None) -> None:
+        """
+        Args:
+            coils: list of the points of the coils, shape (n, 3), (x, y, z) in cartesian coordinates, each coil is closed.
+            currents: the currents of the coils.
+            chunkSize: the maximum number of (point, segment) pairs evaluated at a time.
+            nprocess: the number of worker processes, None, compute in this process. 
+                The workers are kept until `close()` (or the end of the `with` block), only the points are sent in each call.
+        """
+        assert len(coils) == len(currents)
+        starts, ends, segCurrents = list(), list(), list()
+        for coil, current in zip(coils, currents):
+            coil = np.asarray(coil, dtype=float)
+            if np.allclose(coil[0], coil[-1]):
+                coil = coil[:-1]
+            starts.append(coil)
+            ends.append(np.roll(coil, -1, axis=0))
+            segCurrents.append(current * np.ones(coil.shape[0]))
+        self.coils = coils
+        self.currents = currents
+        self.chunkSize = chunkSize
+        self.nprocess = nprocess
+        self._starts = np.concatenate(starts)
+        self._ends = np.concatenate(ends)
+        self._currents = np.concatenate(segCurrents)
+        self._executor = None
+
+    @classmethod
+    def readCoils(cls, coilsFile: str, **kwargs):
+        """
+        Read the coils file in the MAKEGRID format, a point with zero current closes the current coil.
+        """
+        coils, currents = list(), list()
+        points = list()
+        with open(coilsFile, 'r') as f:
+            lines = f.readlines()
+        begin = False
+        for line in lines:
+            words = line.split()
+            if len(words) == 0:
+                continue
+            if words[0].lower() == "mirror":
+                begin = True
+                continue
+            if not begin:
+                continue
+            if words[0].lower() == "end":
+                break
+            x, y, z, current = [float(word) for word in words[0:4]]
+            if current == 0:
+                coils.append(np.array(points))
+                points = list()
+            else:
+                if len(points) == 0:
+                    currents.append(current)
+                points.append([x, y, z])
+        return cls(coils, currents, **kwargs)
+
+    @property
+    def nSegments(self) -> int:
+        return self._currents.size
+
+    def _bCartesian(self, points: np.ndarray) -> np.ndarray:
+        """
+        The field of all the segments at the points, shape (N, 3).
+        """
+        return _getField(self._starts, self._ends, self._currents, self.chunkSize, points)
+
+    def _getExecutor(self) -> ProcessPoolExecutor:
+        """
+        The pool of the workers, created on the first use, the segments are sent to each worker only once.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.nprocess, initializer=_initWorker, 
+                initargs=(self._starts, self._ends, self._currents, self.chunkSize)
+            )
+        return self._executor
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        if getattr(self, "_executor", None) is not None:
+            self._executor.shutdown(wait=False)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    def bCartesian(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> Tuple[np.ndarray]:
+        """
+        return:
+            B_x, B_y, B_z
+        """
+        x, y, z = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(z, dtype=float))
+        shape = x.shape
+        points = np.stack((x.reshape(-1), y.reshape(-1), z.reshape(-1)), axis=-1)
+        if self.nprocess is None or self.nprocess <= 1 or points.shape[0] < 2*self.nprocess:
+            field = self._bCartesian(points)
+        else:
+            field = np.concatenate(list(self._getExecutor().map(_getField_worker, np.array_split(points, self.nprocess))))
+        if len(shape) == 0:
+            return field[0, 0], field[0, 1], field[0, 2]
+        return field[:, 0].reshape(shape), field[:, 1].reshape(shape), field[:, 2].reshape(shape)
+
+    def __call__(self, R: float or np.ndarray, phi: float or np.ndarray, Z: float or np.ndarray) -> Tuple:
+        """
+        return:
+            B_R, B_phi, B_Z
+        """
+        cosPhi, sinPhi = np.cos(phi), np.sin(phi)
+        bX, bY, bZ = self.bCartesian(R*cosPhi, R*sinPhi, Z)
+        return bX*cosPhi + bY*sinPhi, -bX*sinPhi + bY*cosPhi, bZ
+
+    def getGridField(self, nfp: int, rArr: np.ndarray, phiArr: np.ndarray, zArr: np.ndarray, writeH5: str=None) -> CylindricalGridField:
+        """
+        Precompute the field on the (R, phi, Z) mesh of one field period.
+        """
+        rGrid, phiGrid, zGrid = np.meshgrid(rArr, phiArr, zArr, indexing='ij')
+        bR, bPhi, bZ = self(rGrid, phiGrid, zGrid)
+        field = CylindricalGridField(nfp, rArr, phiArr, zArr, bR, bPhi, bZ)
+        if writeH5 is not None:
+            field.writeH5(writeH5)
+        return field
+
+
+if __name__ == "__main__":
+    pass
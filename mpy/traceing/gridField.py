@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# gridField.py
+
+
+import h5py
+import numpy as np
+from typing import Tuple
+
+
+class CylindricalGridField:
+    """
+    Magnetic field on a uniform (R, phi, Z) mesh, interpolated trilinearly with the periodicity in phi!
+    The instance is callable as `fun(R, phi, Z) -> B_R, B_phi, B_Z` of `mpy.traceing.traceCylindrical`.
+    """
+
+    def __init__(self, nfp: int, rArr: np.ndarray, phiArr: np.ndarray, zArr: np.ndarray,
+    bR: np.ndarray, bPhi: np.ndarray, bZ: np.ndarray) -> None:
+        """
+        Args:
+            nfp: the number of field periods.
+            rArr, phiArr, zArr: the uniform 1D grids, `phiArr` covers one field period, the endpoint 2*pi/nfp is optional.
+            bR, bPhi, bZ: the components of the field, shape (rArr.size, phiArr.size, zArr.size).
+        """
+        assert bR.shape == bPhi.shape == bZ.shape == (rArr.size, phiArr.size, zArr.size)
+        self.nfp = nfp
+        self.period = 2*np.pi / nfp
+        datas = np.stack((bR, bPhi, bZ), axis=-1)
+        if abs(phiArr[-1]-phiArr[0]-self.period) < 1e-10:
+            phiArr, datas = phiArr[:-1], datas[:, :-1]
+        self.rArr, self.phiArr, self.zArr = rArr, phiArr, zArr
+        self.bR, self.bPhi, self.bZ = datas[...,0], datas[...,1], datas[...,2]
+        self.dR = (rArr[-1]-rArr[0]) / (rArr.size-1)
+        self.dPhi = self.period / phiArr.size
+        self.dZ = (zArr[-1]-zArr[0]) / (zArr.size-1)
+        # append the first plane at the end, so that the cell of the last plane needs no wrapping
+        datas = np.concatenate((datas, datas[:, 0:1]), axis=1)
+        self._datas = np.ascontiguousarray(datas).reshape(-1, 3)
+        strideR, stridePhi, strideZ = (phiArr.size+1)*zArr.size, zArr.size, 1
+        self._offsets = np.array([
+            0, strideZ, stridePhi, stridePhi+strideZ,
+            strideR, strideR+strideZ, strideR+stridePhi, strideR+stridePhi+strideZ
+        ])
+        self._strides = (strideR, stridePhi, strideZ)
+
+    @classmethod
+    def readH5(cls, h5File: str):
+        """
+        Read the datasets `nfp`, `rArr`, `phiArr`, `zArr`, `bR`, `bPhi`, `bZ`.
+        """
+        with h5py.File(h5File, 'r') as f:
+            return cls(
+                int(f["nfp"][()]), f["rArr"][:], f["phiArr"][:], f["zArr"][:],
+                f["bR"][:], f["bPhi"][:], f["bZ"][:]
+            )
+
+    @classmethod
+    def readNpz(cls, npzFile: str):
+        """
+        Read the arrays `nfp`, `rArr`, `phiArr`, `zArr`, `bR`, `bPhi`, `bZ` written by `numpy.savez`.
+        """
+        with np.load(npzFile) as f:
+            return cls(
+                int(f["nfp"]), f["rArr"], f["phiArr"], f["zArr"],
+                f["bR"], f["bPhi"], f["bZ"]
+            )
+
+    def writeH5(self, h5File: str) -> None:
+        with h5py.File(h5File, 'w') as f:
+            f.create_dataset("nfp", data=self.nfp)
+            f.create_dataset("rArr", data=self.rArr)
+            f.create_dataset("phiArr", data=self.phiArr)
+            f.create_dataset("zArr", data=self.zArr)
+            f.create_dataset("bR", data=self.bR)
+            f.create_dataset("bPhi", data=self.bPhi)
+            f.create_dataset("bZ", data=self.bZ)
+
+    def getKernelGrid(self) -> Tuple:
+        """
+        return:
+            datas, origin, spacing, periodic of `mpy.misc.traceGrid`
+        """
+        datas = self._datas.reshape(self.rArr.size, self.phiArr.size+1, self.zArr.size, 3)
+        origin = np.array([self.rArr[0], self.phiArr[0], self.zArr[0]])
+        spacing = np.array([self.dR, self.dPhi, self.dZ])
+        return datas, origin, spacing, np.array([False, True, False])
+
+    def __call__(self, R: float or np.ndarray, phi: float or np.ndarray, Z: float or np.ndarray) -> Tuple:
+        """
+        The points outside the (R, Z) box get `nan`.
+        return:
+            B_R, B_phi, B_Z
+        """
+        R, phi, Z = np.broadcast_arrays(np.asarray(R, dtype=float), np.asarray(phi, dtype=float), np.asarray(Z, dtype=float))
+        shape = R.shape
+        R, phi, Z = R.reshape(-1), phi.reshape(-1), Z.reshape(-1)
+        fr = (R - self.rArr[0]) / self.dR
+        fp = ((phi - self.phiArr[0]) % self.period) / self.dPhi
+        fz = (Z - self.zArr[0]) / self.dZ
+        outside = (fr < 0) | (fr > self.rArr.size-1) | (fz < 0) | (fz > self.zArr.size-1)
+        i = np.clip(np.floor(fr).astype(int), 0, self.rArr.size-2)
+        j = np.clip(np.floor(fp).astype(int), 0, self.phiArr.size-1)
+        k = np.clip(np.floor(fz).astype(int), 0, self.zArr.size-2)
+        wr, wp, wz = fr-i, fp-j, fz-k
+        base = i*self._strides[0] + j*self._strides[1] + k*self._strides[2]
+        weights = (
+            ((1-wr)*(1-wp)*(1-wz), (1-wr)*(1-wp)*wz, (1-wr)*wp*(1-wz), (1-wr)*wp*wz,
+            wr*(1-wp)*(1-wz), wr*(1-wp)*wz, wr*wp*(1-wz), wr*wp*wz)
+        )
+        field = np.zeros((R.size, 3))
+        for offset, weight in zip(self._offsets, weights):
+            field += weight[:, np.newaxis] * self._datas[base+offset]
+        field[outside] = np.nan
+        if len(shape) == 0:
+            return field[0, 0], field[0, 1], field[0, 2]
+        return field[:, 0].reshape(shape), field[:, 1].reshape(shape), field[:, 2].reshape(shape)
+
+
+if __name__ == "__main__":
+    pass
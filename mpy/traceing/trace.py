@@ -5,11 +5,14 @@
 
 import numpy as np 
 from scipy.integrate import solve_ivp 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from ..geometry import Line 
-from ..misc import print_progress
+from ..misc import print_progress, traceGrid, kernels
+from typing import List, Tuple
 
 
-def traceCylindrical(fun, initPosition: np.ndarray, niter: int=128, nstep: int=128, **kwargs) -> Line:
+def traceCylindrical(fun, initPosition: np.ndarray, niter: int=128, nstep: int=128, printControl: bool=True, phiPlanes: np.ndarray=None, backend: str="scipy", **kwargs) -> Line or Tuple[np.ndarray]:
     r"""
     Working in cylindrical coordintes (R, \phi, Z), trace the field line by solving the ODEs
         $$ \frac{dR}{d\phi} = \frac{RB_R}{B_\phi} $$
@@ -21,8 +24,21 @@ def traceCylindrical(fun, initPosition: np.ndarray, niter: int=128, nstep: int=1
             `R, phi, Z`
         niter: number of toroidal periods. 
         nstep: number of intermediate step for one period        
+        printControl: print the progress or not. 
+        phiPlanes: None, return the `Line` with all the intermediate points; 
+            else, only record the punctures of the toroidal planes `phiPlanes` and return rArr, zArr with the shape (niter, len(phiPlanes)). 
+            The row `i` contains the punctures in the `i`-th toroidal turn after `phi = initPosition[1]`. 
+            The step size of the integrator is still bounded by `2*pi/nstep`. 
+        backend: `"scipy"`, integrate with `solve_ivp`; `"numba"` or `"numpy"`, integrate with the fixed-step RK4 kernel of 
+            `mpy.misc.traceGrid`, `fun` should be a `CylindricalGridField`, the steps are not longer than `kwargs["max_step"]` 
+            (default 2*pi/nstep). 
     """
 
+    if backend != "scipy":
+        rArr, zArr = _traceCylindrical_kernel(fun, np.array([initPosition], dtype=float), niter, nstep, phiPlanes, backend, kwargs.get("max_step"))
+        if phiPlanes is not None:
+            return rArr[0], zArr[0]
+        return Line(rArr=rArr[0], zArr=zArr[0], phiNums=nstep)
     if kwargs.get("method") is None:
         kwargs.update({"method": "LSODA"}) 
     if kwargs.get("rtol") is None:
@@ -35,8 +51,33 @@ def traceCylindrical(fun, initPosition: np.ndarray, niter: int=128, nstep: int=1
 
     rInit, phiInit, zInit = initPosition[0], initPosition[1], initPosition[2]
     dPhi = 2*np.pi / nstep
+    if phiPlanes is not None:
+        if kwargs.get("max_step") is None:
+            kwargs.update({"max_step": dPhi})
+        offsets = _getOffsets(phiPlanes, phiInit)
+        order = np.argsort(offsets)
+        rArr = np.empty((niter, offsets.size))
+        zArr = np.empty((niter, offsets.size))
+        if printControl:
+            print("Begin field-line tracing: ")
+        for i in range(niter):              # loop over each toroidal iteration
+            sol = solve_ivp(
+                ODEs, 
+                (phiInit, phiInit+2*np.pi), 
+                [rInit, zInit], 
+                t_eval = np.append(phiInit+offsets[order], phiInit+2*np.pi), 
+                **kwargs
+            )
+            rArr[i, order] = sol.y[0, :-1]
+            zArr[i, order] = sol.y[1, :-1]
+            phiInit += 2*np.pi
+            rInit, zInit = sol.y[0,-1], sol.y[1,-1]
+            if printControl:
+                print_progress(i+1, niter)
+        return rArr, zArr
     rArr, zArr = [rInit], [zInit]
-    print("Begin field-line tracing: ")
+    if printControl:
+        print("Begin field-line tracing: ")
     for i in range(niter):                  # loop over each toroidal iteration
         for j in range(nstep):              # loop inside one iteration
             sol = solve_ivp(
@@ -49,12 +90,163 @@ def traceCylindrical(fun, initPosition: np.ndarray, niter: int=128, nstep: int=1
             rArr.append(sol.y[0,-1])
             zArr.append(sol.y[1,-1])
             rInit, zInit = rArr[-1], zArr[-1]
-            print_progress(i*nstep+j+1, nstep*niter)
+            if printControl:
+                print_progress(i*nstep+j+1, nstep*niter)
     
     return Line(
         rArr=np.array(rArr), zArr=np.array(zArr), phiNums=nstep
     )
 
 
+def traceCylindrical_many(
+    fun, initPositions: np.ndarray, niter: int=128, nstep: int=128, 
+    vectorized: bool=True, nprocess: int=None, printControl: bool=True, phiPlanes: np.ndarray=None, backend: str="scipy", **kwargs
+) -> List[Line] or Tuple[np.ndarray]:
+    r"""
+    Trace many field lines in cylindrical coordintes (R, \phi, Z) at once, see `traceCylindrical`. 
+    Args:
+        fun: callable, the function to get the magnetic field in cylindrical coordintes 
+            `fun(R, phi, z) -> B_R, B_phi, B_Z`
+            If `vectorized`, `fun` is called once per right-hand side with arrays of all the lines. 
+        initPositions: shape (N, 3), the initial positions `R, phi, Z`. 
+        niter: number of toroidal periods. 
+        nstep: number of intermediate step for one period. 
+        vectorized: True, integrate all the lines as one system of ODEs; False, trace the lines one by one with `traceCylindrical`. 
+        nprocess: the number of worker processes if not `vectorized`, `fun` should be picklable. None, trace in this process. 
+        printControl: print the progress or not. 
+        phiPlanes: if not None, only record the punctures and return rArr, zArr with the shape (N, niter, len(phiPlanes)), 
+            see `traceCylindrical`. 
+        backend: `"scipy"`, or `"numba"` / `"numpy"`, trace all the lines with the kernel, see `traceCylindrical`. 
+    """
+
+    initPositions = np.atleast_2d(np.asarray(initPositions, dtype=float))
+    assert initPositions.shape[1] == 3
+    nLine = initPositions.shape[0]
+    if backend != "scipy":
+        rArr, zArr = _traceCylindrical_kernel(fun, initPositions, niter, nstep, phiPlanes, backend, kwargs.get("max_step"))
+        if phiPlanes is not None:
+            return rArr, zArr
+        return [Line(rArr=rArr[i], zArr=zArr[i], phiNums=nstep) for i in range(nLine)]
+    if kwargs.get("method") is None:
+        kwargs.update({"method": "LSODA"}) 
+    if kwargs.get("rtol") is None:
+        kwargs.update({"rtol": 1e-10})
+
+    if not vectorized:
+        traceOne = partial(traceCylindrical, fun, niter=niter, nstep=nstep, printControl=False, phiPlanes=phiPlanes, **kwargs)
+        if nprocess is None:
+            lines = list()
+            for i in range(nLine):
+                lines.append(traceOne(initPositions[i]))
+                if printControl:
+                    print_progress(i+1, nLine)
+        else:
+            with ProcessPoolExecutor(max_workers=nprocess) as executor:
+                lines = list(executor.map(traceOne, initPositions))
+        if phiPlanes is not None:
+            return np.array([line[0] for line in lines]), np.array([line[1] for line in lines])
+        return lines
+
+    phiInit = initPositions[:, 1]
+
+    def ODEs(t, rz):
+        r, z = rz[0:nLine], rz[nLine:2*nLine]
+        bR, bPhi, bZ = fun(r, phiInit+t, z)
+        return np.concatenate((r*bR/bPhi, r*bZ/bPhi))
+
+    dPhi = 2*np.pi / nstep
+    if phiPlanes is not None:
+        return _traceCylindrical_poincare(ODEs, initPositions, niter, dPhi, phiPlanes, printControl, **kwargs)
+    rArr = np.empty((nLine, niter*nstep+1))
+    zArr = np.empty((nLine, niter*nstep+1))
+    rArr[:, 0], zArr[:, 0] = initPositions[:, 0], initPositions[:, 2]
+    if printControl:
+        print("Begin field-line tracing: ")
+    for i in range(niter):                  # loop over each toroidal iteration
+        tStart = i * 2*np.pi
+        sol = solve_ivp(
+            ODEs, 
+            (tStart, tStart+2*np.pi), 
+            np.concatenate((rArr[:, i*nstep], zArr[:, i*nstep])), 
+            t_eval = tStart + dPhi*np.arange(1, nstep+1), 
+            **kwargs
+        )
+        rArr[:, i*nstep+1: (i+1)*nstep+1] = sol.y[0:nLine, :]
+        zArr[:, i*nstep+1: (i+1)*nstep+1] = sol.y[nLine:2*nLine, :]
+        if printControl:
+            print_progress(i+1, niter)
+
+    return [Line(rArr=rArr[i], zArr=zArr[i], phiNums=nstep) for i in range(nLine)]
+
+
+def _traceCylindrical_poincare(ODEs, initPositions: np.ndarray, niter: int, dPhi: float, phiPlanes: np.ndarray, printControl: bool, **kwargs) -> Tuple[np.ndarray]:
+    """
+    Integrate all the lines as one system and record only the punctures with the dense output of the integrator. 
+    """
+    nLine = initPositions.shape[0]
+    if kwargs.get("max_step") is None:
+        kwargs.update({"max_step": dPhi})
+    offsets = np.array([_getOffsets(phiPlanes, phi) for phi in initPositions[:, 1]])
+    groups = [np.where(np.all(offsets == offset, axis=1))[0] for offset in np.unique(offsets, axis=0)]
+    rArr = np.empty((nLine, niter, offsets.shape[1]))
+    zArr = np.empty((nLine, niter, offsets.shape[1]))
+    rz = np.concatenate((initPositions[:, 0], initPositions[:, 2]))
+    if printControl:
+        print("Begin field-line tracing: ")
+    for i in range(niter):                  # loop over each toroidal iteration
+        tStart = i * 2*np.pi
+        sol = solve_ivp(ODEs, (tStart, tStart+2*np.pi), rz, dense_output=True, **kwargs)
+        for group in groups:
+            punctures = sol.sol(tStart + offsets[group[0]])
+            rArr[group, i, :] = punctures[group, :]
+            zArr[group, i, :] = punctures[nLine+group, :]
+        rz = sol.y[:, -1]
+        if printControl:
+            print_progress(i+1, niter)
+    return rArr, zArr
+
+
+def _traceCylindrical_kernel(
+    fun, initPositions: np.ndarray, niter: int, nstep: int, phiPlanes: np.ndarray, backend: str, maxStep: float=None
+) -> Tuple[np.ndarray]:
+    """
+    Trace the lines with the kernel of `backend` on the grid of `fun`. 
+    return:
+        rArr, zArr, shape (N, niter*nstep+1) with the initial points, or (N, niter, len(phiPlanes)) of the punctures
+    """
+    if not hasattr(fun, "getKernelGrid"):
+        raise ValueError(
+            "The kernel backends need the grid of the field, `fun` should be a `CylindricalGridField`. "
+        )
+    nLine = initPositions.shape[0]
+    dPhi = 2*np.pi / nstep
+    if maxStep is None:
+        maxStep = dPhi
+    if phiPlanes is None:
+        tRecord = dPhi * np.arange(1, niter*nstep+1)
+    else:
+        offsets = np.array([_getOffsets(phiPlanes, phi) for phi in initPositions[:, 1]])
+        order = np.argsort(offsets, axis=1)
+        tRecord = 2*np.pi*np.arange(niter)[np.newaxis, :, np.newaxis] + np.take_along_axis(offsets, order, axis=1)[:, np.newaxis, :]
+        tRecord = tRecord.reshape(nLine, -1)
+    rArr, zArr = traceGrid(
+        fun.getKernelGrid(), kernels.CYLINDRICAL, initPositions[:, 0], initPositions[:, 2], initPositions[:, 1], 
+        tRecord, maxStep, backend=backend
+    )
+    if phiPlanes is None:
+        return np.concatenate((initPositions[:, 0:1], rArr), axis=1), np.concatenate((initPositions[:, 2:3], zArr), axis=1)
+    inverse = np.argsort(order, axis=1)[:, np.newaxis, :]
+    rArr = np.take_along_axis(rArr.reshape(nLine, niter, -1), inverse, axis=2)
+    zArr = np.take_along_axis(zArr.reshape(nLine, niter, -1), inverse, axis=2)
+    return rArr, zArr
+
+
+def _getOffsets(phiPlanes: np.ndarray, phiInit: float) -> np.ndarray:
+    """
+    The toroidal distances in [0, 2*pi) from `phiInit` to the planes. 
+    """
+    return (np.asarray(phiPlanes, dtype=float).flatten() - phiInit) % (2*np.pi)
+
+
 if __name__ == "__main__": 
     pass
@@ -1 +1 @@
-from .vmec2spec import vmecOut2spec
\ No newline at end of file
+from .vmec2spec import vmecOut2spec, vmecOut2spec_batch, VMECEquilibrium
\ No newline at end of file
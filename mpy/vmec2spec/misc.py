@@ -3,6 +3,7 @@
 # misc.py
 
 
+import io
 import math
 import numpy as np
 from typing import List, Dict
@@ -59,7 +60,8 @@ def writeSPECInput(SPEC_input: str, datas: Dict, interfaceShape: bool) -> None:
     nvol = datas["nvol"]
     ninterface = nvol +1
 
-    file = open(SPEC_input, "w")
+    # write into a buffer and flush it to the disk at once
+    file = io.StringIO()
 
     # physicslist
     file.write("&physicslist\n")
@@ -283,6 +285,8 @@ def writeSPECInput(SPEC_input: str, datas: Dict, interfaceShape: bool) -> None:
                 "{:.5e}".format(0) + "{:5}".format("") +"{:.5e}".format(0) + "{:5}".format(""))
             file.write("\n")
 
+    with open(SPEC_input, "w") as f:
+        f.write(file.getvalue())
     file.close()
 
     return
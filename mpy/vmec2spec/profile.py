@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# profile.py
+
+
+import numpy as np
+from typing import Dict
+
+
+class VMECProfile:
+    """
+    Radial profiles on the VMEC flux grid with their cumulative trapezoid integrals precomputed!
+    The integral over any interval is then an O(1) lookup, and equals `misc.integrate` of the same profile.
+    """
+
+    def __init__(self, fluxLabel: np.ndarray, profiles: Dict[str, np.ndarray]) -> None:
+        """
+        Args:
+            fluxLabel: the flux label of the VMEC surfaces.
+            profiles: the profiles on the VMEC surfaces, {name: values}.
+        """
+        fluxLabel = np.asarray(fluxLabel, dtype=float)
+        order = np.argsort(fluxLabel, kind="stable")
+        self.fluxLabel = fluxLabel[order]
+        self.profiles = dict()
+        self.cumulative = dict()
+        for name, values in profiles.items():
+            self.addProfile(name, np.asarray(values, dtype=float)[order])
+
+    def addProfile(self, name: str, values: np.ndarray) -> None:
+        """
+        Add a profile, `values` should be sorted as `self.fluxLabel`.
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.fluxLabel.shape:
+            raise ValueError(
+                "The length of the profile and the flux label should be equal. "
+            )
+        self.profiles[name] = values
+        self.cumulative[name] = np.concatenate((
+            [0], np.cumsum(np.diff(self.fluxLabel) * (values[1:] + values[:-1]) / 2)
+        ))
+
+    def interp(self, name: str, x: float or np.ndarray) -> float or np.ndarray:
+        return np.interp(x, self.fluxLabel, self.profiles[name])
+
+    def primitive(self, name: str, x: float or np.ndarray) -> float or np.ndarray:
+        """
+        The integral of the piecewise linear profile from `self.fluxLabel[0]` to `x`.
+        """
+        x = np.asarray(x, dtype=float)
+        if np.any(x < self.fluxLabel[0]) or np.any(x > self.fluxLabel[-1]):
+            raise ValueError(
+                "The value of x is out of range. "
+            )
+        index = np.clip(np.searchsorted(self.fluxLabel, x, side="right") - 1, 0, self.fluxLabel.size-2)
+        xLeft = self.fluxLabel[index]
+        yLeft = self.profiles[name][index]
+        return self.cumulative[name][index] + (x - xLeft) * (yLeft + self.interp(name, x)) / 2
+
+    def integrate(self, name: str, xLeft: float or np.ndarray, xRight: float or np.ndarray) -> float or np.ndarray:
+        """
+        The integrals of the profile `name` over [xLeft, xRight], vectorized over the intervals.
+        """
+        return self.primitive(name, xRight) - self.primitive(name, xLeft)
+
+
+if __name__ == "__main__":
+    pass
@@ -4,14 +4,60 @@
 
 
 import math
-import xarray
 import numpy as np
-from typing import List
-from .misc import integrate, writeSPECInput
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict
+from .misc import writeSPECInput
+from .profile import VMECProfile
 from .misc import mu0
 
 
-def vmecOut2spec(VMEC_output: str, SPEC_input: str, interfaceLabel: List[float], 
+class VMECEquilibrium:
+    """
+    The data of a VMEC output needed by `vmecOut2spec`, read once and shared by many SPEC inputs.
+    """
+
+    def __init__(self, VMEC_output: str) -> None:
+        """
+        Args:
+            VMEC_output: The VMEC outputput file, only the required variables are read.
+        """
+        import xarray
+        try:
+            VMECout = xarray.open_dataset(VMEC_output)
+        except:
+            raise FileExistsError(
+                "Please cheak your argument. The first argument should be a VMEC output. "
+            )
+        with VMECout:
+            self.ns = int(VMECout["ns"].values)
+            self.tflux = VMECout["phi"].values
+            self.pflux = np.abs(VMECout["chi"].values)
+            self.iota = np.abs(VMECout["iotaf"].values)
+            self.g = np.abs(VMECout["gmnc"][:, 0].values)
+            self.jpol = np.abs(VMECout["jcuru"].values)
+            self.jtor = np.abs(VMECout["jcurv"].values)
+            self.gamma = VMECout["gamma"].values
+            self.nfp = int(VMECout["nfp"].values)
+            self.mpol = int(VMECout["mpol"].values)
+            self.ntor = int(VMECout["ntor"].values)
+            self.pressure = VMECout["presf"].values
+            self.im = VMECout["xm"].values
+            self.in_ = VMECout["xn"].values / self.nfp
+            self.rmnc = VMECout["rmnc"].values
+            self.zmns = VMECout["zmns"].values
+            self.mu = VMECout["jdotb"].values*mu0/VMECout["bdotb"].values
+        self.fluxLabel = np.linspace(0, 1, self.ns)
+        self.profile = VMECProfile(self.fluxLabel, {
+            "g": self.g,
+            "jtorG": self.jtor * self.g,
+            "jpolG": self.jpol * self.g,
+            "pressureG": self.pressure * self.g,
+            "muG": self.mu * self.g
+        })
+
+
+def vmecOut2spec(VMEC_output: str or VMECEquilibrium, SPEC_input: str, interfaceLabel: List[float],
                 fluxLabel: str="toroidal", 
                 lconstraint: int=0, 
                 interfaceShape: bool = True, 
@@ -22,19 +68,43 @@ def vmecOut2spec(VMEC_output: str, SPEC_input: str, interfaceLabel: List[float],
     """
     This function creates a SPEC input namelist from a VMEC output file. 
     Args:
-        VMEC_output: The VMEC outputput file. 
+        VMEC_output: The VMEC outputput file, or the `VMECEquilibrium` read from it.
         SPEC_input: The SPEC input file. 
         interfaceLabel: The normalized magnetic flux in subvolumes. 
         fluxLabel : The surface label shoulde be "toroidal" or "poloidal". 
         lconstraint: selects constraints.
     """
 
-    try:
-        VMECout = xarray.open_dataset(VMEC_output)
-    except:
-        raise FileExistsError(
-            "Please cheak your argument. The first argument should be a VMEC output. "
-        )
+    if isinstance(VMEC_output, VMECEquilibrium):
+        equilibrium = VMEC_output
+    else:
+        equilibrium = VMECEquilibrium(VMEC_output)
+    datas = getSPECData(
+        equilibrium, interfaceLabel,
+        fluxLabel = fluxLabel,
+        lconstraint = lconstraint,
+        changePoloidalAngle = changePoloidalAngle,
+        changePflux = changePflux,
+        changeIota = changeIota,
+        **kwargs
+    )
+    writeSPECInput(SPEC_input, datas, interfaceShape)
+
+    return
+
+
+def getSPECData(equilibrium: VMECEquilibrium, interfaceLabel: List[float],
+                fluxLabel: str="toroidal", 
+                lconstraint: int=0, 
+                changePoloidalAngle: bool=True, 
+                changePflux: bool=False, 
+                changeIota: bool=False, 
+                **kwargs) -> Dict:
+    """
+    Compute the data of the SPEC input namelist, see `vmecOut2spec`.
+    **kwargs overrides the computed data.
+    """
+
     if abs(min(interfaceLabel)) > 1e-10 or abs(max(interfaceLabel) - 1) > 1e-10:
         raise ValueError(
             "The maximum and minimum value of interface label should be 1 and 0. "
@@ -44,34 +114,26 @@ def vmecOut2spec(VMEC_output: str, SPEC_input: str, interfaceLabel: List[float],
             "List interfaceLabel should be strictly monotonically increasing. "
         )
 
-    VMEC_ns = int(VMECout["ns"].values)
-    VMEC_tflux = VMECout["phi"].values
-    VMEC_pflux = np.abs(VMECout["chi"].values)
+    VMEC_tflux = equilibrium.tflux
+    VMEC_pflux = equilibrium.pflux.copy()
     if changePflux == True:
         VMEC_pflux *= -1
     VMEC_tpflux2 = VMEC_tflux * VMEC_pflux
     VMEC_psi = VMEC_tflux / np.pi / 2
     VMEC_chi = VMEC_pflux / np.pi / 2
-    flux_label = np.linspace(0, 1, VMEC_ns)
+    flux_label = equilibrium.fluxLabel
     if not (fluxLabel == "toroidal" or fluxLabel == "poloidal"):
         raise ValueError(
             "The flux label should be toroidal or poloidal, cheak the flux label. "
         )
-    VMEC_iota = np.abs(VMECout["iotaf"].values)
+    VMEC_iota = equilibrium.iota.copy()
     if changeIota == True:
         VMEC_iota *= -1
-    VMEC_g = [abs(VMECout["gmnc"].values[i][0]) for i in range(VMEC_ns)]
-    VMEC_jpol = np.abs(VMECout["jcuru"].values)
-    VMEC_jtor = np.abs(VMECout["jcurv"].values)
-    VMEC_gamma = VMECout["gamma"].values
-    VMEC_nfp = int(VMECout["nfp"].values)
-    VMEC_mpol = int(VMECout["mpol"].values)
-    VMEC_ntor = int(VMECout["ntor"].values)
-    VMEC_pressure = VMECout["presf"].values
-    VMEC_im = VMECout["xm"].values
-    VMEC_in = VMECout["xn"].values / VMEC_nfp
-    VMEC_rmnc = VMECout["rmnc"].values
-    VMEC_zmns = VMECout["zmns"].values
+    VMEC_gamma = equilibrium.gamma
+    VMEC_im = equilibrium.im.copy()
+    VMEC_in = equilibrium.in_.copy()
+    VMEC_rmnc = equilibrium.rmnc
+    VMEC_zmns = equilibrium.zmns.copy()
     if changePoloidalAngle == True:
         VMEC_in *= -1
         VMEC_zmns *= -1
@@ -82,68 +144,38 @@ def vmecOut2spec(VMEC_output: str, SPEC_input: str, interfaceLabel: List[float],
 
 
     nvol = len(interfaceLabel) - 1
-    # interfacePsi = np.interp(interfaceLabel, flux_label, VMEC_psi)
+    labelLeft = np.array(interfaceLabel[:-1], dtype=float)
+    labelRight = np.array(interfaceLabel[1:], dtype=float)
+    profile = equilibrium.profile
+    if fluxLabel == "toroidal":
+        helicity = VMECProfile(flux_label, {"helicity": VMEC_iota * VMEC_psi - VMEC_chi})
+    elif fluxLabel == "poloidal":
+        helicity = VMECProfile(flux_label, {"helicity": VMEC_psi - np.divide(VMEC_chi, VMEC_iota)})
+    volume = profile.integrate("g", labelLeft, labelRight)
+
     datas = {}
     datas["phiedge"] = VMEC_tflux[-1]
-    datas["curtor"] = mu0 * 2 * np.pi * integrate(
-        flux_label, VMEC_jtor * VMEC_g, flux_label[0], flux_label[-1]
-    )
-    datas["curpol"] = mu0 * 2 * np.pi * integrate(
-        flux_label, VMEC_jpol * VMEC_g, flux_label[0], flux_label[-1]
-    )
+    datas["curtor"] = mu0 * 2 * np.pi * profile.integrate("jtorG", flux_label[0], flux_label[-1])
+    datas["curpol"] = mu0 * 2 * np.pi * profile.integrate("jpolG", flux_label[0], flux_label[-1])
     datas["gamma"] = VMEC_gamma
-    datas["nfp"] = VMEC_nfp
+    datas["nfp"] = equilibrium.nfp
     datas["nvol"] = nvol
-    datas["mpol"] = VMEC_mpol
-    datas["ntor"] = VMEC_ntor
+    datas["mpol"] = equilibrium.mpol
+    datas["ntor"] = equilibrium.ntor
     datas["lrad"] = [8 for i in range(nvol)]
     datas["lconstraint"] = int(lconstraint)
     datas["tflux"] = np.interp(interfaceLabel[1:], flux_label,
                                VMEC_tflux) / VMEC_tflux[-1]
     datas["pflux"] = np.interp(interfaceLabel[1:], flux_label,
                                VMEC_pflux) / VMEC_tflux[-1]
-    # datas["helicity"] = [(4 * math.pi * math.pi * integrate(
-    #     VMEC_psi, VMEC_iota * VMEC_psi -
-    #     VMEC_chi, interfacePsi[i], interfacePsi[i + 1]) 
-    # + np.interp(interfaceLabel[i+1], flux_label, VMEC_tpflux2)
-    # - np.interp(interfaceLabel[i], flux_label, VMEC_tpflux2)
-    # ) for i in range(nvol)]
-    if fluxLabel == "toroidal":
-        datas["helicity"] = [(
-            4 * math.pi * math.pi * integrate(
-                flux_label, VMEC_iota * VMEC_psi - VMEC_chi, interfaceLabel[i], interfaceLabel[i+1]
-            ) + np.interp(interfaceLabel[i+1], flux_label, VMEC_tpflux2)
-            - np.interp(interfaceLabel[i], flux_label, VMEC_tpflux2)
-        ) for i in range(nvol)]
-    elif fluxLabel == "poloidal":
-        datas["helicity"] = [(
-            4 * math.pi * math.pi * integrate(
-                flux_label, VMEC_psi - np.divide(VMEC_chi, VMEC_iota), interfaceLabel[i], interfaceLabel[i+1]
-            ) + np.interp(interfaceLabel[i+1], flux_label, VMEC_tpflux2)
-            - np.interp(interfaceLabel[i], flux_label, VMEC_tpflux2)
-        ) for i in range(nvol)]
-    datas["pressure"] = [((integrate(
-        flux_label, VMEC_pressure * VMEC_g, interfaceLabel[i], interfaceLabel[i + 1])
-        / integrate(flux_label, VMEC_g, interfaceLabel[i], interfaceLabel[i + 1])
-    )) for i in range(nvol)]
-    datas["adiabatic"] = [(
-        datas["pressure"][i] * math.pow(
-        integrate(flux_label, VMEC_g, interfaceLabel[i], interfaceLabel[i+1]), VMEC_gamma)
-    ) for i in range(nvol)]
-    datas["ivolume"] = [(mu0 * 2 * math.pi * integrate(
-        flux_label, VMEC_g * VMEC_jtor, interfaceLabel[i], interfaceLabel[i + 1]))for i in range(nvol)]
-    # if fluxLabel == "toroidal":
-    #     datas["mu"] = [(datas["ivolume"][i] / datas["tflux"][i])
-    #                for i in range(nvol)]
-    # elif fluxLabel == "poloidal":
-    #     datas["mu"] = [([(mu0 * 2 * math.pi * integrate(
-    #                 flux_label, VMEC_g * VMEC_jpol, interfaceLabel[i], interfaceLabel[i + 1]))for i in range(nvol)][i] 
-    #                 / datas["pflux"][i]) for i in range(nvol)]
-    mu = VMECout["jdotb"].values*mu0/VMECout["bdotb"].values
-    datas["mu"] = [(
-        integrate(flux_label, mu*VMEC_g, interfaceLabel[i], interfaceLabel[i+1]) / 
-        integrate(flux_label, VMEC_g, interfaceLabel[i], interfaceLabel[i+1])
-    ) for i in range(nvol)]
+    datas["helicity"] = (
+        4 * math.pi * math.pi * helicity.integrate("helicity", labelLeft, labelRight)
+        + np.interp(labelRight, flux_label, VMEC_tpflux2) - np.interp(labelLeft, flux_label, VMEC_tpflux2)
+    )
+    datas["pressure"] = profile.integrate("pressureG", labelLeft, labelRight) / volume
+    datas["adiabatic"] = datas["pressure"] * np.power(volume, VMEC_gamma)
+    datas["ivolume"] = mu0 * 2 * math.pi * profile.integrate("jtorG", labelLeft, labelRight)
+    datas["mu"] = profile.integrate("muG", labelLeft, labelRight) / volume
     datas["isurf"] = [0 for i in range(nvol)]
     datas["iota"] = np.interp(interfaceLabel, flux_label, VMEC_iota)
     datas["rac"] = VMEC_rmnc[0, :]
@@ -152,22 +184,56 @@ def vmecOut2spec(VMEC_output: str, SPEC_input: str, interfaceLabel: List[float],
     datas["in"] = VMEC_in
     datas["rbc"] = VMEC_rmnc[-1, :]
     datas["zbs"] = VMEC_zmns[-1, :]
-    datas["interface_rc"] = np.zeros([len(interfaceLabel), len(VMEC_im)])
-    datas["interface_zs"] = np.zeros([len(interfaceLabel), len(VMEC_im)])
-    for j in range(len(VMEC_im)):
-        datas["interface_rc"][:, j] = np.interp(
-            interfaceLabel, flux_label, VMEC_rmnc[:, j]
-        )
-        datas["interface_zs"][:, j] = np.interp(
-            interfaceLabel, flux_label, VMEC_zmns[:, j]
-        )
+    from scipy.interpolate import interp1d
+    datas["interface_rc"] = interp1d(flux_label, VMEC_rmnc, axis=0)(interfaceLabel)
+    datas["interface_zs"] = interp1d(flux_label, VMEC_zmns, axis=0)(interfaceLabel)
 
     for key in kwargs.keys():
         datas[key] = kwargs[key]
-        
-    writeSPECInput(SPEC_input, datas, interfaceShape)
 
-    return
+    return datas
+
+
+_equilibrium = None
+
+
+def _initWorker(equilibrium: VMECEquilibrium) -> None:
+    global _equilibrium
+    _equilibrium = equilibrium
+
+
+def _writeVariant(SPEC_input: str, variant: Dict) -> str:
+    vmecOut2spec(_equilibrium, SPEC_input, **variant)
+    return SPEC_input
+
+
+def vmecOut2spec_batch(VMEC_output: str or VMECEquilibrium, SPEC_inputs: List[str], variants: List[Dict], nprocess: int=None) -> List[str]:
+    """
+    Create many SPEC input namelists from the same VMEC output, which is read only once.
+    Args:
+        VMEC_output: The VMEC outputput file, or the `VMECEquilibrium` read from it.
+        SPEC_inputs: The SPEC input files.
+        variants: The keyword arguments of `vmecOut2spec` for each SPEC input,
+            e.g. `{"interfaceLabel": [0, 0.5, 1], "lconstraint": 1, "lrad": [8, 12]}`.
+        nprocess: The number of worker processes, None, write the inputs in this process.
+    Returns:
+        SPEC_inputs
+    """
+
+    if len(SPEC_inputs) != len(variants):
+        raise ValueError(
+            "The length of SPEC_inputs and variants should be equal. "
+        )
+    if isinstance(VMEC_output, VMECEquilibrium):
+        equilibrium = VMEC_output
+    else:
+        equilibrium = VMECEquilibrium(VMEC_output)
+    if nprocess is None:
+        for SPEC_input, variant in zip(SPEC_inputs, variants):
+            vmecOut2spec(equilibrium, SPEC_input, **variant)
+        return list(SPEC_inputs)
+    with ProcessPoolExecutor(max_workers=nprocess, initializer=_initWorker, initargs=(equilibrium,)) as executor:
+        return list(executor.map(_writeVariant, SPEC_inputs, variants))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# benchmark.py
+
+
+"""
+Benchmarks of the hot paths on synthetic inputs, the wall time, the number of RHS evaluations and the peak memory
+(tracemalloc) are recorded for each case and problem size.
+    python test/benchmark/benchmark.py [--cases traceLine fitSurface] [--sizes small medium] [--repeat 3]
+        [--save baseline.json] [--compare baseline.json --tolerance 0.25]
+The exit code is 1 if a case is slower or uses more memory than the baseline by the tolerance.
+"""
+
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+
+sizes = ["small", "medium", "large"]
+cases = dict()
+
+
+def case(**parameters):
+    """
+    Register a benchmark, `parameters` gives the problem size of each of `sizes`.
+    The benchmark is `fun(workDir, **parameters[size]) -> run`, `run()` is the timed part.
+    """
+    def decorator(fun):
+        cases[fun.__name__] = (fun, parameters)
+        return fun
+    return decorator
+
+
+class Skip(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def countRHS(*modules):
+    """
+    Count the RHS evaluations (`nfev`) of the `solve_ivp` calls in the modules.
+    """
+    counter = {"nfev": 0}
+    originals = [module.solve_ivp for module in modules]
+    def wrap(original):
+        def solve_ivp(*args, **kwargs):
+            sol = original(*args, **kwargs)
+            counter["nfev"] += sol.nfev
+            return sol
+        return solve_ivp
+    for module, original in zip(modules, originals):
+        module.solve_ivp = wrap(original)
+    try:
+        yield counter
+    finally:
+        for module, original in zip(modules, originals):
+            module.solve_ivp = original
+
+
+def getSPECField(workDir: str, nvol: int=3, mpol: int=4, ntor: int=3, islandAmplitude: float=0.0):
+    from mpy.specOut import SPECOut
+    from mpy.SPECMagneticField import SPECField
+    specFile = os.path.join(workDir, "spec_{:d}_{:d}_{:d}_{:g}.h5".format(nvol, mpol, ntor, islandAmplitude))
+    if not os.path.exists(specFile):
+        synthetic.writeSPECOutput(specFile, nvol=nvol, mpol=mpol, ntor=ntor, islandAmplitude=islandAmplitude)
+    return SPECField(SPECOut(specFile), lvol=1)
+
+
+@case(small=dict(nLine=2, resolution=16), medium=dict(nLine=8, resolution=32), large=dict(nLine=32, resolution=64))
+def traceLine(workDir: str, nLine: int, resolution: int, niter: int=4, nstep: int=8):
+    from mpy.SPECMagneticField import tracing
+    bField = getSPECField(workDir)
+    bData = os.path.join(workDir, "b_{:d}.h5".format(resolution))
+    synthetic.writeSPECFieldData(bData, resolution=(resolution, resolution, resolution), nfp=bField.nfp)
+    s0 = np.linspace(-0.8, 0.8, nLine)
+    def run():
+        with countRHS(tracing) as counter:
+            tracing.traceLine(
+                bField, s0, np.zeros(nLine), np.zeros(nLine), niter=niter, nstep=nstep,
+                bMethod="interpolate", bData=bData, sResolution=8, thetaResolution=16, zetaResolution=8,
+                printControl=False, rtol=1e-8
+            )
+        return counter["nfev"]
+    return run
+
+
+@case(small=dict(nLine=4), medium=dict(nLine=16), large=dict(nLine=64))
+def traceLine_lockstep(workDir: str, nLine: int, niter: int=8, nstep: int=8, lockstep: bool=True):
+    from mpy.SPECMagneticField import tracing, AnalyticField
+    bField = AnalyticField(nfp=2, islands=[(3, 1, 1e-3)])
+    s0 = np.linspace(-0.8, 0.8, nLine)
+    def run():
+        with countRHS(tracing) as counter:
+            tracing.traceLine(
+                bField, s0, np.zeros(nLine), np.zeros(nLine), niter=niter, nstep=nstep, bMethod="calculate",
+                sResolution=8, thetaResolution=16, zetaResolution=8, printControl=False, rtol=1e-8, lockstep=lockstep
+            )
+        return counter["nfev"]
+    return run
+
+
+@case(small=dict(nLine=4), medium=dict(nLine=16), large=dict(nLine=64))
+def traceLine_calculate(workDir: str, nLine: int):
+    return traceLine_lockstep(workDir, nLine, lockstep=False)
+
+
+@case(small=dict(nPoint=10**3), medium=dict(nPoint=10**4), large=dict(nPoint=10**5))
+def beltramiField(workDir: str, nPoint: int):
+    from mpy.SPECMagneticField import BeltramiField
+    bField = getSPECField(workDir, mpol=6, ntor=4, islandAmplitude=1e-3)
+    rng = np.random.default_rng(0)
+    sArr, thetaArr, zetaArr = rng.uniform(-1, 1, nPoint), rng.uniform(0, 2*np.pi, nPoint), rng.uniform(0, 2*np.pi, nPoint)
+    beltrami = [BeltramiField(bField.specData, lvol) for lvol in range(2)]
+    def run():
+        for field in beltrami:
+            field.getB_points(sArr, thetaArr, zetaArr)
+        return 0
+    return run
+
+
+@case(small=dict(nLine=4), medium=dict(nLine=16), large=dict(nLine=64))
+def traceLine_native(workDir: str, nLine: int, niter: int=8, nstep: int=8, islandAmplitude: float=0.0):
+    from mpy.SPECMagneticField import tracing
+    bField = getSPECField(workDir, islandAmplitude=islandAmplitude)
+    s0 = np.linspace(-0.8, 0.8, nLine)
+    def run():
+        with countRHS(tracing) as counter:
+            tracing.traceLine(
+                bField, s0, np.zeros(nLine), np.zeros(nLine), niter=niter, nstep=nstep, bMethod="native",
+                sResolution=8, thetaResolution=16, zetaResolution=8, printControl=False, rtol=1e-8, lockstep=True
+            )
+        return counter["nfev"]
+    return run
+
+
+@case(small=dict(nLine=4), medium=dict(nLine=16), large=dict(nLine=64))
+def traceLine_nativeIsland(workDir: str, nLine: int):
+    """
+    The native field with B^s != 0.
+    """
+    return traceLine_native(workDir, nLine, islandAmplitude=1e-3)
+
+
+@case(small=dict(nLine=16, niter=10**3), medium=dict(nLine=64, niter=10**4), large=dict(nLine=256, niter=10**4))
+def poincareMap(workDir: str, nLine: int, niter: int, resolution: int=48):
+    from mpy.SPECMagneticField import AnalyticField, PoincareMap
+    bField = AnalyticField(nfp=2, islands=[(3, 1, 1e-3)])
+    h5File = os.path.join(workDir, "poincareMap_{:d}.h5".format(resolution))
+    poincareMap = PoincareMap.fromField(
+        bField, h5File=h5File, sResolution=resolution, thetaResolution=2*resolution, sRange=(-0.99, 0.99), printControl=False
+    )
+    s0 = np.linspace(-0.8, 0.8, nLine)
+    def run():
+        poincareMap.iterate(s0, np.zeros(nLine), niter=niter)
+        return 0
+    return run
+
+
+@case(small=dict(resolution=16), medium=dict(resolution=48), large=dict(resolution=128))
+def getGrid(workDir: str, resolution: int):
+    bField = getSPECField(workDir, mpol=6, ntor=4)
+    bField.changeResolution(resolution, resolution, resolution)
+    def run():
+        bField.getGrid()
+        return 0
+    return run
+
+
+@case(small=dict(resolution=16, nPoint=10**3), medium=dict(resolution=64, nPoint=10**4), large=dict(resolution=128, nPoint=10**5))
+def interpValue(workDir: str, resolution: int, nPoint: int):
+    bField = getSPECField(workDir)
+    bField.changeResolution(resolution, resolution, resolution)
+    rng = np.random.default_rng(0)
+    baseData = rng.normal(size=(resolution, resolution, resolution))
+    sArr, thetaArr, zetaArr = rng.uniform(-0.9, 0.9, nPoint), rng.uniform(0, 2*np.pi, nPoint), rng.uniform(0, 2*np.pi, nPoint)
+    def run():
+        bField.interpValue(baseData, sArr, thetaArr, zetaArr)
+        return 0
+    return run
+
+
+@case(small=dict(nPoint=2000, mpol=4, ntor=4), medium=dict(nPoint=5000, mpol=6, ntor=6), large=dict(nPoint=20000, mpol=8, ntor=8))
+def fitSurface(workDir: str, nPoint: int, mpol: int, ntor: int, chunkSize: int=None):
+    from mpy.fitting import fitSurface
+    rng = np.random.default_rng(0)
+    thetaArr, zetaArr = rng.uniform(0, 2*np.pi, nPoint), rng.uniform(0, 2*np.pi, nPoint)
+    sArr = 0.5 + 0.1*np.cos(thetaArr) + 0.01*np.cos(2*thetaArr-zetaArr)
+    def run():
+        fitSurface(thetaArr, zetaArr, sArr, mpol, ntor, nfp=1, stellsym="cos", chunkSize=chunkSize)
+        return 0
+    return run
+
+
+@case(small=dict(nPoint=2000, mpol=4, ntor=4), medium=dict(nPoint=20000, mpol=8, ntor=8), large=dict(nPoint=100000, mpol=12, ntor=12))
+def fitSurface_chunked(workDir: str, nPoint: int, mpol: int, ntor: int):
+    return fitSurface(workDir, nPoint, mpol, ntor, chunkSize=65536)
+
+
+@case(small=dict(nstep=8), medium=dict(nstep=16), large=dict(nstep=32))
+def findAxis(workDir: str, nstep: int):
+    from mpy.SPECMagneticField import axis, AnalyticField
+    bField = AnalyticField(nfp=2, elongation=1.2, triangularity=0.2, islands=[(2, 1, 1e-3)])
+    bField.changeResolution(16, 32, 16)
+    def run():
+        with countRHS(axis) as counter:
+            axis.findAxis(bField, -0.5, 0.0, nstep=nstep, debug=True, bounds=[(-0.99, 0.99), (None, None)], options={"maxiter": 5})
+        return counter["nfev"]
+    return run
+
+
+@case(small=dict(nLine=4, niter=8), medium=dict(nLine=16, niter=16), large=dict(nLine=64, niter=32))
+def traceCylindrical(workDir: str, nLine: int, niter: int, nstep: int=16):
+    from mpy.traceing import trace
+    fun = synthetic.getTokamakField()
+    initPositions = np.stack((np.linspace(3.1, 3.8, nLine), np.zeros(nLine), np.zeros(nLine)), axis=-1)
+    def run():
+        with countRHS(trace) as counter:
+            trace.traceCylindrical_many(fun, initPositions, niter, nstep, printControl=False, rtol=1e-8)
+        return counter["nfev"]
+    return run
+
+
+@case(small=dict(nLine=4, niter=8), medium=dict(nLine=16, niter=16), large=dict(nLine=64, niter=32))
+def traceCylindrical_grid(workDir: str, nLine: int, niter: int, nstep: int=16, backend: str="scipy"):
+    from mpy.traceing import trace, CylindricalGridField
+    rArr, phiArr, zArr = np.linspace(2.0, 4.0, 65), np.linspace(0, 2*np.pi, 33), np.linspace(-1.0, 1.0, 65)
+    bR, bPhi, bZ = synthetic.getTokamakField()(*np.meshgrid(rArr, phiArr, zArr, indexing="ij"))
+    fun = CylindricalGridField(1, rArr, phiArr, zArr, bR, bPhi, bZ)
+    initPositions = np.stack((np.linspace(3.1, 3.8, nLine), np.zeros(nLine), np.zeros(nLine)), axis=-1)
+    if backend != "scipy":
+        # compile the kernel before the timing
+        trace.traceCylindrical_many(fun, initPositions, 1, nstep, printControl=False, backend=backend)
+    def run():
+        with countRHS(trace) as counter:
+            trace.traceCylindrical_many(fun, initPositions, niter, nstep, printControl=False, backend=backend, rtol=1e-8)
+        return counter["nfev"]
+    return run
+
+
+@case(small=dict(nLine=4, niter=8), medium=dict(nLine=16, niter=16), large=dict(nLine=64, niter=32))
+def traceCylindrical_kernel(workDir: str, nLine: int, niter: int):
+    from mpy.misc import hasNumba
+    if not hasNumba():
+        raise Skip("numba is not installed")
+    return traceCylindrical_grid(workDir, nLine, niter, backend="numba")
+
+
+@case(small=dict(ns=51, mpol=4, ntor=3), medium=dict(ns=201, mpol=8, ntor=6), large=dict(ns=801, mpol=12, ntor=8))
+def vmecOut2spec(workDir: str, ns: int, mpol: int, ntor: int):
+    from mpy.vmec2spec import vmecOut2spec
+    try:
+        import xarray
+    except ImportError:
+        raise Skip("xarray is not installed")
+    woutFile = os.path.join(workDir, "wout_{:d}_{:d}_{:d}.nc".format(ns, mpol, ntor))
+    synthetic.writeVMECOutput(woutFile, ns=ns, mpol=mpol, ntor=ntor)
+    specInput = os.path.join(workDir, "input.sp")
+    def run():
+        vmecOut2spec(woutFile, specInput, list(np.linspace(0, 1, 9)))
+        return 0
+    return run
+
+
+def measure(run, repeat: int) -> dict:
+    """
+    return:
+        {"time": the minimum wall time (s), "nfev": RHS evaluations, "peakMemory": the peak of tracemalloc (MB)}
+    """
+    times = list()
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        for i in range(repeat):
+            start = time.perf_counter()
+            nfev = run()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"time": min(times), "nfev": nfev, "peakMemory": peak / 2**20}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of mpy on synthetic inputs. ")
+    parser.add_argument("--cases", nargs="+", default=list(cases.keys()), choices=list(cases.keys()))
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=sizes)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", type=str, default=None, help="write the results as the baseline")
+    parser.add_argument("--compare", type=str, default=None, help="compare with the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="the allowed relative increase of the time and the memory")
+    args = parser.parse_args()
+
+    baseline = dict()
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)["results"]
+    results = dict()
+    failed = False
+    print("{:20s} {:8s} {:>10s} {:>10s} {:>12s}  {:s}".format("case", "size", "time (s)", "nfev", "memory (MB)", "baseline"))
+    with tempfile.TemporaryDirectory() as workDir:
+        for name in args.cases:
+            fun, parameters = cases[name]
+            results[name] = dict()
+            for size in args.sizes:
+                try:
+                    result = measure(fun(workDir, **parameters[size]), args.repeat)
+                except Skip as skip:
+                    print("{:20s} {:8s} skipped: {:s}".format(name, size, str(skip)))
+                    continue
+                results[name][size] = result
+                notes = list()
+                reference = baseline.get(name, dict()).get(size)
+                if reference is not None:
+                    for key in ["time", "peakMemory"]:
+                        ratio = result[key] / max(reference[key], 1e-12)
+                        notes.append("{:s} x{:.2f}".format(key, ratio))
+                        if ratio > 1 + args.tolerance:
+                            notes[-1] += " REGRESSION"
+                            failed = True
+                print("{:20s} {:8s} {:10.3f} {:10d} {:12.2f}  {:s}".format(
+                    name, size, result["time"], result["nfev"], result["peakMemory"], ", ".join(notes)
+                ))
+    if args.save is not None:
+        with open(args.save, 'w') as f:
+            json.dump({
+                "platform": platform.platform(), "python": platform.python_version(), "numpy": np.__version__,
+                "results": results
+            }, f, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# importTime.py
+
+
+"""
+Import time of the mpy modules, each measured in a fresh interpreter. 
+The heavy optional dependencies must not be loaded by the modules listed in `forbidden`. 
+    python test/benchmark/importTime.py [--repeat 5] [--save baseline.json] [--compare baseline.json --tolerance 0.5]
+The exit code is 1 if a forbidden dependency is loaded or the import time exceeds the baseline by the tolerance. 
+"""
+
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+heavy = ["matplotlib", "xarray", "coilpy", "py_spec", "pyoculus", "pandas"]
+forbidden = {
+    "mpy": heavy, 
+    "mpy.fitting": heavy, 
+    "mpy.geometry": heavy, 
+    "mpy.traceing": heavy, 
+    "mpy.vmec2spec": heavy, 
+    "mpy.SPECMagneticField": heavy, 
+    "mpy.specOut": ["xarray", "coilpy", "pyoculus", "pandas"], 
+    "mpy.specNamelist": ["xarray", "coilpy", "pyoculus", "pandas"]
+}
+
+child = """
+import sys, time, json, resource
+start = time.perf_counter()
+import {module:s}
+wallTime = time.perf_counter() - start
+print(json.dumps({{
+    "time": wallTime, 
+    "maxRSS": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 
+    "loaded": [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+
+def measure(module: str, repeat: int=5) -> dict:
+    """
+    return:
+        {"time": the minimum import time (s), "maxRSS": peak RSS (kB), "loaded": the heavy dependencies loaded}
+    """
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    results = list()
+    for i in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", child.format(module=module, heavy=heavy)], 
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "time": min(result["time"] for result in results), 
+        "maxRSS": min(result["maxRSS"] for result in results), 
+        "loaded": results[0]["loaded"]
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import time of the mpy modules. ")
+    parser.add_argument("--modules", nargs="+", default=list(forbidden.keys()))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=str, default=None, help="write the results as the baseline")
+    parser.add_argument("--compare", type=str, default=None, help="compare with the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="the allowed relative increase of the import time")
+    args = parser.parse_args()
+
+    baseline = dict()
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    results = dict()
+    failed = False
+    print("{:24s} {:>10s} {:>12s}  {:s}".format("module", "time (ms)", "maxRSS (MB)", "heavy dependencies"))
+    for module in args.modules:
+        result = measure(module, args.repeat)
+        results[module] = result
+        notes = list()
+        badDeps = [name for name in result["loaded"] if name in forbidden.get(module, list())]
+        if len(badDeps) > 0:
+            notes.append("FORBIDDEN: " + ", ".join(badDeps))
+            failed = True
+        if module in baseline and result["time"] > (1+args.tolerance) * baseline[module]["time"]:
+            notes.append("SLOWER than {:.1f} ms".format(1e3*baseline[module]["time"]))
+            failed = True
+        print("{:24s} {:10.1f} {:12.1f}  {:s} {:s}".format(
+            module, 1e3*result["time"], result["maxRSS"]/1024, ",".join(result["loaded"]) or "-", " ".join(notes)
+        ))
+    if args.save is not None:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
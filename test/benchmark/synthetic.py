@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# synthetic.py
+
+
+"""
+Synthetic inputs of the benchmarks, so that no real SPEC or VMEC output is needed.
+The equilibria are large aspect ratio tokamaks with circular flux surfaces and small perturbations.
+"""
+
+
+import h5py
+import numpy as np
+from typing import Tuple
+
+
+def getModes(mpol: int, ntor: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The modes in the order of SPEC and VMEC, m = 0 with n >= 0 and m > 0 with -ntor <= n <= ntor.
+    return:
+        xm, xn (without nfp)
+    """
+    xm, xn = list(), list()
+    for m in range(mpol+1):
+        for n in range(-ntor, ntor+1):
+            if m == 0 and n < 0:
+                continue
+            xm.append(m)
+            xn.append(n)
+    return np.array(xm), np.array(xn)
+
+
+def writeSPECOutput(h5File: str, nvol: int=3, mpol: int=4, ntor: int=3, nfp: int=2, lrad: int=6,
+    majorRadius: float=3.0, minorRadius: float=1.0, perturbation: float=1e-3, iota: float=0.4, islandAmplitude: float=0.0, seed: int=0) -> None:
+    """
+    The HDF5 file of a fixed-boundary SPEC output, readable by `mpy.SPECOut`.
+    The vector potential has the (m, n) = (0, 0) mode of the lowest radial basis, J*B^theta / J*B^zeta = iota in each volume,
+    and the (m, n) = (2, 1) mode of A_zeta with `islandAmplitude`, which gives J*B^s = -2*islandAmplitude*T(s)*sin(2*theta-nfp*zeta).
+    """
+    rng = np.random.default_rng(seed)
+    xm, xn = getModes(mpol, ntor)
+    mn = xm.size
+    rbc, zbs = np.zeros((nvol+1, mn)), np.zeros((nvol+1, mn))
+    rbc[:, 0] = majorRadius
+    index = np.where((xm == 1) & (xn == 0))[0][0]
+    radius = minorRadius * np.linspace(0, 1, nvol+1)
+    rbc[:, index], zbs[:, index] = radius, radius
+    rbc[1:, 1:] += perturbation * radius[1:, np.newaxis] * rng.normal(size=(nvol, mn-1))
+    zbs[1:, 1:] += perturbation * radius[1:, np.newaxis] * rng.normal(size=(nvol, mn-1))
+    lradArr = lrad * np.ones(nvol, dtype=int)
+    with h5py.File(h5File, 'w') as f:
+        f.create_dataset("version", data=np.array([3.2]))
+        physics = f.create_group("input/physics")
+        for key, value in [("Igeometry", 3), ("Istellsym", 1), ("Nfp", nfp), ("Nvol", nvol), ("Lfreebound", 0),
+            ("Mpol", mpol), ("Ntor", ntor), ("pscale", 1.0), ("rpol", 1.0), ("rtor", 1.0)]:
+            physics.create_dataset(key, data=np.array([value]))
+        physics.create_dataset("Lrad", data=lradArr)
+        physics.create_dataset("pressure", data=np.linspace(1, 0, nvol))
+        output = f.create_group("output")
+        output.create_dataset("Rbc", data=rbc)
+        output.create_dataset("Zbs", data=zbs)
+        output.create_dataset("Rbs", data=np.zeros_like(rbc))
+        output.create_dataset("Zbc", data=np.zeros_like(rbc))
+        output.create_dataset("im", data=xm)
+        output.create_dataset("in", data=xn*nfp)
+        output.create_dataset("mn", data=np.array([mn]))
+        output.create_dataset("tflux", data=np.linspace(1/nvol, 1, nvol))
+        ate, aze = np.zeros((mn, np.sum(lradArr+1))), np.zeros((mn, np.sum(lradArr+1)))
+        start = np.concatenate(([0], np.cumsum(lradArr+1)[:-1]))
+        # the lowest basis with a derivative, the Zernike basis (l = 2) in the innermost volume and the Chebyshev basis (l = 1) in the others
+        radialIndex = start + np.where(np.arange(nvol) == 0, 2, 1)
+        ate[0, radialIndex] = 1.0
+        aze[0, radialIndex] = -iota
+        aze[np.where((xm == 2) & (xn == 1))[0][0], radialIndex] = islandAmplitude
+        vectorPotential = f.create_group("vector_potential")
+        vectorPotential.create_dataset("Ate", data=ate)
+        vectorPotential.create_dataset("Aze", data=aze)
+        for key in ["Ato", "Azo"]:
+            vectorPotential.create_dataset(key, data=np.zeros((mn, np.sum(lradArr+1))))
+        grid = f.create_group("grid")
+        for key in ["Rij", "Zij", "sg", "BR", "Bp", "BZ"]:
+            grid.create_dataset(key, data=np.zeros((1, np.sum(lradArr+1))))
+
+
+def getSPECFieldData(sArr: np.ndarray, thetaArr: np.ndarray, zetaArr: np.ndarray, nfp: int=2,
+    iota: Tuple[float, float]=(0.3, 0.6), islandAmplitude: float=1e-4) -> Tuple[np.ndarray]:
+    """
+    The contravariant field B = (B^s, B^theta, B^zeta) of a sheared field with a (m, n) = (2, 1) perturbation on the (s, theta, zeta) grid.
+    return:
+        bSupS, bSupTheta, bSupZeta
+    """
+    sGrid, thetaGrid, zetaGrid = np.meshgrid(sArr, thetaArr, zetaArr, indexing='ij')
+    x = (sGrid + 1) / 2
+    bSupZeta = np.ones_like(sGrid)
+    bSupTheta = iota[0] + (iota[1]-iota[0]) * x*x
+    bSupS = islandAmplitude * (1-sGrid*sGrid) * np.sin(2*thetaGrid - nfp*zetaGrid)
+    return bSupS, bSupTheta, bSupZeta
+
+
+def writeSPECFieldData(h5File: str, resolution: Tuple[int, int, int]=(32, 32, 32), nfp: int=2, **kwargs) -> None:
+    """
+    The file of `mpy.SPECMagneticField.readB`, see `getSPECFieldData`.
+    """
+    sArr = np.linspace(-1+1e-10, 1-1e-10, resolution[0])
+    thetaArr = np.linspace(0, 2*np.pi, resolution[1])
+    zetaArr = np.linspace(0, 2*np.pi/nfp, resolution[2])
+    bSupS, bSupTheta, bSupZeta = getSPECFieldData(sArr, thetaArr, zetaArr, nfp=nfp, **kwargs)
+    with h5py.File(h5File, 'w') as f:
+        f.create_dataset("sArr", data=sArr)
+        f.create_dataset("thetaArr", data=thetaArr)
+        f.create_dataset("zetaArr", data=zetaArr)
+        f.create_dataset("bSupS", data=bSupS)
+        f.create_dataset("bSupTheta", data=bSupTheta)
+        f.create_dataset("bSupZeta", data=bSupZeta)
+
+
+def getTokamakField(majorRadius: float=3.0, poloidalField: float=0.1):
+    """
+    return:
+        fun(R, phi, Z) -> B_R, B_phi, B_Z, the field of `mpy.traceing.traceCylindrical` with circular flux surfaces.
+    """
+    def fun(R, phi, Z):
+        return -poloidalField*Z/R, majorRadius/R, poloidalField*(R-majorRadius)/R
+    return fun
+
+
+def writeVMECOutput(ncFile: str, ns: int=51, mpol: int=4, ntor: int=3, nfp: int=2, seed: int=0) -> None:
+    """
+    The netCDF file of a VMEC output, readable by `mpy.vmecOut2spec`.
+    """
+    import xarray
+    rng = np.random.default_rng(seed)
+    s = np.linspace(0, 1, ns)
+    xm, xn = getModes(mpol-1, ntor)
+    mn = xm.size
+    rmnc, zmns, gmnc = np.zeros((ns, mn)), np.zeros((ns, mn)), np.zeros((ns, mn))
+    rmnc[:, 0] = 3.0
+    index = np.where((xm == 1) & (xn == 0))[0][0]
+    rmnc[:, index], zmns[:, index] = 0.3*np.sqrt(s), 0.35*np.sqrt(s)
+    rmnc[:, 1:] += 1e-3 * s[:, np.newaxis] * rng.normal(size=(ns, mn-1))
+    zmns[:, 1:] += 1e-3 * s[:, np.newaxis] * rng.normal(size=(ns, mn-1))
+    gmnc[:, 0] = -(0.2 + 0.1*s)
+    gmnc[0, 0] = 0
+    dataset = xarray.Dataset({
+        "ns": ns, "nfp": nfp, "mpol": mpol, "ntor": ntor, "gamma": 5/3,
+        "phi": (("radius",), 0.5*s),
+        "chi": (("radius",), -0.2*np.power(s, 1.2)),
+        "iotaf": (("radius",), 0.4+0.3*s*s),
+        "jcuru": (("radius",), 1e5*(1-s)),
+        "jcurv": (("radius",), 2e5*(1-s*s)),
+        "presf": (("radius",), 1e4*(1-s)*(1-s)),
+        "jdotb": (("radius",), 1e5*(1-s)),
+        "bdotb": (("radius",), 1+0.1*s),
+        "xm": (("mn",), xm.astype(float)),
+        "xn": (("mn",), (xn*nfp).astype(float)),
+        "rmnc": (("radius", "mn"), rmnc),
+        "zmns": (("radius", "mn"), zmns),
+        "gmnc": (("radius", "mn"), gmnc)
+    })
+    dataset.to_netcdf(ncFile)
+
+
+if __name__ == "__main__":
+    pass